@@ -0,0 +1,91 @@
+# crawl_test.py
+# Runs the activation crawler against a local stand-in for the Disasters Charter site.
+#
+# Run: python crawl_test.py --activations 200
+# The first crawl downloads every page; the second only gets 304s; after one
+# page changes, the third downloads just that page.
+
+import argparse
+import asyncio
+import hashlib
+import tempfile
+import time
+from aiohttp import web
+
+from src.activation_crawler import crawl_activations_async
+
+PAGE_SIZE = 50
+
+
+def activation_page(n: int, revision: int = 0) -> str:
+    hazard = "Flood" if n % 3 else "Flood, Landslide"
+    return f"""<html><body>
+<h1>Flood in Region {n} of Brazil</h1><time datetime="2024-05-03T17:52:00Z">3 May 2024</time>
+<article><p>Synthetic activation {n}, revision {revision}.</p>
+<dl><dt>Type of event</dt><dd>{hazard}</dd><dt>Location of event</dt><dd>Brazil</dd>
+<dt>Date of Charter Activation</dt><dd>2024-{1 + n % 12:02d}-{1 + n % 28:02d}</dd>
+<dt>Activation ID</dt><dd>{n}</dd></dl></article></body></html>"""
+
+
+def make_charter_stub(activations: int) -> web.Application:
+    """Serves a paginated index and activation pages with ETag / Last-Modified."""
+    stub = web.Application()
+    stub["stats"] = {"requests": 0, "304": 0}
+    stub["revisions"] = {}
+
+    def conditional(request: web.Request, body: str) -> web.Response:
+        stub["stats"]["requests"] += 1
+        etag = '"' + hashlib.sha1(body.encode()).hexdigest()[:16] + '"'
+        if request.headers.get("If-None-Match") == etag:
+            stub["stats"]["304"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=body, content_type="text/html",
+                            headers={"ETag": etag, "Last-Modified": "Fri, 03 May 2024 17:52:00 GMT"})
+
+    async def index(request: web.Request):
+        page = int(request.query.get("page", 0))
+        start = page * PAGE_SIZE
+        links = "".join(f'<a href="/activations/flood-activation-{n}-">Activation {n}</a>'
+                        for n in range(start, min(start + PAGE_SIZE, activations)))
+        more = f'<a rel="next" href="/activations?page={page + 1}">next</a>' if start + PAGE_SIZE < activations else ""
+        return conditional(request, f"<html><body>{links}{more}</body></html>")
+
+    async def activation(request: web.Request):
+        n = int(request.match_info["n"])
+        return conditional(request, activation_page(n, stub["revisions"].get(n, 0)))
+
+    stub.router.add_get("/activations", index)
+    stub.router.add_get("/activations/flood-activation-{n}-", activation)
+    return stub
+
+
+async def main(activations: int, concurrency: int, rate: float):
+    runner = web.AppRunner(make_charter_stub(activations))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    stub = runner.app
+    index_url = f"http://127.0.0.1:{port}/activations"
+
+    with tempfile.TemporaryDirectory() as crawl_dir:
+        for label in ("Primeira coleta", "Recoleta sem mudanças", "Recoleta com 1 página alterada"):
+            if label.endswith("alterada"):
+                stub["revisions"][7] = 1
+            before = dict(stub["stats"])
+            start = time.perf_counter()
+            df = await crawl_activations_async(seeds=[], index_url=index_url, crawl_dir=crawl_dir,
+                                               concurrency=concurrency, rate=rate)
+            print(f"{label}: {len(df)} registros, {stub['stats']['requests'] - before['requests']} requisições, "
+                  f"{stub['stats']['304'] - before['304']} respostas 304, {time.perf_counter() - start:.2f}s")
+        print(df.head())
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste do crawler de ativações contra um servidor local")
+    parser.add_argument("--activations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=0, help="requisições/s por host (0 = sem limite)")
+    args = parser.parse_args()
+    asyncio.run(main(args.activations, args.concurrency, args.rate))
@@ -1,11 +1,20 @@
 # dashboard_app.py
 
-from flask import Flask, render_template_string, jsonify
-from src.prediction_api import predict_flood
-from read_serial import flood_sensor
+import json
+import queue
+import threading
+from flask import Flask, Response, render_template_string, jsonify, request
+from src.prediction_api import predict_flood, predict_batch, risk_level
+from read_serial import flood_sensor, start_sensor_reader, sensor_state, sensor_store, DEFAULT_SENSOR_ID
 
 app = Flask(__name__)
 
+# Push (SSE): how long the monitor waits for a sensor reading before
+# re-checking the (cached) prediction, and the keep-alive interval
+MONITOR_INTERVAL = 1.0
+STREAM_KEEPALIVE = 15.0
+SUBSCRIBER_QUEUE_SIZE = 16
+
 # HTML content for the dashboard
 # Uses Tailwind CSS for styling and Inter font
 DASHBOARD_HTML = """
@@ -67,7 +76,7 @@ DASHBOARD_HTML = """
             <p class="text-xl font-semibold text-gray-700 mb-2">Possibilidade de Inundações:</p>
             <p id="flood-possibility" class="text-3xl font-extrabold"></p>
             <p class="text-sm text-gray-500 mt-2">
-                (O risco é atualizado automaticamente a cada 5 segundos com base no modelo de ML.)
+                (O risco é atualizado automaticamente assim que muda, com base no sensor e no modelo de ML.)
             </p>
         </div>
 
@@ -87,66 +96,170 @@ DASHBOARD_HTML = """
             document.getElementById('current-datetime').textContent = now.toLocaleDateString('pt-BR', options);
         }
 
+        const RISK_LEVELS = {
+            low: ["Risco Baixo", "low-risk"],
+            moderate: ["Risco Moderado", "moderate-risk"],
+            high: ["Risco Alto", "high-risk"],
+            critical: ["RISCO CRÍTICO!", "critical-risk"],
+        };
+
+        function renderFloodPossibility(data) {
+            let [riskText, riskClass] = RISK_LEVELS.low;
+            if (data.error) {
+                riskText = "Erro ao obter previsão";
+                riskClass = "critical-risk";
+            } else if (data.risk_level in RISK_LEVELS) {
+                // Faixa calculada no servidor com as faixas salvas junto ao modelo
+                [riskText, riskClass] = RISK_LEVELS[data.risk_level];
+            }
+
+            const floodPossibilityElement = document.getElementById('flood-possibility');
+            const floodStatusCard = document.getElementById('flood-status-card');
+            const lastSimUpdateElement = document.getElementById('last-sim-update');
+
+            floodPossibilityElement.textContent = riskText + (data.probability !== null && data.probability !== undefined ? ` (${(data.probability*100).toFixed(1)}%)` : "")
+                // Subida rápida do nível: aviso à parte, não altera a faixa de risco
+                + (data.rising ? " · nível subindo" : "");
+            floodStatusCard.classList.remove("low-risk", "moderate-risk", "high-risk", "critical-risk");
+            floodStatusCard.classList.add(riskClass);
+
+            const now = new Date();
+            const options = { hour: '2-digit', minute: '2-digit', second: '2-digit', hour12: false };
+            lastSimUpdateElement.textContent = now.toLocaleTimeString('pt-BR', options);
+        }
+
         function updateFloodPossibility() {
             fetch('/api/flood-possibility')
                 .then(response => response.json())
-                .then(data => {
-                    let riskText = "Risco Baixo";
-                    let riskClass = "low-risk";
-                    if (data.error) {
-                        riskText = "Erro ao obter previsão";
-                        riskClass = "critical-risk";
-                    } else if (data.flood_risk) {
-                        if (data.probability >= 0.8) {
-                            riskText = "RISCO CRÍTICO!";
-                            riskClass = "critical-risk";
-                        } else if (data.probability >= 0.6) {
-                            riskText = "Risco Alto";
-                            riskClass = "high-risk";
-                        } else if (data.probability >= 0.3) {
-                            riskText = "Risco Moderado";
-                            riskClass = "moderate-risk";
-                        } else {
-                            riskText = "Risco Baixo";
-                            riskClass = "low-risk";
-                        }
-                    } else {
-                        riskText = "Risco Baixo";
-                        riskClass = "low-risk";
-                    }
-
-                    const floodPossibilityElement = document.getElementById('flood-possibility');
-                    const floodStatusCard = document.getElementById('flood-status-card');
-                    const lastSimUpdateElement = document.getElementById('last-sim-update');
-
-                    floodPossibilityElement.textContent = riskText + (data.probability !== null && data.probability !== undefined ? ` (${(data.probability*100).toFixed(1)}%)` : "");
-                    floodStatusCard.classList.remove("low-risk", "moderate-risk", "high-risk", "critical-risk");
-                    floodStatusCard.classList.add(riskClass);
-
-                    const now = new Date();
-                    const options = { hour: '2-digit', minute: '2-digit', second: '2-digit', hour12: false };
-                    lastSimUpdateElement.textContent = now.toLocaleTimeString('pt-BR', options);
-                })
+                .then(renderFloodPossibility)
                 .catch(() => {
                     document.getElementById('flood-possibility').textContent = "Erro ao obter previsão";
                     document.getElementById('flood-status-card').classList.add("critical-risk");
                 });
         }
 
+        // Server push: the server sends the risk only when it changes.
+        // Falls back to polling every 5 seconds while the stream is unavailable.
+        let pollTimer = null;
+        function startPolling() {
+            if (!pollTimer) {
+                updateFloodPossibility();
+                pollTimer = setInterval(updateFloodPossibility, 5000);
+            }
+        }
+        function stopPolling() {
+            clearInterval(pollTimer);
+            pollTimer = null;
+        }
+
         // Update date/time every second
         setInterval(updateDateTime, 1000);
-        // Update flood possibility every 5 seconds (simulation)
-        setInterval(updateFloodPossibility, 5000);
-
-        // Initial calls to display content immediately on load
         updateDateTime();
-        updateFloodPossibility();
+
+        if (window.EventSource) {
+            const source = new EventSource('/api/stream');
+            source.onopen = stopPolling;
+            source.onmessage = event => renderFloodPossibility(JSON.parse(event.data));
+            source.onerror = startPolling;
+        } else {
+            startPolling();
+        }
     </script>
 
 </body>
 </html>
 """
 
+class RiskBroadcaster:
+    """
+    Fans risk updates out to every connected dashboard.
+
+    Each subscriber gets a bounded queue primed with the latest event; a
+    subscriber that falls behind loses its oldest pending event instead of
+    blocking the publisher.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._latest = None
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> queue.Queue:
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if self._latest is not None:
+                q.put_nowait(self._latest)
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def publish(self, event: dict):
+        with self._lock:
+            self._latest = event
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+                q.put_nowait(event)
+
+
+broadcaster = RiskBroadcaster()
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def current_risk() -> dict:
+    """
+    Combines the sensor state (O(1) snapshot) with the cached model prediction.
+    """
+    flood_sensor_status = flood_sensor()
+    if flood_sensor_status["flood_risk"]:
+        return {**flood_sensor_status, "risk_level": risk_level(flood_sensor_status["probability"])}
+    prediction, probability = predict_flood()
+    return {
+        "flood_risk": bool(prediction),
+        "probability": float(probability) if probability is not None else None,
+        "risk_level": risk_level(probability) if probability is not None else "low",
+        "distance_cm": flood_sensor_status["distance_cm"],
+        "rate_of_rise_cm_per_min": flood_sensor_status["rate_of_rise_cm_per_min"],
+        "rising": flood_sensor_status["rising"],
+    }
+
+
+def _monitor_risk():
+    # Acorda a cada leitura do sensor (ou a cada MONITOR_INTERVAL) e só
+    # publica quando o risco muda: custo proporcional a eventos, não a clientes
+    last_key = None
+    version = 0
+    while True:
+        version = sensor_state.wait_for_update(version, MONITOR_INTERVAL)
+        try:
+            risk = current_risk()
+        except Exception as e:
+            risk = {"error": str(e)}
+        key = (risk.get("flood_risk"), risk.get("probability"), risk.get("rising"), risk.get("error"))
+        if key != last_key:
+            last_key = key
+            broadcaster.publish(risk)
+
+
+def start_risk_monitor():
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None or not _monitor.is_alive():
+            start_sensor_reader()
+            _monitor = threading.Thread(target=_monitor_risk, name="risk-monitor", daemon=True)
+            _monitor.start()
+
+
 @app.route('/')
 def dashboard():    
     """
@@ -157,21 +270,63 @@ def dashboard():
 @app.route('/api/flood-possibility')
 def api_flood_possibility():
     try:
-        flood_sensor_status = flood_sensor()
-        print(f"Flood sensor status: {flood_sensor_status}")
-        if flood_sensor_status:
-            # If flood sensor detects an alert, return its status immediately
-            print(f"Flood sensor alert detected: {flood_sensor_status}")
-            return jsonify(flood_sensor_status)
-        prediction, probability = predict_flood()
-        result = {
-            "flood_risk": bool(prediction),
-            "probability": float(probability) if probability is not None else None
-        }
-        return jsonify(result)
+        # The sensor is read by a background thread; this only reads its latest state
+        start_sensor_reader()
+        return jsonify(current_risk())
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/stream')
+def api_stream():
+    """
+    Server-Sent Events stream of risk updates, pushed only when the risk changes.
+    """
+    start_risk_monitor()
+    subscription = broadcaster.subscribe()
+
+    def events():
+        try:
+            while True:
+                try:
+                    event = subscription.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/api/flood-possibility/batch', methods=['POST'])
+def api_flood_possibility_batch():
+    """
+    Scores many locations and days in one call.
+
+    Expects JSON: {"locations": [{"name", "latitude", "longitude"}, ...],
+                   "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"}
+    """
+    try:
+        payload = request.get_json(force=True)
+        locations = payload["locations"]
+        start_date = payload["start_date"]
+        end_date = payload.get("end_date", start_date)
+    except Exception as e:
+        return jsonify({"error": f"Invalid request: {e}"}), 400
+    try:
+        result = predict_batch(locations, (start_date, end_date))
+        return jsonify(result.to_dict(orient="records"))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/water-level')
+def api_water_level():
+    """
+    Returns 1/5/15-minute aggregates of the water-level sensor history.
+    """
+    start_sensor_reader()
+    return jsonify(sensor_store.summary(DEFAULT_SENSOR_ID))
+
 if __name__ == '__main__':
     # To run the Flask app:
     # 1. Save this code as dashboard_app.py
@@ -0,0 +1,245 @@
+# dashboard_async.py
+# Async (aiohttp) serving mode for the flood alert dashboard.
+
+import asyncio
+import datetime
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+import aiohttp
+import numpy as np
+import pandas as pd
+from aiohttp import web
+
+from dashboard import DASHBOARD_HTML
+from read_serial import SERIAL_URL, flood_sensor, start_sensor_reader
+from src.prediction_api import (
+    DAILY_VARIABLES,
+    DEFAULT_LATITUDE,
+    DEFAULT_LONGITUDE,
+    FEATURE_LOOKBACK_DAYS,
+    BATCH_LOCATIONS_PER_REQUEST,
+    OPEN_METEO_URL,
+    PREDICTION_CACHE_TTL,
+    PREDICTION_ERROR_TTL,
+    apply_location_weather,
+    feature_fetch_start,
+    registry,
+    risk_level,
+    score_batch,
+    score_row,
+)
+
+# Threads dedicadas à inferência do modelo (CPU), fora do event loop
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", 4))
+# Limites de concorrência e timeouts (segundos) por endpoint
+ENDPOINT_LIMITS = {"flood": 512, "batch": 4}
+ENDPOINT_TIMEOUTS = {"flood": 10.0, "batch": 60.0}
+UPSTREAM_TIMEOUT = 10.0
+
+
+class AsyncPredictionCache:
+    """
+    asyncio counterpart of ``prediction_api.PredictionCache``.
+
+    Concurrent misses share one task; waiters are shielded so a client timing
+    out does not cancel the computation the others are waiting for. Failures
+    are kept for ``error_ttl`` seconds, like in the sync cache.
+    """
+
+    def __init__(self, ttl: float = PREDICTION_CACHE_TTL, error_ttl: float = PREDICTION_ERROR_TTL):
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self._entries = {}
+        self._inflight = {}
+        self._generation = 0
+
+    async def get_or_compute(self, key, compute):
+        loop = asyncio.get_running_loop()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > loop.time():
+            if entry[2] is not None:
+                raise entry[2]
+            return entry[1]
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(key, compute, self._generation))
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _run(self, key, compute, generation):
+        try:
+            value = await compute()
+        except Exception as e:
+            self._store(key, generation, self.error_ttl, None, e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self._store(key, generation, self.ttl, value, None)
+        return value
+
+    def _store(self, key, generation: int, ttl: float, value, error: Exception):
+        if generation == self._generation and ttl > 0:
+            self._entries[key] = (asyncio.get_running_loop().time() + ttl, value, error)
+
+    def invalidate(self):
+        self._entries.clear()
+        self._generation += 1
+
+
+async def fetch_weather_matrix(app: web.Application, locations: list,
+                               start_date: datetime.date, end_date: datetime.date) -> tuple:
+    """
+    Async version of ``prediction_api.get_weather_matrix`` using the JSON API.
+
+    Location chunks are requested concurrently over the app's pooled session.
+    """
+    dates = pd.date_range(start_date, end_date, freq="D", tz="UTC")
+    daily = {name: np.full((len(locations), len(dates)), np.nan) for name in DAILY_VARIABLES}
+
+    async def fetch_chunk(offset: int):
+        chunk = locations[offset:offset + BATCH_LOCATIONS_PER_REQUEST]
+        params = {
+            "latitude": ",".join(str(loc["latitude"]) for loc in chunk),
+            "longitude": ",".join(str(loc["longitude"]) for loc in chunk),
+            "start_date": start_date.strftime("%Y-%m-%d"),
+            "end_date": end_date.strftime("%Y-%m-%d"),
+            "daily": ",".join(DAILY_VARIABLES),
+        }
+        async with app["http"].get(app["open_meteo_url"], params=params) as response:
+            response.raise_for_status()
+            payload = await response.json()
+        # Uma coordenada devolve um objeto; várias, uma lista na ordem pedida
+        for row, item in enumerate(payload if isinstance(payload, list) else [payload], start=offset):
+            for name in DAILY_VARIABLES:
+                series = np.asarray(item["daily"][name], dtype=np.float64)[:len(dates)]
+                daily[name][row, :len(series)] = series
+
+    await asyncio.gather(*(fetch_chunk(o) for o in range(0, len(locations), BATCH_LOCATIONS_PER_REQUEST)))
+    return dates, daily
+
+
+async def predict_flood_async(app: web.Application, latitude: float, longitude: float):
+    loop = asyncio.get_running_loop()
+    pool = app["inference_pool"]
+    # Caminho rápido sem sair do loop; carregar/verificar o modelo vai para o pool
+    bundle = registry.peek() or await loop.run_in_executor(pool, registry.get)
+    today = datetime.date.today()
+    key = (round(latitude, 4), round(longitude, 4), today.isoformat(), bundle.version)
+
+    async def compute():
+        start = feature_fetch_start(latitude, longitude, today)
+        dates, daily = await fetch_weather_matrix(app, [{"latitude": latitude, "longitude": longitude}], start, today)
+
+        def infer():
+            row = apply_location_weather(bundle.feature_names, latitude, longitude, dates, daily)
+            return score_row(bundle, row)
+
+        return await loop.run_in_executor(pool, infer)
+
+    return await app["prediction_cache"].get_or_compute(key, compute)
+
+
+def limited(endpoint: str):
+    """Applies the endpoint's concurrency limit and timeout to an aiohttp handler."""
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(request: web.Request):
+            semaphore = request.app["limits"][endpoint]
+            try:
+                async def run():
+                    async with semaphore:
+                        return await handler(request)
+                return await asyncio.wait_for(run(), ENDPOINT_TIMEOUTS[endpoint])
+            except asyncio.TimeoutError:
+                return web.json_response({"error": "timeout"}, status=504)
+            except Exception as e:
+                return web.json_response({"error": str(e)}, status=500)
+        return wrapper
+    return decorator
+
+
+async def dashboard(request: web.Request):
+    return web.Response(text=DASHBOARD_HTML, content_type="text/html")
+
+
+@limited("flood")
+async def api_flood_possibility(request: web.Request):
+    # Leitura O(1) do estado publicado pelo leitor serial em background
+    flood_sensor_status = flood_sensor()
+    if flood_sensor_status["flood_risk"]:
+        return web.json_response({**flood_sensor_status, "risk_level": risk_level(flood_sensor_status["probability"])})
+    prediction, probability = await predict_flood_async(request.app, DEFAULT_LATITUDE, DEFAULT_LONGITUDE)
+    return web.json_response({
+        "flood_risk": bool(prediction),
+        "probability": float(probability) if probability is not None else None,
+        "risk_level": risk_level(probability) if probability is not None else "low",
+        "distance_cm": flood_sensor_status["distance_cm"],
+        "rate_of_rise_cm_per_min": flood_sensor_status["rate_of_rise_cm_per_min"],
+        "rising": flood_sensor_status["rising"],
+    })
+
+
+@limited("batch")
+async def api_flood_possibility_batch(request: web.Request):
+    try:
+        payload = await request.json()
+        locations = payload["locations"]
+        start_date = pd.Timestamp(payload["start_date"]).date()
+        end_date = pd.Timestamp(payload.get("end_date", payload["start_date"])).date()
+    except Exception as e:
+        return web.json_response({"error": f"Invalid request: {e}"}, status=400)
+
+    loop = asyncio.get_running_loop()
+    pool = request.app["inference_pool"]
+    bundle = registry.peek() or await loop.run_in_executor(pool, registry.get)
+    fetch_start = start_date - datetime.timedelta(days=FEATURE_LOOKBACK_DAYS)
+    dates, daily = await fetch_weather_matrix(request.app, locations, fetch_start, end_date)
+    result = await loop.run_in_executor(pool, score_batch, bundle, locations, dates, daily)
+    return web.json_response(result.to_dict(orient="records"))
+
+
+async def _on_startup(app: web.Application):
+    loop = asyncio.get_running_loop()
+    app["http"] = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=UPSTREAM_TIMEOUT))
+    app["inference_pool"] = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+    app["limits"] = {name: asyncio.Semaphore(limit) for name, limit in ENDPOINT_LIMITS.items()}
+    # Trocas de modelo acontecem em threads do pool; a invalidação roda no loop
+    app["model_listener"] = lambda bundle: loop.call_soon_threadsafe(app["prediction_cache"].invalidate)
+    registry.add_listener(app["model_listener"])
+    if app["serial_url"]:
+        start_sensor_reader(app["serial_url"])
+
+
+async def _on_cleanup(app: web.Application):
+    # O loop desta aplicação vai fechar: trocas posteriores não podem mais chamá-lo
+    registry.remove_listener(app["model_listener"])
+    await app["http"].close()
+    app["inference_pool"].shutdown(wait=False)
+
+
+def create_app(open_meteo_url: str = OPEN_METEO_URL, serial_url: str = SERIAL_URL,
+               cache_ttl: float = PREDICTION_CACHE_TTL) -> web.Application:
+    """
+    Builds the async dashboard application.
+
+    Args:
+        open_meteo_url (str): Archive API endpoint (a local stub in load tests).
+        serial_url (str): Sensor URL for the background reader; empty disables it.
+        cache_ttl (float): Prediction cache TTL in seconds.
+    """
+    app = web.Application()
+    app["open_meteo_url"] = open_meteo_url
+    app["serial_url"] = serial_url
+    app["prediction_cache"] = AsyncPredictionCache(cache_ttl)
+    app.on_startup.append(_on_startup)
+    app.on_cleanup.append(_on_cleanup)
+    app.router.add_get("/", dashboard)
+    app.router.add_get("/api/flood-possibility", api_flood_possibility)
+    app.router.add_post("/api/flood-possibility/batch", api_flood_possibility_batch)
+    return app
+
+
+if __name__ == "__main__":
+    # Run: python dashboard_async.py and open http://127.0.0.1:3000/
+    web.run_app(create_app(), host="0.0.0.0", port=3000)
@@ -0,0 +1,102 @@
+# load_test.py
+# Load test for the async dashboard with local stand-ins for Open-Meteo and the serial port.
+#
+# Run: python load_test.py --clients 1000 --seconds 20
+# (1000 clients need ~2000 file descriptors: ulimit -n 4096)
+
+import argparse
+import asyncio
+import time
+import numpy as np
+import pandas as pd
+import aiohttp
+from aiohttp import web
+
+from dashboard_async import create_app
+
+
+def make_open_meteo_stub(latency: float) -> web.Application:
+    """Serves random daily weather in the Open-Meteo JSON format for any coordinates."""
+    rng = np.random.default_rng(42)
+    stub = web.Application()
+    stub["stats"] = {"requests": 0}
+
+    async def archive(request: web.Request):
+        stub["stats"]["requests"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        q = request.query
+        days = pd.date_range(q["start_date"], q["end_date"], freq="D").strftime("%Y-%m-%d").tolist()
+        items = [
+            {"daily": {"time": days, **{name: (rng.random(len(days)) * 40).round(2).tolist()
+                                        for name in q["daily"].split(",")}}}
+            for _ in q["latitude"].split(",")
+        ]
+        return web.json_response(items if len(items) > 1 else items[0])
+
+    stub.router.add_get("/v1/archive", archive)
+    return stub
+
+
+async def _serve(app: web.Application) -> tuple:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def _client(session: aiohttp.ClientSession, url: str, deadline: float, latencies: list, errors: list):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            async with session.get(url) as response:
+                await response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+                    continue
+        except aiohttp.ClientError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def main(clients: int, seconds: float, upstream_latency: float, cache_ttl: float):
+    stub_runner, stub_url = await _serve(make_open_meteo_stub(upstream_latency))
+    app = create_app(open_meteo_url=f"{stub_url}/v1/archive", serial_url="loop://", cache_ttl=cache_ttl)
+    app_runner, app_url = await _serve(app)
+
+    latencies, errors = [], []
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        # Aquece o cache de modelo/previsão antes de medir
+        async with session.get(f"{app_url}/api/flood-possibility") as response:
+            print("Resposta inicial:", await response.json())
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(
+            _client(session, f"{app_url}/api/flood-possibility", deadline, latencies, errors)
+            for _ in range(clients)
+        ))
+
+    await app_runner.cleanup()
+    await stub_runner.cleanup()
+
+    lat_ms = np.array(latencies) * 1000
+    print(f"Clientes concorrentes: {clients}, duração: {seconds:.0f}s, TTL do cache: {cache_ttl}s")
+    print(f"Requisições OK: {len(lat_ms)}, erros: {len(errors)}")
+    print(f"Vazão sustentada: {len(lat_ms) / seconds:.0f} req/s")
+    if len(lat_ms):
+        p50, p95, p99 = np.percentile(lat_ms, [50, 95, 99])
+        print(f"Latência p50={p50:.1f}ms p95={p95:.1f}ms p99={p99:.1f}ms max={lat_ms.max():.1f}ms")
+    print(f"Chamadas ao Open-Meteo (stub): {stub_runner.app['stats']['requests']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga do dashboard assíncrono")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--upstream-latency", type=float, default=0.2, help="latência simulada do Open-Meteo (s)")
+    parser.add_argument("--cache-ttl", type=float, default=5.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.clients, args.seconds, args.upstream_latency, args.cache_ttl))
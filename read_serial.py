@@ -1,6 +1,12 @@
 import os
+import time
+import threading
+from typing import NamedTuple
+import numpy as np
 import serial
 
+from src.sensor_store import SensorStore
+
 # --- Constantes -------------------------------------------------------------
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -8,33 +14,316 @@ INI_FILE = os.path.join(ROOT_DIR, "platformio.ini")
 SERIAL_URL = 'rfc2217://localhost:8180'
 BAUDRATE = 115200
 
+# Timeout curto de leitura: o thread acorda com frequência para checar o stop
+READ_TIMEOUT = 1.0
+# Backoff exponencial de reconexão (segundos)
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+# Um alerta expira se o sensor não o repetir dentro deste intervalo (segundos)
+ALERT_STALE_AFTER = 15.0
+# Distância (cm) abaixo da qual o nível da água é considerado alto
+ALERT_DISTANCE_CM = 300
+# Valor enviado pelo firmware quando o sensor não recebe eco
+DISTANCE_NO_ECHO = 9999
+# Subida do nível (cm/min, janela de 5 min) sinalizada à parte como "rising"
+RISE_ALERT_CM_PER_MIN = 2.0
+RISE_WINDOW_S = 300
+DEFAULT_SENSOR_ID = "default"
+
+# --- Protocolo de telemetria ------------------------------------------------
+# Quadro de largura fixa emitido por src/sensor_main.ino:
+#   b"$SSSSS,MMMMMMMMMM,DDDD*CC\r\n"
+# CC é o XOR (hex) dos bytes entre '$' e '*'.
+
+FRAME_LEN = 27
+_SEQ = slice(1, 6)
+_MILLIS = slice(7, 17)
+_DISTANCE = slice(18, 22)
+_PAYLOAD = slice(1, 22)
+_CHECKSUM = slice(23, 25)
+_SEPARATORS = {6: ord(','), 17: ord(','), 22: ord('*'), 25: ord('\r'), 26: ord('\n')}
+_DIGITS = np.r_[1:6, 7:17, 18:22]
+
+READING_DTYPE = np.dtype([
+    ("seq", np.uint16),
+    ("millis", np.uint32),
+    ("distance_cm", np.uint16),
+])
+
+
+class SensorReading(NamedTuple):
+    seq: int
+    millis: int
+    distance_cm: int
+
+
+def _decimal(frames: np.ndarray, field: slice) -> np.ndarray:
+    digits = frames[:, field].astype(np.int64) - ord('0')
+    weights = 10 ** np.arange(digits.shape[1] - 1, -1, -1, dtype=np.int64)
+    return digits @ weights
+
+
+def _hex(frames: np.ndarray, field: slice) -> tuple:
+    chars = frames[:, field].astype(np.int16)
+    values = np.where(chars >= ord('A'), chars - ord('A') + 10, chars - ord('0'))
+    valid = ((values >= 0) & (values < 16)).all(axis=1)
+    return values[:, 0] * 16 + values[:, 1], valid
+
+
+def parse_frames(buffer) -> tuple:
+    """
+    Parses every complete telemetry frame in ``buffer`` in one vectorized pass.
+
+    The buffer (bytes, bytearray or memoryview) is viewed as a uint8 array
+    without copying or decoding; candidate frames are located, structurally
+    checked and checksum-validated in bulk.
+
+    Args:
+        buffer: Raw bytes read from the serial port.
+
+    Returns:
+        tuple: A tuple containing:
+               - readings (np.ndarray): Valid frames as a ``READING_DTYPE`` array.
+               - consumed (int): Number of leading bytes that can be discarded;
+                 the rest may hold an incomplete frame.
+               - rejected (int): Well-formed frames whose checksum did not match.
+    """
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    size = data.shape[0]
+    consumed = max(0, size - (FRAME_LEN - 1))
+    if size < FRAME_LEN:
+        return np.empty(0, dtype=READING_DTYPE), consumed, 0
+
+    starts = np.flatnonzero(data[:size - FRAME_LEN + 1] == ord('$'))
+    frames = data[starts[:, None] + np.arange(FRAME_LEN)]
+
+    well_formed = np.ones(len(starts), dtype=bool)
+    for offset, char in _SEPARATORS.items():
+        well_formed &= frames[:, offset] == char
+    digits = frames[:, _DIGITS]
+    well_formed &= ((digits >= ord('0')) & (digits <= ord('9'))).all(axis=1)
+
+    expected, hex_ok = _hex(frames, _CHECKSUM)
+    checksum = np.bitwise_xor.reduce(frames[:, _PAYLOAD], axis=1)
+    valid = well_formed & hex_ok & (checksum == expected)
+    rejected = int((well_formed & ~valid).sum())
+
+    frames = frames[valid]
+    readings = np.empty(len(frames), dtype=READING_DTYPE)
+    readings["seq"] = _decimal(frames, _SEQ)
+    readings["millis"] = _decimal(frames, _MILLIS)
+    readings["distance_cm"] = _decimal(frames, _DISTANCE)
+
+    if len(frames):
+        consumed = max(consumed, int(starts[valid][-1]) + FRAME_LEN)
+    return readings, consumed, rejected
+
+
+def iter_readings(buffer):
+    """Yields a ``SensorReading`` for every valid frame in ``buffer``."""
+    readings, _, _ = parse_frames(buffer)
+    for seq, millis, distance_cm in readings.tolist():
+        yield SensorReading(seq, millis, distance_cm)
+
+
+class FrameParser:
+    """
+    Incremental parser for a serial byte stream.
+
+    Bytes are accumulated in a ``bytearray``; every ``feed`` parses all
+    complete frames at once and keeps only the trailing partial frame.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.rejected = 0
+
+    def feed(self, data: bytes) -> np.ndarray:
+        self._buffer += data
+        readings, consumed, rejected = parse_frames(self._buffer)
+        del self._buffer[:consumed]
+        self.rejected += rejected
+        return readings
+
+    def reset(self):
+        self._buffer.clear()
+
+
+def readings_to_series(readings: np.ndarray, received_at: float) -> tuple:
+    """
+    Converts parsed readings into (timestamps, distances) for the sensor store.
+
+    Timestamps are anchored on the host clock at ``received_at`` and spaced by
+    the firmware ``millis`` deltas; no-echo samples become NaN.
+    """
+    millis = readings["millis"].astype(np.float64)
+    timestamps = received_at - np.maximum(millis[-1] - millis, 0.0) / 1000.0
+    distances = readings["distance_cm"].astype(np.float32)
+    distances[readings["distance_cm"] == DISTANCE_NO_ECHO] = np.nan
+    return timestamps, distances
+
+
+def is_alert(distance_cm: int) -> bool:
+    return distance_cm != DISTANCE_NO_ECHO and distance_cm < ALERT_DISTANCE_CM
+
+
+class SensorState:
+    """
+    Thread-safe snapshot of the latest water-level sensor reading.
+
+    The background reader is the only writer; HTTP handlers only call
+    ``snapshot()``, which is O(1) and never touches the serial port.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._updated = threading.Condition(self._lock)
+        self._version = 0
+        self._reading = None
+        self._timestamp = None
+        self._alert = False
+        self._connected = False
+        self._last_error = None
+
+    def publish(self, reading, alert: bool):
+        with self._lock:
+            self._reading = reading
+            self._timestamp = time.time()
+            self._alert = bool(alert)
+            self._version += 1
+            self._updated.notify_all()
+
+    def set_connected(self, connected: bool, error=None):
+        with self._lock:
+            self._connected = connected
+            if error is not None:
+                self._last_error = str(error)
+
+    def wait_for_update(self, version: int, timeout: float) -> int:
+        """Blocks until a reading newer than ``version`` is published (or timeout); returns the current version."""
+        with self._updated:
+            self._updated.wait_for(lambda: self._version != version, timeout)
+            return self._version
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "reading": self._reading,
+                "timestamp": self._timestamp,
+                "alert": self._alert,
+                "connected": self._connected,
+                "last_error": self._last_error,
+            }
+
+
+class SensorReader(threading.Thread):
+    """
+    Long-lived daemon thread that owns the serial/RFC2217 connection.
+
+    It reconnects with exponential backoff whenever the port fails and
+    publishes the latest parsed reading to ``state``; the full series goes to
+    ``store`` when one is given.
+    """
+
+    def __init__(self, state: SensorState, url: str = SERIAL_URL, baudrate: int = BAUDRATE,
+                 store: SensorStore = None, sensor_id: str = DEFAULT_SENSOR_ID):
+        super().__init__(name="sensor-reader", daemon=True)
+        self.state = state
+        self.store = store
+        self.sensor_id = sensor_id
+        self.url = url
+        self.baudrate = baudrate
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        delay = RECONNECT_MIN_DELAY
+        while not self._stop_event.is_set():
+            try:
+                ser = serial.serial_for_url(self.url, baudrate=self.baudrate, timeout=READ_TIMEOUT)
+            except Exception as e:
+                print("Erro ao conectar no sensor:", e)
+                self.state.set_connected(False, e)
+                self._stop_event.wait(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                continue
+
+            self.state.set_connected(True)
+            delay = RECONNECT_MIN_DELAY
+            try:
+                self._read_loop(ser)
+            except Exception as e:
+                print("Erro:", e)
+                self.state.set_connected(False, e)
+            finally:
+                ser.close()
+
+    def _read_loop(self, ser):
+        parser = FrameParser()
+        while not self._stop_event.is_set():
+            data = ser.read(ser.in_waiting or 1)
+            if not data:
+                continue
+            readings = parser.feed(data)
+            if not len(readings):
+                continue
+            if self.store is not None:
+                self.store.record(self.sensor_id, *readings_to_series(readings, time.time()))
+            latest = SensorReading(*readings[-1].tolist())
+            alert = is_alert(latest.distance_cm)
+            if alert:
+                print("ALERTA: Nível de água alto!", latest)
+            self.state.publish(latest._asdict(), alert)
+
+
+# Estado compartilhado do processo, histórico recente e leitor em background
+sensor_state = SensorState()
+sensor_store = SensorStore()
+_reader = None
+_reader_lock = threading.Lock()
+
+
+def start_sensor_reader(url: str = SERIAL_URL, baudrate: int = BAUDRATE) -> SensorReader:
+    """Starts the process-wide sensor reader thread once and returns it."""
+    global _reader
+    with _reader_lock:
+        if _reader is None or not _reader.is_alive():
+            _reader = SensorReader(sensor_state, url=url, baudrate=baudrate, store=sensor_store)
+            _reader.start()
+        return _reader
+
 
-def flood_sensor() -> None:
-    ser = serial.serial_for_url(SERIAL_URL, baudrate=BAUDRATE, timeout=5000)
-    
-    while True :
-        try: 
-            line = ser.readline().decode('utf-8').strip()
-            if not line:
-                return {
-                "flood_risk": False,
-                "probability": 0.0
-                }
-            elif "ALERTA" in line.upper():
-                print("Recebido:", line)
-                return {
-                    "flood_risk": True,
-                    "probability": 1.0
-                }
-            
-            
-        except KeyboardInterrupt:
-            print("Parado pelo usuário.")
-            break
-        except Exception as e:
-            print("Erro:", e)
-            continue
+def flood_sensor() -> dict:
+    """
+    Returns the current sensor risk from the shared state without blocking.
 
+    ``flood_risk`` is raised only by a high water level in the latest
+    reading. A fast rise over the last ``RISE_WINDOW_S`` seconds is reported
+    as its own ``rising`` flag: it is an early warning, not a probability.
+    """
+    snapshot = sensor_state.snapshot()
+    alert = (
+        snapshot["alert"]
+        and snapshot["timestamp"] is not None
+        and time.time() - snapshot["timestamp"] <= ALERT_STALE_AFTER
+    )
+    rate_of_rise = sensor_store.buffer(DEFAULT_SENSOR_ID).stats(RISE_WINDOW_S).get("rate_of_rise_cm_per_min")
+    reading = snapshot["reading"]
+    return {
+        "flood_risk": alert,
+        "probability": 1.0 if alert else 0.0,
+        "distance_cm": reading["distance_cm"] if reading else None,
+        "rate_of_rise_cm_per_min": rate_of_rise,
+        "rising": rate_of_rise is not None and rate_of_rise >= RISE_ALERT_CM_PER_MIN,
+    }
 
 if __name__ == "__main__":
-    flood_sensor()
+    start_sensor_reader()
+    try:
+        while True:
+            print(sensor_state.snapshot())
+            time.sleep(5)
+    except KeyboardInterrupt:
+        print("Parado pelo usuário.")
@@ -1,38 +1,131 @@
 # Example run_pipeline.py
+import argparse
+import os
 import pandas as pd
 from src.data_ingestion import load_raw_data
-from src.data_preprocessing import clean_and_engineer_features
-from src.model_training import train_model
-from src.model_evaluation import evaluate_model
-import joblib
-
-def main():
-    # 1. Load Data
-    print("Loading raw data...")
-    # Assume load_raw_data returns a dictionary of dataframes or merges them
+from src.data_preprocessing import (analyze_features, drop_incomplete, engineer_features, fetch_daily_weather,
+                                    label_flood_events, persist_to_mongo, print_domain_notes)
+from src.data_sources import load_training_frame
+from src.model_training import DEFAULT_SPLIT_DATE, train_model
+from src.tuning import SEARCH_STRATEGIES
+from src.backtesting import BACKTEST_FOLDS_FILE, BACKTEST_SUMMARY_FILE, walk_forward_backtest
+from src.feature_state import check_servable
+from src.model_evaluation import REPORTS_DIR, evaluate_model
+from src.model_registry import manifest_path, save_bundle
+from src.pipeline_dag import PIPELINE_CACHE_DIR, Stage, run_stages
+from src.threshold_analysis import THRESHOLDS_FILE
+
+# Artefatos gravados pela avaliação e pelo backtest fora do cache do pipeline
+EVALUATION_REPORTS = tuple(os.path.join(REPORTS_DIR, name) for name in
+                           ("model_performance_metrics.csv", "model_performance_metrics.json", THRESHOLDS_FILE))
+BACKTEST_REPORTS = tuple(os.path.join(REPORTS_DIR, name) for name in (BACKTEST_FOLDS_FILE, BACKTEST_SUMMARY_FILE))
+
+# --- Stages: each one is cached on disk by the hash of its code, params and inputs ---
+
+def scrape_activation():
+    # Download da página de ativação; só reexecuta se data_ingestion mudar (ou com --force scrape)
     load_raw_data()
-    print("Raw data loaded.")
 
-    # 2. Preprocess and Feature Engineer
-    print("Preprocessing and engineering features...")
-    processed_df = clean_and_engineer_features()
-    print("Features engineered.")
+def build_features(labeled_df: pd.DataFrame) -> pd.DataFrame:
+    # Features sobre a série com os dias ausentes (NaN); linhas incompletas saem só depois
+    return drop_incomplete(engineer_features(labeled_df)).set_index('date')
+
+def analyze(processed_df: pd.DataFrame, show_plots: bool = False):
+    analyze_features(processed_df, show_plots=show_plots)
+    print_domain_notes()
+
+def train(processed_df: pd.DataFrame, split_date: str, search: str) -> tuple:
+    # train_model returns the trained model, scaler, and test sets
+    return train_model(processed_df, split_date=split_date, search=search)
+
+def evaluate(trained: tuple, render: bool) -> dict:
+    best_model, scaler, X_test_scaled, y_test = trained
+    # Figuras desenhadas sem display (backend Agg), em paralelo; --skip-figures só grava as métricas
+    return evaluate_model(best_model, X_test_scaled, y_test, X_test_scaled.columns, render=render) # Pass feature names for importance plot
+
+def backtest(processed_df: pd.DataFrame, trained: tuple) -> dict:
+    folds, summary = walk_forward_backtest(processed_df, model_params=trained[0].get_params())
+    return summary
+
+def publish(trained: tuple, evaluation: dict) -> str:
+    # Só publica uma nova versão quando o modelo treinado mudou; as faixas de risco vão no manifesto
+    best_model, scaler = trained[:2]
+    # Antes de gravar: as features do modelo precisam ser calculáveis pelo estado online da API
+    check_servable([str(name) for name in scaler.feature_names_in_])
+    return save_bundle(best_model, scaler, risk_bands=evaluation.get("risk_bands"))
+
+
+def build_stages(persist: bool = False, analyze_data: bool = False, show_plots: bool = False, source: str = None,
+                 split_date: str = DEFAULT_SPLIT_DATE, run_backtest: bool = False, figures: bool = True,
+                 search: str = "halving") -> list:
+    """
+    The training pipeline as a DAG of ``Stage`` objects (see ``src.pipeline_dag``).
 
-    # 3. Train Model
-    print("Training model...")
-    best_model, scaler, X_test_scaled, y_test = train_model(processed_df) # train_model returns the trained model, scaler, and test sets
-    print("Model trained and evaluated on cross-validation.")
+    Without ``source``, the Disasters Charter scrape and the Open-Meteo fetch
+    have no dependency on each other and run concurrently.
+    """
+    if source:
+        # Treina a partir do MongoDB ou de um arquivo processado, sem acessar a rede
+        data = [Stage("processed", load_training_frame, params={"source": source},
+                      code=("src.data_sources", "src.processed_data", "src.feature_spec"),
+                      files=(source,) if os.path.exists(source) else (), cache=source != "mongodb")]
+    else:
+        data = [
+            Stage("scrape", scrape_activation, code=("src.data_ingestion", "src.http_session")),
+            Stage("weather", fetch_daily_weather,
+                  code=("src.data_preprocessing", "src.weather_archive", "src.http_session", "src.feature_spec",
+                        "src.locations")),
+            Stage("labeled", label_flood_events, deps=("weather",), code=("src.data_preprocessing", "src.feature_spec")),
+            Stage("processed", build_features, deps=("labeled",), code=("src.data_preprocessing", "src.feature_spec")),
+        ]
+        if persist:
+            # Persistência no MongoDB é idempotente; refeita só quando os registros mudam
+            data.append(Stage("persist", persist_to_mongo, deps=("labeled",), code=("src.data_preprocessing",)))
+    stages = data + [
+        Stage("train", train, deps=("processed",), params={"split_date": split_date, "search": search},
+              code=("src.model_training", "src.tuning")),
+        # Etapas com efeito fora do cache: relatórios apagados/trocados ou versão ausente do registro refazem a etapa
+        Stage("evaluate", evaluate, deps=("train",), params={"render": figures},
+              code=("src.model_evaluation", "src.threshold_analysis"), outputs=EVALUATION_REPORTS),
+        Stage("publish", publish, deps=("train", "evaluate"),
+              code=("src.model_registry", "src.flat_forest", "src.feature_state", "src.feature_spec"),
+              # Só o manifesto da versão publicada: um rollback (CURRENT) não republica o modelo
+              outputs=lambda version: (manifest_path(version),)),
+    ]
+    if analyze_data:
+        # Exploração interativa não é reaproveitada do cache
+        stages.append(Stage("analyze", analyze, deps=("processed",), params={"show_plots": show_plots},
+                            code=("src.data_preprocessing",), cache=not show_plots))
+    if run_backtest:
+        stages.append(Stage("backtest", backtest, deps=("processed", "train"), code=("src.backtesting",),
+                            outputs=BACKTEST_REPORTS))
+    return stages
 
-    # 4. Evaluate Model on Test Set
-    print("Evaluating model on unseen test set...")
-    evaluate_model(best_model, X_test_scaled, y_test, X_test_scaled.columns) # Pass feature names for importance plot
-    print("Model evaluation complete.")
 
-    # 5. Save Model and Scaler
-    print("Saving model and scaler...")
-    joblib.dump(best_model, 'models/trained_models/flood_prediction_model_v1.pkl')
-    joblib.dump(scaler, 'models/trained_models/feature_scaler_v1.pkl')
-    print("Model and scaler saved.")
+def main(persist: bool = False, analyze: bool = False, show_plots: bool = False, source: str = None,
+         split_date: str = DEFAULT_SPLIT_DATE, backtest: bool = False, figures: bool = True,
+         force: tuple = (), use_cache: bool = True, cache_dir: str = PIPELINE_CACHE_DIR, search: str = "halving"):
+    stages = build_stages(persist=persist, analyze_data=analyze, show_plots=show_plots, source=source,
+                          split_date=split_date, run_backtest=backtest, figures=figures, search=search)
+    outputs = run_stages(stages, cache_dir=cache_dir, force=tuple(force), use_cache=use_cache, load=("publish",))
+    print(f"Model and scaler saved as version {outputs['publish']}.")
+    return outputs
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Flood prediction training pipeline")
+    parser.add_argument("--persist", action="store_true", help="write the daily records to MongoDB")
+    parser.add_argument("--analyze", action="store_true", help="print correlations and domain notes")
+    parser.add_argument("--show-plots", action="store_true", help="with --analyze, open the plots interactively")
+    parser.add_argument("--source", help="train from 'mongodb' or a processed CSV/Parquet file instead of fetching")
+    parser.add_argument("--split-date", default=DEFAULT_SPLIT_DATE, help="first day of the holdout test set")
+    parser.add_argument("--search", choices=SEARCH_STRATEGIES, default="halving",
+                        help="hyperparameter search strategy (see src.tuning.ForestSearch)")
+    parser.add_argument("--backtest", action="store_true", help="also run the walk-forward backtest")
+    parser.add_argument("--skip-figures", action="store_true", help="write the evaluation metrics without rendering figures")
+    parser.add_argument("--force", nargs="*", default=[], metavar="STAGE",
+                        help="rerun these stages even if cached ('all' reruns everything)")
+    parser.add_argument("--no-cache", action="store_true", help="run every stage (outputs are still cached)")
+    args = parser.parse_args()
+    main(persist=args.persist, analyze=args.analyze, show_plots=args.show_plots, source=args.source,
+         split_date=args.split_date, backtest=args.backtest, figures=not args.skip_figures,
+         force=args.force, use_cache=not args.no_cache, search=args.search)
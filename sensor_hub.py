@@ -0,0 +1,310 @@
+import os
+import sys
+import json
+import time
+import selectors
+import threading
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import serial
+
+from read_serial import (
+    BAUDRATE,
+    SERIAL_URL,
+    RECONNECT_MIN_DELAY,
+    RECONNECT_MAX_DELAY,
+    FrameParser,
+    SensorReading,
+    SensorState,
+    is_alert,
+    readings_to_series,
+)
+from src.sensor_store import SensorStore
+
+# --- Constantes -------------------------------------------------------------
+
+CONFIG_PATH = os.environ.get("SENSOR_HUB_CONFIG", "sensors.json")
+# Tempo máximo de espera do select por tick (segundos)
+POLL_INTERVAL = 0.05
+# Janela usada para calcular a taxa de leituras por sensor (segundos)
+RATE_WINDOW = 5.0
+# Conexões (TCP/RFC2217 podem demorar) são abertas fora do loop de leitura
+CONNECT_WORKERS = 4
+READ_CHUNK = 4096
+
+
+def load_sensor_config(path: str = CONFIG_PATH) -> list:
+    """
+    Loads the sensor list from a JSON file.
+
+    The file holds a list of ``{"id": ..., "url": ..., "baudrate": ...}``
+    objects. Without a config file the hub falls back to the single
+    Wokwi sensor in ``read_serial.SERIAL_URL``.
+    """
+    if not os.path.exists(path):
+        return [{"id": "default", "url": SERIAL_URL, "baudrate": BAUDRATE}]
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class SensorChannel:
+    """Connection, parser, latest state and counters for one sensor."""
+
+    def __init__(self, sensor_id: str, url: str, baudrate: int = BAUDRATE):
+        self.sensor_id = sensor_id
+        self.url = url
+        self.baudrate = baudrate
+        self.state = SensorState()
+        self.serial = None
+        self.fd = None
+        self.parser = FrameParser()
+        self.connecting = None
+        self.next_retry = 0.0
+        self.backoff = RECONNECT_MIN_DELAY
+
+        self.last_seen = None
+        self.readings = 0
+        self.errors = 0
+        self.connections = 0
+        self.rate = 0.0
+        self._rate_count = 0
+        self._rate_since = time.monotonic()
+
+    def attach(self, ser):
+        self.serial = ser
+        # Portas locais (serial, pty) têm descritor e entram no selector;
+        # rfc2217:// e loop:// são consultados via in_waiting a cada tick.
+        try:
+            self.fd = ser.fileno()
+        except (AttributeError, NotImplementedError, OSError, ValueError):
+            self.fd = None
+
+    def fail(self, error, now: float):
+        self.errors += 1
+        self.state.set_connected(False, error)
+        if self.serial is not None:
+            try:
+                self.serial.close()
+            except Exception:
+                pass
+        self.serial = None
+        self.fd = None
+        self.parser.reset()
+        self.next_retry = now + self.backoff
+        self.backoff = min(self.backoff * 2, RECONNECT_MAX_DELAY)
+
+    def update_rate(self, now: float):
+        elapsed = now - self._rate_since
+        if elapsed >= RATE_WINDOW:
+            self.rate = self._rate_count / elapsed
+            self._rate_count = 0
+            self._rate_since = now
+
+    def stats(self) -> dict:
+        return {
+            "sensor_id": self.sensor_id,
+            "url": self.url,
+            "connected": self.serial is not None,
+            "last_seen": self.last_seen,
+            "readings": self.readings,
+            "readings_per_second": round(self.rate, 3),
+            "errors": self.errors,
+            "rejected_frames": self.parser.rejected,
+            "connections": self.connections,
+        }
+
+
+class SensorHub(threading.Thread):
+    """
+    Single thread that multiplexes reads from many serial/RFC2217 sensors.
+
+    Ports with a file descriptor are waited on with ``selectors``; the others
+    are drained without blocking on every tick. Opening a connection runs in a
+    small pool so a dead host never stalls the read loop, and every reading
+    is stamped with its sensor id and, when a ``store`` is given, appended to
+    that sensor's ring buffer.
+    """
+
+    def __init__(self, sensors: list, store: SensorStore = None, on_reading=None,
+                 poll_interval: float = POLL_INTERVAL):
+        super().__init__(name="sensor-hub", daemon=True)
+        self.channels = {
+            cfg["id"]: SensorChannel(cfg["id"], cfg["url"], cfg.get("baudrate", BAUDRATE))
+            for cfg in sensors
+        }
+        self.store = store
+        self.on_reading = on_reading
+        self.poll_interval = poll_interval
+        self._selector = selectors.DefaultSelector()
+        self._connector = ThreadPoolExecutor(max_workers=CONNECT_WORKERS, thread_name_prefix="sensor-connect")
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def snapshot(self) -> dict:
+        return {sensor_id: ch.state.snapshot() for sensor_id, ch in self.channels.items()}
+
+    def stats(self) -> list:
+        return [ch.stats() for ch in self.channels.values()]
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                now = time.monotonic()
+                self._manage_connections(now)
+
+                polled = [ch for ch in self.channels.values() if ch.serial is not None and ch.fd is None]
+                timeout = 0 if polled else self.poll_interval
+                if self._selector.get_map():
+                    for key, _ in self._selector.select(timeout):
+                        self._read(key.data, now)
+                elif not polled:
+                    self._stop_event.wait(self.poll_interval)
+
+                for ch in polled:
+                    self._read(ch, now)
+                if polled:
+                    self._stop_event.wait(self.poll_interval)
+
+                for ch in self.channels.values():
+                    ch.update_rate(now)
+        finally:
+            self._connector.shutdown(wait=False, cancel_futures=True)
+            for ch in self.channels.values():
+                if ch.serial is not None:
+                    ch.serial.close()
+            self._selector.close()
+
+    def _open(self, ch: SensorChannel):
+        return serial.serial_for_url(ch.url, baudrate=ch.baudrate, timeout=0)
+
+    def _manage_connections(self, now: float):
+        for ch in self.channels.values():
+            if ch.connecting is not None:
+                if not ch.connecting.done():
+                    continue
+                future, ch.connecting = ch.connecting, None
+                try:
+                    ch.attach(future.result())
+                except Exception as e:
+                    print(f"Erro ao conectar no sensor {ch.sensor_id}:", e)
+                    ch.fail(e, now)
+                    continue
+                ch.connections += 1
+                ch.backoff = RECONNECT_MIN_DELAY
+                ch.state.set_connected(True)
+                if ch.fd is not None:
+                    self._selector.register(ch.fd, selectors.EVENT_READ, ch)
+            elif ch.serial is None and now >= ch.next_retry:
+                ch.connecting = self._connector.submit(self._open, ch)
+
+    def _read(self, ch: SensorChannel, now: float):
+        try:
+            data = ch.serial.read(READ_CHUNK if ch.fd is not None else max(ch.serial.in_waiting, 1))
+        except Exception as e:
+            print(f"Erro no sensor {ch.sensor_id}:", e)
+            self._unregister(ch)
+            ch.fail(e, now)
+            return
+        if not data:
+            return
+
+        readings = ch.parser.feed(data)
+        if not len(readings):
+            return
+        ch.readings += len(readings)
+        ch._rate_count += len(readings)
+        ch.last_seen = time.time()
+        if self.store is not None:
+            self.store.record(ch.sensor_id, *readings_to_series(readings, ch.last_seen))
+
+        latest = SensorReading(*readings[-1].tolist())
+        ch.state.publish({"sensor_id": ch.sensor_id, **latest._asdict()}, is_alert(latest.distance_cm))
+        if self.on_reading is not None:
+            self.on_reading(ch.sensor_id, readings)
+
+    def _unregister(self, ch: SensorChannel):
+        if ch.fd is not None:
+            try:
+                self._selector.unregister(ch.fd)
+            except (KeyError, ValueError):
+                pass
+
+
+# --- Teste de carga local ---------------------------------------------------
+
+def _frame(seq: int, millis: int, distance_cm: int) -> bytes:
+    payload = b"%05d,%010d,%04d" % (seq % 65536, millis, distance_cm)
+    checksum = 0
+    for byte in payload:
+        checksum ^= byte
+    return b"$" + payload + b"*%02X\r\n" % checksum
+
+
+def _load_test(n_sensors: int, seconds: float, rate: float, use_pty: bool, dead: int):
+    """Feeds synthetic frames to N local stand-ins and prints per-sensor stats."""
+    sensors, writers = [], []
+    for i in range(n_sensors):
+        if use_pty:
+            master, slave = os.openpty()
+            sensors.append({"id": f"pty-{i}", "url": os.ttyname(slave)})
+            writers.append(lambda data, fd=master: os.write(fd, data))
+        else:
+            sensors.append({"id": f"loop-{i}", "url": "loop://"})
+    for i in range(dead):
+        # Porta fechada: o sensor nunca conecta e não pode travar os demais
+        sensors.append({"id": f"dead-{i}", "url": "rfc2217://127.0.0.1:9"})
+
+    store = SensorStore()
+    hub = SensorHub(sensors, store=store)
+    hub.start()
+    if not use_pty:
+        while any(hub.channels[f"loop-{i}"].serial is None for i in range(n_sensors)):
+            time.sleep(0.01)
+        writers = [hub.channels[f"loop-{i}"].serial.write for i in range(n_sensors)]
+
+    start = time.monotonic()
+    seq = 0
+    while time.monotonic() - start < seconds:
+        millis = int((time.monotonic() - start) * 1000)
+        for write in writers:
+            write(_frame(seq, millis, 100 + seq % 300))
+        seq += 1
+        time.sleep(1.0 / rate)
+
+    time.sleep(RATE_WINDOW if seconds >= RATE_WINDOW else 0.2)
+    hub.stop()
+    hub.join()
+    total = sum(s["readings"] for s in hub.stats())
+    for s in hub.stats():
+        print(s)
+    print(store.summary(sensors[0]["id"])["1min"])
+    print(f"{total} leituras de {n_sensors} sensores em {seconds:.1f}s "
+          f"({total / seconds:.0f} leituras/s; {seq} quadros enviados por sensor)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hub de sensores de nível de água")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--load-test", type=int, metavar="N", help="simula N sensores locais")
+    parser.add_argument("--pty", action="store_true", help="usa pseudo-terminais em vez de loop://")
+    parser.add_argument("--dead", type=int, default=1, help="sensores inalcançáveis no teste de carga")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--rate", type=float, default=5.0, help="quadros por segundo por sensor")
+    args = parser.parse_args()
+
+    if args.load_test:
+        _load_test(args.load_test, args.seconds, args.rate, args.pty, args.dead)
+        sys.exit(0)
+
+    hub = SensorHub(load_sensor_config(args.config), store=SensorStore())
+    hub.start()
+    try:
+        while True:
+            time.sleep(5)
+            for s in hub.stats():
+                print(s)
+    except KeyboardInterrupt:
+        print("Parado pelo usuário.")
+        hub.stop()
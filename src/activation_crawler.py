@@ -0,0 +1,293 @@
+import asyncio
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from urllib.parse import urljoin, urlsplit
+import aiohttp
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from src.data_ingestion import BASE, HTML_PARSER, USER_AGENT, parse_activation
+from src.processed_data import read_processed, write_processed
+
+# Lista de ativações já conhecidas (sementes) e página índice do Charter
+SEEDS_FILE = "desastres.json"
+INDEX_URL = f"{BASE}/activations"
+CRAWL_DIR = "data/raw/activations"
+RECORDS_FILE = "activations.parquet"
+VALIDATORS_FILE = "validators.json"
+PAGES_DIR = "pages"
+
+MAX_CONCURRENCY = 8
+# Requisições por segundo por host: educado com o site do Charter
+REQUESTS_PER_SECOND_PER_HOST = 2.0
+MAX_INDEX_PAGES = 50
+REQUEST_TIMEOUT = 20
+
+# Chaves do <dl> de cada ativação usadas no registro normalizado
+DL_FIELDS = {
+    "activation_id": "Activation ID",
+    "hazard_type": "Type of event",
+    "country": "Location of event",
+    "date": "Date of Charter Activation",
+}
+AREA_FIELDS = ("Affected area", "Area of event", "Region")
+_ACTIVATION_ID = re.compile(r"activation-(\d+)")
+
+
+class HostRateLimiter:
+    """Spaces requests to the same host at least ``1 / rate`` seconds apart (asyncio)."""
+
+    def __init__(self, rate: float = REQUESTS_PER_SECOND_PER_HOST):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = {}
+        self._locks = defaultdict(asyncio.Lock)
+
+    async def wait(self, url: str):
+        host = urlsplit(url).netloc
+        async with self._locks[host]:
+            now = asyncio.get_running_loop().time()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class ValidatorStore:
+    """
+    ETag / Last-Modified of every fetched page plus the saved HTML.
+
+    A page is re-requested with ``If-None-Match`` / ``If-Modified-Since``;
+    on 304 its saved copy is parsed again, so unchanged pages cost one empty
+    response.
+    """
+
+    def __init__(self, crawl_dir: str = CRAWL_DIR):
+        self.crawl_dir = crawl_dir
+        self.path = os.path.join(crawl_dir, VALIDATORS_FILE)
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.entries = json.load(f)
+
+    def page_path(self, url: str) -> str:
+        # A query entra no nome: páginas do índice (?page=N) não podem compartilhar arquivo
+        parts = urlsplit(url)
+        slug = re.sub(r"[^A-Za-z0-9_-]+", "_", f"{parts.path.strip('/')}?{parts.query}".rstrip("?")) or "index"
+        return os.path.join(self.crawl_dir, PAGES_DIR, f"{slug}.html")
+
+    def headers(self, url: str) -> dict:
+        entry = self.entries.get(url)
+        if not entry or not os.path.exists(self.page_path(url)):
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def saved(self, url: str) -> str:
+        with open(self.page_path(url), encoding="utf-8") as f:
+            return f.read()
+
+    def save(self, url: str, html: str, response_headers):
+        path = self.page_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+        self.entries[url] = {"etag": response_headers.get("ETag"),
+                             "last_modified": response_headers.get("Last-Modified")}
+
+    def flush(self):
+        os.makedirs(self.crawl_dir, exist_ok=True)
+        with open(f"{self.path}.tmp", "w") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(f"{self.path}.tmp", self.path)
+
+
+def load_seeds(path: str = SEEDS_FILE) -> list:
+    """Activation URLs from ``desastres.json`` (``baseUrl`` + ``event``)."""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    return [urljoin(entry["baseUrl"], entry["event"]) for entry in entries.values()]
+
+
+def parse_index(html: str, index_url: str) -> tuple:
+    """
+    Activation links on an index page and the next index page, if any.
+
+    Returns:
+        tuple: ``(activation_urls, next_page_url_or_None)``.
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    index_path = urlsplit(index_url).path.rstrip("/")
+    links = []
+    for a in soup.find_all("a", href=True):
+        url = urljoin(index_url, a["href"]).split("#")[0]
+        path = urlsplit(url).path.rstrip("/")
+        if path.startswith(f"{index_path}/") and path != index_path:
+            links.append(url)
+    next_link = soup.find("a", rel="next")
+    return list(dict.fromkeys(links)), urljoin(index_url, next_link["href"]) if next_link else None
+
+
+def normalize_activation(url: str, parsed: dict) -> dict:
+    """
+    One activation record: id, url, title, activation date, country, hazard type and area.
+    """
+    metadata = dict(parsed["metadata"] or [])
+    title = parsed["activation"].get("title")
+    # "Activation ID: 875" no <dl>, ou o sufixo "activation-875" da URL
+    match = re.search(r"(\d+)", metadata.get(DL_FIELDS["activation_id"]) or "") or _ACTIVATION_ID.search(url)
+    hazard = metadata.get(DL_FIELDS["hazard_type"])
+    area = next((metadata[key] for key in AREA_FIELDS if metadata.get(key)), None)
+    if area is None and title and " in " in title:
+        # Sem campo de área no <dl>: usa o trecho do título após " in " (ex.: "North Region of Brazil")
+        area = title.rsplit(" in ", 1)[1].strip()
+    date = metadata.get(DL_FIELDS["date"]) or parsed["activation"].get("date")
+    return {
+        "activation_id": int(match.group(1)) if match else None,
+        "url": url,
+        "title": title,
+        "date": pd.to_datetime(date, errors="coerce", utc=True).normalize() if date else pd.NaT,
+        "country": metadata.get(DL_FIELDS["country"]),
+        "hazard_type": ", ".join(part.strip().lower() for part in re.split(r"[,/;]", hazard)) if hazard else None,
+        "area": area,
+    }
+
+
+async def _fetch(session: aiohttp.ClientSession, limiter: HostRateLimiter, validators: ValidatorStore,
+                 url: str, stats: dict) -> str:
+    """Conditional GET; returns the page HTML (the saved copy on 304)."""
+    await limiter.wait(url)
+    async with session.get(url, headers=validators.headers(url)) as response:
+        if response.status == 304:
+            html = validators.saved(url)
+            stats["not_modified"] += 1
+            return html
+        response.raise_for_status()
+        html = await response.text(encoding=response.charset or "utf-8")
+        validators.save(url, html, response.headers)
+        stats["downloaded"] += 1
+        return html
+
+
+async def crawl_activations_async(seeds: list = None, index_url: str = INDEX_URL, crawl_dir: str = CRAWL_DIR,
+                                  concurrency: int = MAX_CONCURRENCY,
+                                  rate: float = REQUESTS_PER_SECOND_PER_HOST,
+                                  max_index_pages: int = MAX_INDEX_PAGES) -> pd.DataFrame:
+    """
+    Crawls the activations index and every activation page into a Parquet store.
+
+    The index pages (following ``rel="next"``) are walked first; their links
+    and ``seeds`` are then fetched by ``concurrency`` workers sharing one
+    connection pool, rate-limited per host. Re-crawls send conditional
+    requests, so only changed pages are downloaded. A page that fails keeps
+    its saved copy, if any; otherwise it is counted as failed and skipped,
+    and the validators are saved even if the crawl is interrupted.
+
+    Args:
+        seeds (list, optional): Activation URLs to include (defaults to ``desastres.json``).
+        index_url (str, optional): First index page; None crawls only the seeds.
+        crawl_dir (str): Store directory (records, saved pages and validators).
+        concurrency (int): Pages fetched at the same time.
+        rate (float): Requests per second per host.
+        max_index_pages (int): Upper bound on followed index pages.
+
+    Returns:
+        pd.DataFrame: The normalized records, also written to ``<crawl_dir>/activations.parquet``.
+    """
+    seeds = load_seeds() if seeds is None else list(seeds)
+    validators = ValidatorStore(crawl_dir)
+    limiter = HostRateLimiter(rate)
+    stats = {"downloaded": 0, "not_modified": 0, "failed": 0}
+    records = []
+    start = time.perf_counter()
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    try:
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers={"User-Agent": USER_AGENT}) as session:
+            urls = list(seeds)
+            page, pages = index_url, 0
+            while page and pages < max_index_pages:
+                try:
+                    links, page = parse_index(await _fetch(session, limiter, validators, page, stats), page)
+                    urls.extend(links)
+                except Exception as e:
+                    # Rede, decodificação ou parse: o índice para aqui, as sementes seguem
+                    print(f"Índice indisponível ({type(e).__name__}: {e}); seguindo só com as sementes.")
+                    stats["failed"] += 1
+                    page = None
+                pages += 1
+
+            queue = asyncio.Queue()
+            for url in dict.fromkeys(urls):
+                queue.put_nowait(url)
+
+            async def page_html(url: str) -> str:
+                try:
+                    return await _fetch(session, limiter, validators, url, stats)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    if not os.path.exists(validators.page_path(url)):
+                        raise
+                    # Rede indisponível: reaproveita a cópia salva
+                    stats["failed"] += 1
+                    return validators.saved(url)
+
+            async def worker():
+                while True:
+                    try:
+                        url = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    try:
+                        records.append(normalize_activation(url, parse_activation(await page_html(url))))
+                    except Exception as e:
+                        # Uma página com erro (rede, decodificação, parse, cópia do 304 ausente) não interrompe as outras
+                        stats["failed"] += 1
+                        print(f"Falha em {url}: {type(e).__name__}: {e}")
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        # Validadores das páginas já salvas são gravados mesmo se o crawl for interrompido
+        validators.flush()
+
+    df = pd.DataFrame(records, columns=["activation_id", "url", "title", "date", "country", "hazard_type", "area"])
+    df["activation_id"] = df["activation_id"].astype("Int64")
+    df = df.sort_values(["date", "url"], kind="stable").set_index("date")
+    path = write_processed(df, os.path.join(crawl_dir, RECORDS_FILE))
+    print(f"{len(df)} ativações em {path}: {stats['downloaded']} baixadas, {stats['not_modified']} sem mudança "
+          f"(304), {stats['failed']} falhas, {time.perf_counter() - start:.1f}s.")
+    return df
+
+
+def crawl_activations(**kwargs) -> pd.DataFrame:
+    """Synchronous wrapper of ``crawl_activations_async``."""
+    return asyncio.run(crawl_activations_async(**kwargs))
+
+
+def load_activations(path: str = os.path.join(CRAWL_DIR, RECORDS_FILE), hazard: str = None,
+                     country: str = None) -> pd.DataFrame:
+    """
+    Reads the activation records, optionally only one hazard type / country.
+
+    E.g. ``load_activations(hazard="flood", country="Brazil")`` gives the
+    historic flood activations, indexed by date.
+    """
+    df = read_processed(path)
+    if hazard:
+        df = df[df["hazard_type"].fillna("").str.contains(hazard.lower(), regex=False)]
+    if country:
+        df = df[df["country"].fillna("").str.contains(country, case=False, regex=False)]
+    return df
+
+
+if __name__ == "__main__":
+    crawl_activations()
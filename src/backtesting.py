@@ -0,0 +1,145 @@
+import json
+import os
+import tempfile
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.preprocessing import StandardScaler
+
+# Parâmetros do modelo em produção (melhor configuração da busca em model_training)
+DEFAULT_MODEL_PARAMS = {"n_estimators": 50, "class_weight": "balanced", "random_state": 42}
+REPORTS_DIR = "reports"
+BACKTEST_FOLDS_FILE = "backtest_folds.csv"
+BACKTEST_SUMMARY_FILE = "backtest_summary.json"
+
+
+def walk_forward_origins(dates: pd.DatetimeIndex, min_train: str = "365D", horizon: str = "90D",
+                         step: str = "30D") -> list:
+    """
+    Forecast origins for a walk-forward backtest.
+
+    Each origin ``t`` trains on days before ``t`` and tests on ``[t, t + horizon)``.
+    The first origin leaves ``min_train`` of history; later ones advance by
+    ``step`` while a full horizon still fits in the data.
+
+    Returns:
+        list: ``(origin, test_end)`` timestamp pairs.
+    """
+    first, last = dates.min(), dates.max()
+    origins = []
+    origin = first + pd.Timedelta(min_train)
+    while origin + pd.Timedelta(horizon) <= last + pd.Timedelta(days=1):
+        origins.append((origin, origin + pd.Timedelta(horizon)))
+        origin += pd.Timedelta(step)
+    return origins
+
+
+def _fold_metrics(y_true: np.ndarray, y_pred: np.ndarray, y_proba: np.ndarray) -> dict:
+    # Origens sem enchente no período de teste (ou sem alertas) ficam NaN e não entram nas médias
+    both_classes = len(np.unique(y_true)) == 2
+    return {
+        "recall": recall_score(y_true, y_pred, zero_division=np.nan),
+        "precision": precision_score(y_true, y_pred, zero_division=np.nan),
+        "f1": f1_score(y_true, y_pred, zero_division=np.nan),
+        "roc_auc": roc_auc_score(y_true, y_proba) if both_classes else np.nan,
+    }
+
+
+def _run_fold(X: np.ndarray, y: np.ndarray, timestamps: np.ndarray, origin, test_end, train_window,
+              model_params: dict) -> dict:
+    """Trains on the history before ``origin`` and scores ``[origin, test_end)``; X and y arrive memory-mapped."""
+    origin, test_end = np.datetime64(origin), np.datetime64(test_end)
+    train_start = origin - np.timedelta64(train_window) if train_window is not None else timestamps[0]
+    train_mask = (timestamps >= train_start) & (timestamps < origin)
+    test_mask = (timestamps >= origin) & (timestamps < test_end)
+    # Mesmo pré-processamento de model_training: scaler ajustado só no treino
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X[train_mask])
+    X_test = scaler.transform(X[test_mask])
+    y_train, y_test = y[train_mask], y[test_mask]
+
+    row = {"origin": str(pd.Timestamp(origin).date()), "test_end": str(pd.Timestamp(test_end).date()),
+           "n_train": int(train_mask.sum()), "n_test": int(test_mask.sum()),
+           "positives_train": int(y_train.sum()), "positives_test": int(y_test.sum())}
+    if len(np.unique(y_train)) < 2:
+        # Sem enchentes no histórico não há o que aprender nesta origem
+        return {**row, "recall": np.nan, "precision": np.nan, "f1": np.nan, "roc_auc": np.nan}
+
+    # Um núcleo por fold: o paralelismo fica entre as origens
+    model = RandomForestClassifier(**{**model_params, "n_jobs": 1}).fit(X_train, y_train)
+    probabilities = model.predict_proba(X_test)
+    y_proba = probabilities[:, list(model.classes_).index(1)]
+    y_pred = model.classes_[probabilities.argmax(axis=1)]
+    return {**row, **_fold_metrics(y_test, y_pred, y_proba)}
+
+
+def walk_forward_backtest(df: pd.DataFrame, target: str = "flood_event", min_train: str = "365D",
+                          horizon: str = "90D", step: str = "30D", train_window: str = None,
+                          model_params: dict = None, n_jobs: int = -1, reports_dir: str = REPORTS_DIR) -> tuple:
+    """
+    Walk-forward backtest of the flood model over rolling forecast origins.
+
+    The feature matrix is dumped once to a temporary file and memory-mapped,
+    so the ``joblib`` workers share it instead of each receiving a pickled copy.
+
+    Args:
+        df (pd.DataFrame): Engineered features plus ``target``, with a DatetimeIndex.
+        target (str): Target column.
+        min_train (str): History before the first origin (pandas offset, e.g. '365D').
+        horizon (str): Test period after each origin.
+        step (str): Distance between consecutive origins.
+        train_window (str, optional): Rolling training window; None trains on all
+                                      history before the origin (expanding window).
+        model_params (dict, optional): RandomForestClassifier parameters.
+        n_jobs (int): Parallel folds (-1 uses every core).
+        reports_dir (str, optional): Where to write ``backtest_folds.csv`` and ``backtest_summary.json``.
+
+    Returns:
+        tuple: A tuple containing:
+               - folds (pd.DataFrame): One row of metrics per origin.
+               - summary (dict): Mean, std, min and max of each metric over the folds.
+    """
+    df = df.sort_index()
+    X = df.drop(columns=target).to_numpy(dtype=np.float64)
+    y = df[target].to_numpy(dtype=np.int64)
+    timestamps = df.index.tz_convert(None).to_numpy() if df.index.tz is not None else df.index.to_numpy()
+    origins = walk_forward_origins(df.index, min_train, horizon, step)
+    if not origins:
+        raise ValueError(f"Not enough data for a {min_train} history and a {horizon} horizon.")
+    origins = [(o.tz_convert(None) if o.tz else o, e.tz_convert(None) if e.tz else e) for o, e in origins]
+    window = pd.Timedelta(train_window).to_timedelta64() if train_window else None
+    params = {**DEFAULT_MODEL_PARAMS, **(model_params or {})}
+
+    print(f"Walk-forward backtest: {len(origins)} origins, horizon {horizon}, step {step}.")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "backtest_data.joblib")
+        joblib.dump((X, y, timestamps), path)
+        X_shared, y_shared, ts_shared = joblib.load(path, mmap_mode="r")
+        rows = Parallel(n_jobs=n_jobs)(
+            delayed(_run_fold)(X_shared, y_shared, ts_shared, origin, test_end, window, params)
+            for origin, test_end in origins)
+
+    folds = pd.DataFrame(rows)
+    metrics = ["recall", "precision", "f1", "roc_auc"]
+    summary = {
+        "origins": len(folds),
+        "horizon": horizon,
+        "step": step,
+        "train_window": train_window or "expanding",
+        **{metric: {stat: (None if pd.isna(v) else float(v))
+                    for stat, v in folds[metric].agg(["mean", "std", "min", "max"]).items()}
+           for metric in metrics},
+    }
+    print(folds[["origin", "n_train", "positives_test"] + metrics].to_string(index=False))
+    print(f"Mean recall over origins: {summary['recall']['mean']}")
+
+    if reports_dir:
+        os.makedirs(reports_dir, exist_ok=True)
+        folds.to_csv(os.path.join(reports_dir, BACKTEST_FOLDS_FILE), index=False)
+        with open(os.path.join(reports_dir, BACKTEST_SUMMARY_FILE), "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Backtest report saved to {reports_dir}/{BACKTEST_FOLDS_FILE} and {BACKTEST_SUMMARY_FILE}")
+    return folds, summary
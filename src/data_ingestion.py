@@ -1,20 +1,61 @@
+import csv
+import functools
 import os
-import time
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+import requests
 from bs4 import BeautifulSoup
-import csv
 
-def load_raw_data():
-    # --- CONFIGURATION ---
-    BASE = "https://disasterscharter.org"
-    PAGE = f"{BASE}/activations/flood-in-brazil-activation-875-"
-    OUTPUT_DIR = f"./data/raw/flood-in-brazil"
+from src.http_session import make_session
+
+# --- CONFIGURATION ---
+BASE = "https://disasterscharter.org"
+PAGE = f"{BASE}/activations/flood-in-brazil-activation-875-"
+OUTPUT_DIR = "./data/raw/flood-in-brazil"
+# Cópia do HTML baixado: permite reprocessar a página offline (modo "fixture")
+SNAPSHOT_FILE = "page.html"
+
+# "auto" tenta HTTP e só abre o navegador se a página vier sem o conteúdo;
+# "http", "selenium" e "fixture" forçam um caminho
+INGESTION_MODE = os.environ.get("INGESTION_MODE", "auto")
+HTTP_TIMEOUT = 15
+HTTP_RETRIES = 3
+HTTP_POOL_SIZE = 4
+# Espera explícita (segundos) pelo conteúdo no fallback com Selenium
+ELEMENT_WAIT_TIMEOUT = 15
+# lxml é bem mais rápido que o html.parser embutido
+HTML_PARSER = "lxml"
+USER_AGENT = "Mozilla/5.0 (compatible; flood-alert-ingestion/1.0)"
+
+
+@functools.lru_cache(maxsize=1)
+def get_http_session() -> requests.Session:
+    """Pooled keep-alive session with retries, created once per process."""
+    return make_session(HTTP_POOL_SIZE, HTTP_RETRIES, user_agent=USER_AGENT)
+
+
+def fetch_page_http(url: str = PAGE) -> str:
+    """Downloads the page with a plain HTTP request (no browser)."""
+    response = get_http_session().get(url, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    if "charset" not in response.headers.get("Content-Type", ""):
+        # Sem charset declarado o requests assume ISO-8859-1 e corrompe os acentos
+        response.encoding = "utf-8"
+    return response.text
+
 
-    # create output directory
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+def fetch_page_selenium(url: str = PAGE, wait_for: str = "article") -> str:
+    """
+    Renders the page in headless Chrome and returns its HTML.
+
+    Waits until an element matching the CSS selector ``wait_for`` is present
+    instead of sleeping a fixed time. The driver is resolved by Selenium
+    Manager, which caches it instead of reinstalling it on every run.
+    """
+    # Importação tardia: o navegador é só um fallback
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
 
     # Configura o Selenium para rodar sem abrir janela
     chrome_options = Options()
@@ -22,25 +63,30 @@ def load_raw_data():
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
 
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-    driver.get(PAGE)   
+    driver = webdriver.Chrome(options=chrome_options)
+    try:
+        driver.get(url)
+        WebDriverWait(driver, ELEMENT_WAIT_TIMEOUT).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, wait_for)))
+        return driver.page_source
+    finally:
+        driver.quit()
+
 
-    # Espera a página carregar
-    time.sleep(3)
+def parse_activation(html: str) -> dict:
+    """
+    Extracts the article text, the activation title/date and the ``<dl>`` metadata.
 
-    # Pega o HTML após carregar tudo
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-    driver.quit()
+    Returns:
+        dict: ``article`` (str or None), ``activation`` (dict) and
+              ``metadata`` (list of (key, value) pairs, or None if the
+              ``<dl>`` is missing or its ``<dt>``/``<dd>`` counts differ).
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
 
     # --- EXTRAÇÃO DO ARTIGO PRINCIPAL ---
     article = soup.find("article")
-    if article:
-        article_text = article.get_text(separator="\n", strip=True)
-        with open(os.path.join(OUTPUT_DIR, "article.txt"), "w", encoding="utf-8") as f:
-            f.write(article_text)
-        print("Artigo salvo em article.txt")
-    else:
-        print("Artigo não encontrado.")
+    article_text = article.get_text(separator="\n", strip=True) if article else None
 
     # --- EXTRAÇÃO DOS DADOS DA ATIVAÇÃO (EXEMPLO: TÍTULO, DATA, ETC) ---
     activation_data = {}
@@ -54,31 +100,100 @@ def load_raw_data():
         activation_data["date"] = time_tag.get("datetime", time_tag.get_text(strip=True))
     # Outros dados podem ser extraídos conforme a estrutura da página
 
-    with open(os.path.join(OUTPUT_DIR, "activation_data.txt"), "w", encoding="utf-8") as f:
-        for k, v in activation_data.items():
-            f.write(f"{k}: {v}\n")
-    print("Dados da ativação salvos em activation_data.txt")
-
     # --- EXTRAÇÃO DO <dl> COMO METADADOS ---
+    metadata = None
     dl_tag = soup.find("dl")
     if dl_tag:
         # Extrai dt e dd em pares
         dt_tags = dl_tag.find_all("dt")
         dd_tags = dl_tag.find_all("dd")
         if len(dt_tags) == len(dd_tags):
-            rows = []
-            for dt, dd in zip(dt_tags, dd_tags):
-                key = dt.get_text(strip=True)
-                value = dd.get_text(separator=" ", strip=True)
-                rows.append((key, value))
-            # Salva como CSV
-            csv_path = os.path.join(OUTPUT_DIR, "metadata_dl.csv")
-            with open(csv_path, "w", encoding="utf-8", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(["Key", "Value"])
-                writer.writerows(rows)
-            print("Elemento <dl> salvo em metadata_dl.csv")
-        else:
-            print("Quantidade de <dt> e <dd> não bate, não foi possível salvar como CSV.")
+            metadata = [(dt.get_text(strip=True), dd.get_text(separator=" ", strip=True))
+                        for dt, dd in zip(dt_tags, dd_tags)]
+
+    return {"article": article_text, "activation": activation_data, "metadata": metadata,
+            "has_dl": dl_tag is not None}
+
+
+def save_activation(parsed: dict, output_dir: str = OUTPUT_DIR):
+    """Writes article.txt, activation_data.txt and metadata_dl.csv."""
+    os.makedirs(output_dir, exist_ok=True)
+
+    if parsed["article"] is not None:
+        with open(os.path.join(output_dir, "article.txt"), "w", encoding="utf-8") as f:
+            f.write(parsed["article"])
+        print("Artigo salvo em article.txt")
+    else:
+        print("Artigo não encontrado.")
+
+    with open(os.path.join(output_dir, "activation_data.txt"), "w", encoding="utf-8") as f:
+        for k, v in parsed["activation"].items():
+            f.write(f"{k}: {v}\n")
+    print("Dados da ativação salvos em activation_data.txt")
+
+    if parsed["metadata"] is not None:
+        # Salva como CSV
+        csv_path = os.path.join(output_dir, "metadata_dl.csv")
+        with open(csv_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Key", "Value"])
+            writer.writerows(parsed["metadata"])
+        print("Elemento <dl> salvo em metadata_dl.csv")
+    elif parsed["has_dl"]:
+        print("Quantidade de <dt> e <dd> não bate, não foi possível salvar como CSV.")
     else:
         print("Elemento <dl> não encontrado.")
+
+
+def load_raw_data(mode: str = INGESTION_MODE, url: str = PAGE, output_dir: str = OUTPUT_DIR,
+                  fixture_path: str = None) -> dict:
+    """
+    Scrapes the Disasters Charter activation page into ``output_dir``.
+
+    Args:
+        mode (str): 'auto' (HTTP, then Selenium if the request fails or the
+                    page comes back without the article), 'http', 'selenium'
+                    or 'fixture' (parse saved HTML, no network).
+        url (str): Activation page.
+        output_dir (str): Where the extracted files and the HTML snapshot go.
+        fixture_path (str, optional): HTML file for 'fixture' mode; defaults
+                                      to the snapshot saved by the last online run.
+
+    Returns:
+        dict: The parsed page (see ``parse_activation``).
+    """
+    if mode == "fixture":
+        path = fixture_path or os.path.join(output_dir, SNAPSHOT_FILE)
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        print(f"Página lida de {path} (offline)")
+        parsed = parse_activation(html)
+    elif mode in ("auto", "http"):
+        try:
+            html = fetch_page_http(url)
+            parsed = parse_activation(html)
+        except requests.RequestException as e:
+            if mode == "http":
+                raise
+            print(f"Falha no download via HTTP ({e}); usando o navegador.")
+            html = None
+        if mode == "auto" and (html is None or parsed["article"] is None):
+            # Conteúdo renderizado por JavaScript: só então abre o navegador
+            html = fetch_page_selenium(url)
+            parsed = parse_activation(html)
+    elif mode == "selenium":
+        html = fetch_page_selenium(url)
+        parsed = parse_activation(html)
+    else:
+        raise ValueError(f"Unknown ingestion mode '{mode}'; expected 'auto', 'http', 'selenium' or 'fixture'.")
+
+    if mode != "fixture":
+        os.makedirs(output_dir, exist_ok=True)
+        with open(os.path.join(output_dir, SNAPSHOT_FILE), "w", encoding="utf-8") as f:
+            f.write(html)
+    save_activation(parsed, output_dir)
+    return parsed
+
+
+if __name__ == "__main__":
+    load_raw_data()
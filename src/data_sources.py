@@ -0,0 +1,210 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pymongo
+
+from src.data_preprocessing import engineer_features
+from src.feature_spec import DEFAULT_FEATURE_SPEC, FeatureSpec
+from src.feature_state import HISTORY_DAYS
+from src.mongo_store import get_daily_collection
+from src.processed_data import read_processed
+
+# Linhas por bloco lido (cursor do MongoDB ou lote do arquivo)
+CHUNK_SIZE = 50_000
+PROCESSED_DATA_PATH = "data/processed/merged_processed_data.parquet"
+TARGET = "flood_event"
+
+
+def _to_utc(values) -> pd.DatetimeIndex:
+    index = pd.DatetimeIndex(pd.to_datetime(values))
+    return index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")
+
+
+def iter_mongo_chunks(collection=None, locations: list = None, start_date=None, end_date=None,
+                      columns: list = None, chunk_size: int = CHUNK_SIZE):
+    """
+    Streams the 'daily' collection as DataFrame chunks.
+
+    The date-range and location filters and the column projection run on
+    the server. The cursor is consumed in batches of ``chunk_size`` documents,
+    so memory is bounded by one chunk rather than the whole history.
+
+    Args:
+        collection: Source collection (defaults to the pooled client's 'daily').
+        locations (list, optional): Location keys (see ``src.locations.location_key``).
+        start_date, end_date (optional): Inclusive date bounds.
+        columns (list, optional): Fields to return besides 'location' and 'date'.
+        chunk_size (int): Documents per yielded DataFrame.
+
+    Yields:
+        pd.DataFrame: Rows ordered by location and date, with 'date' in UTC.
+    """
+    if collection is None:
+        collection = get_daily_collection()
+
+    query = {}
+    if locations:
+        query["location"] = {"$in": list(locations)}
+    if start_date is not None or end_date is not None:
+        query["date"] = {}
+        if start_date is not None:
+            query["date"]["$gte"] = pd.Timestamp(start_date).tz_localize(None).to_pydatetime()
+        if end_date is not None:
+            query["date"]["$lte"] = pd.Timestamp(end_date).tz_localize(None).to_pydatetime()
+    fields = ["location", "date"] + [c for c in (columns or []) if c not in ("location", "date")]
+    projection = {"_id": 0, **{field: 1 for field in fields}} if columns else {"_id": 0}
+
+    cursor = (collection.find(query, projection)
+              .sort([("location", pymongo.ASCENDING), ("date", pymongo.ASCENDING)])
+              .batch_size(chunk_size))
+    batch = []
+    for document in cursor:
+        batch.append(document)
+        if len(batch) == chunk_size:
+            yield _mongo_frame(batch, fields if columns else None)
+            batch = []
+    if batch:
+        yield _mongo_frame(batch, fields if columns else None)
+
+
+def _mongo_frame(documents: list, columns: list) -> pd.DataFrame:
+    frame = pd.DataFrame.from_records(documents, columns=columns)
+    frame["date"] = _to_utc(frame["date"])
+    return frame
+
+
+def _parquet_frame(batch, index_name: str) -> pd.DataFrame:
+    frame = batch.to_pandas()
+    # Com todas as colunas, os metadados do pandas já restauram o índice
+    return frame.set_index(index_name) if index_name in frame.columns else frame
+
+
+def iter_file_chunks(path: str, columns: list = None, start_date=None, end_date=None,
+                     chunk_size: int = CHUNK_SIZE):
+    """
+    Streams a processed CSV or Parquet file as DataFrame chunks indexed by date.
+
+    Only ``columns`` (plus the date) are read: Parquet prunes whole column
+    chunks, CSV skips parsing the other fields.
+    """
+    start = pd.Timestamp(start_date, tz="UTC") if start_date is not None else None
+    end = pd.Timestamp(end_date, tz="UTC") if end_date is not None else None
+
+    if path.endswith(".parquet"):
+        parquet = pq.ParquetFile(path)
+        index_columns = (parquet.schema_arrow.pandas_metadata or {}).get("index_columns", [])
+        index_name = index_columns[0] if index_columns and isinstance(index_columns[0], str) else "date"
+        read_columns = None if columns is None else [index_name] + [c for c in columns if c != index_name]
+        batches = (_parquet_frame(batch, index_name) for batch in parquet.iter_batches(batch_size=chunk_size, columns=read_columns))
+    else:
+        index_name = pd.read_csv(path, nrows=0).columns[0]
+        usecols = None if columns is None else [index_name] + list(columns)
+        batches = pd.read_csv(path, index_col=0, usecols=usecols, chunksize=chunk_size)
+
+    for frame in batches:
+        frame.index = _to_utc(frame.index)
+        frame.index.name = "date"
+        if start is not None:
+            frame = frame[frame.index >= start]
+        if end is not None:
+            frame = frame[frame.index <= end]
+        if len(frame):
+            yield frame
+
+
+def _file_columns(path: str) -> list:
+    # Só o esquema é lido, sem os dados
+    if path.endswith(".parquet"):
+        return pq.read_schema(path).names
+    if path.endswith(".feather"):
+        return pa.ipc.open_file(path).schema.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def conform_to_spec(daily: pd.DataFrame, spec: FeatureSpec = DEFAULT_FEATURE_SPEC, group_by: str = None) -> pd.DataFrame:
+    """
+    Rebuilds the features of ``spec`` from the base daily variables.
+
+    Derived columns already stored in the source (e.g. the legacy
+    ``is_heavy_rain_today`` flags or calendar fields) are discarded and
+    recomputed, so the result always has the schema serving can feed. Spec
+    variables absent from ``daily`` are left out of the spec.
+
+    Args:
+        daily (pd.DataFrame): Daily rows with 'flood_event', dated by a 'date' column or the index.
+        spec (FeatureSpec): Features to build.
+        group_by (str, optional): Location column when ``daily`` holds several locations (dropped).
+
+    Returns:
+        pd.DataFrame: The spec's feature columns plus 'flood_event', indexed by date.
+
+    Raises:
+        ValueError: If 'flood_event' or a variable read by a lag, window or
+                    threshold is missing.
+    """
+    if TARGET not in daily.columns:
+        raise ValueError(f"Training data has no '{TARGET}' column.")
+    available = [var for var in spec.variables if var in daily.columns]
+    dropped = [var for var in spec.variables if var not in available]
+    spec = spec.restricted_to(available)
+    if dropped:
+        print(f"Variáveis ausentes nos dados, fora do modelo: {', '.join(dropped)}")
+
+    keys = [column for column in (group_by, "date") if column and column in daily.columns]
+    df = daily[keys + available + [TARGET]]
+    if "date" not in df.columns:
+        df = df.sort_index(kind="stable")
+    df = engineer_features(df, spec, group_by=group_by)
+    if "date" in df.columns:
+        df = df.set_index("date")
+    return df[spec.feature_names() + [TARGET]]
+
+
+def load_training_frame(source: str = PROCESSED_DATA_PATH, columns: list = None, start_date=None, end_date=None,
+                        locations: list = None, collection=None, spec: FeatureSpec = DEFAULT_FEATURE_SPEC) -> pd.DataFrame:
+    """
+    Loads a training DataFrame (features plus 'flood_event', date index) without network calls.
+
+    Only the base daily variables and the target are read from the source;
+    the features are always rebuilt with ``conform_to_spec``, so the model
+    is trained on exactly the columns the serving code computes.
+
+    Args:
+        source (str): ``"mongodb"`` for the 'daily' collection, or the path of a
+                      processed CSV/Parquet/Feather file.
+        columns (list, optional): Raw daily fields to read (defaults to the
+                                  spec's variables present in the source).
+        start_date, end_date (optional): Inclusive date bounds.
+        locations (list, optional): MongoDB location keys to include.
+        collection: MongoDB collection override (e.g. mongomock).
+        spec (FeatureSpec): Features to build.
+
+    Returns:
+        pd.DataFrame: Rows ordered by date.
+    """
+    # Busca também os dias anteriores ao início, necessários para os lags
+    fetch_start = pd.Timestamp(start_date) - pd.Timedelta(days=HISTORY_DAYS) if start_date is not None else None
+    if source == "mongodb":
+        fields = (list(columns) if columns is not None else list(spec.variables)) + [TARGET]
+        chunks = list(iter_mongo_chunks(collection, locations, fetch_start, end_date, fields))
+        if not chunks:
+            return pd.DataFrame()
+        # Lags e janelas móveis por local, em uma única passada sobre todos os locais
+        df = conform_to_spec(pd.concat(chunks, ignore_index=True), spec, group_by="location")
+    else:
+        if not os.path.exists(source):
+            raise FileNotFoundError(f"Processed data not found: {source}")
+        stored = _file_columns(source)
+        wanted = list(columns) if columns is not None else list(spec.variables)
+        fields = [name for name in wanted if name in stored] + ([TARGET] if TARGET in stored else [])
+        if source.endswith((".parquet", ".feather")):
+            # Filtros de data aplicados na leitura (row groups / arquivo mapeado)
+            daily = read_processed(source, fields, fetch_start, end_date)
+        else:
+            chunks = list(iter_file_chunks(source, fields, fetch_start, end_date))
+            daily = pd.concat(chunks) if chunks else pd.DataFrame(columns=fields)
+        df = conform_to_spec(daily, spec)
+    if start_date is not None:
+        df = df[df.index >= pd.Timestamp(start_date, tz="UTC")]
+    return df.sort_index(kind="stable")
@@ -0,0 +1,282 @@
+import re
+from dataclasses import dataclass, field, replace
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Variáveis diárias do Open-Meteo, na ordem em que são pedidas e usadas pelo modelo
+DAILY_VARIABLES = [
+    "temperature_2m_mean", "temperature_2m_max", "temperature_2m_min",
+    "wind_speed_10m_max", "wind_gusts_10m_max", "wind_direction_10m_dominant",
+    "precipitation_sum", "rain_sum"
+]
+AGGREGATIONS = ("sum", "mean", "max", "min")
+# Limiares (mm) das features binárias de chuva
+HEAVY_RAIN_24H_MM = 80
+EXTREME_RAIN_72H_MM = 200
+CALENDAR_FEATURES = ("month", "day_of_week", "day_of_year", "week_of_year")
+
+_LAG = re.compile(r"^(?P<var>.+)_lag_(?P<lag>\d+)d$")
+_ROLLING = re.compile(r"^(?P<var>.+?)_rolling_(?:(?P<agg>sum|mean|max|min)_)?(?P<window>\d+)d$")
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    """
+    Declarative description of the model's features.
+
+    ``lags`` and ``windows`` map a variable to its lags / window lengths in
+    days; every window is computed for each of ``aggregations`` over the
+    previous days, excluding the current one. ``thresholds`` are binary
+    ``(name, feature, limit)`` flags meaning ``feature > limit``.
+
+    Column order is ``feature_names()``: base variables, lags, rolling
+    windows, thresholds, then calendar fields. Training and serving both
+    build their matrices from it.
+    """
+
+    variables: tuple = tuple(DAILY_VARIABLES)
+    lags: tuple = (("precipitation_sum", (1, 2, 3)),)
+    windows: tuple = (("precipitation_sum", (3, 7)),)
+    aggregations: tuple = ("sum",)
+    thresholds: tuple = (
+        ("is_heavy_rain_24h", "precipitation_sum_lag_1d", HEAVY_RAIN_24H_MM),
+        ("is_extreme_rain_72h", "precipitation_sum_rolling_7d", EXTREME_RAIN_72H_MM),
+    )
+    calendar: tuple = field(default=())
+
+    def derived_names(self) -> list:
+        names = [f"{var}_lag_{lag}d" for var, lags in self.lags for lag in lags]
+        names += [rolling_name(var, window, agg) for var, windows in self.windows
+                  for window in windows for agg in self.aggregations]
+        names += [name for name, _, _ in self.thresholds]
+        return names + list(self.calendar)
+
+    def feature_names(self) -> list:
+        return list(self.variables) + self.derived_names()
+
+    @property
+    def history_days(self) -> int:
+        """Days before the first scored day needed by the longest lag or window."""
+        return max([lag for _, lags in self.lags for lag in lags] +
+                   [window for _, windows in self.windows for window in windows] + [0])
+
+    def restricted_to(self, available) -> "FeatureSpec":
+        """
+        The spec without the base variables absent from ``available``.
+
+        Raises:
+            ValueError: If a lag, window or threshold reads a missing variable.
+        """
+        missing = sorted(var for var in _inputs(self) - set(self.derived_names()) if var not in available)
+        if missing:
+            raise ValueError(f"Variables {missing} are required by the feature spec but missing from the data.")
+        return replace(self, variables=tuple(var for var in self.variables if var in available))
+
+    @classmethod
+    def from_feature_names(cls, feature_names: list) -> "FeatureSpec":
+        """
+        Rebuilds the spec a model was trained with from its feature names.
+
+        Every name must be a daily variable, a lag or rolling window of one
+        (``{var}_lag_{k}d``, ``{var}_rolling_[{agg}_]{w}d``), a calendar field
+        or one of the threshold flags of ``DEFAULT_FEATURE_SPEC``. The lag or
+        window a threshold reads is added to the spec if the names lack it.
+
+        Raises:
+            ValueError: If a name is none of these, so it could not be computed when serving.
+        """
+        known_thresholds = {name: (name, source, limit) for name, source, limit in DEFAULT_FEATURE_SPEC.thresholds}
+        variables, lags, windows, aggregations, thresholds, calendar, unknown = [], {}, {}, [], [], [], []
+
+        def add_derived(name: str) -> bool:
+            lag_match, rolling_match = _LAG.match(name), _ROLLING.match(name)
+            if lag_match and lag_match["var"] in DAILY_VARIABLES:
+                lags.setdefault(lag_match["var"], []).append(int(lag_match["lag"]))
+            elif rolling_match and rolling_match["var"] in DAILY_VARIABLES:
+                windows.setdefault(rolling_match["var"], []).append(int(rolling_match["window"]))
+                agg = rolling_match["agg"] or "sum"
+                if agg not in aggregations:
+                    aggregations.append(agg)
+            else:
+                return False
+            return True
+
+        for name in feature_names:
+            if name in DAILY_VARIABLES:
+                variables.append(name)
+            elif name in known_thresholds:
+                thresholds.append(known_thresholds[name])
+            elif name in CALENDAR_FEATURES:
+                calendar.append(name)
+            elif not add_derived(name):
+                unknown.append(name)
+        if unknown:
+            raise ValueError(f"Features {unknown} are not daily variables or known lag, window, threshold or "
+                             f"calendar features; they cannot be computed when serving.")
+        for _, source, _ in thresholds:
+            # Fonte do limiar calculada mesmo que o modelo não a use como feature
+            if source not in feature_names and source not in DAILY_VARIABLES:
+                add_derived(source)
+        return cls(
+            variables=tuple(variables),
+            lags=tuple((var, tuple(dict.fromkeys(v))) for var, v in lags.items()),
+            windows=tuple((var, tuple(dict.fromkeys(v))) for var, v in windows.items()),
+            aggregations=tuple(aggregations) or ("sum",),
+            thresholds=tuple(thresholds),
+            calendar=tuple(calendar),
+        )
+
+
+DEFAULT_FEATURE_SPEC = FeatureSpec()
+
+
+def rolling_name(var: str, window: int, agg: str = "sum") -> str:
+    # A soma mantém o nome histórico, sem o sufixo da agregação
+    return f"{var}_rolling_{window}d" if agg == "sum" else f"{var}_rolling_{agg}_{window}d"
+
+
+def group_positions(groups) -> np.ndarray:
+    """Position of each row within its group; ``groups`` must be contiguous."""
+    groups = np.asarray(groups)
+    n = len(groups)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    lengths = np.diff(np.r_[starts, n])
+    return np.arange(n) - np.repeat(starts, lengths)
+
+
+def lag(values: np.ndarray, k: int, position: np.ndarray) -> np.ndarray:
+    """``shift(k)`` within each group: NaN for the first ``k`` rows of a group."""
+    out = np.full(len(values), np.nan)
+    if k < len(values):
+        out[k:] = values[:len(values) - k]
+    out[position < k] = np.nan
+    return out
+
+
+def rolling(values: np.ndarray, window: int, agg: str, position: np.ndarray) -> np.ndarray:
+    """
+    ``agg`` over the previous ``window`` rows of the group, excluding the current one.
+
+    Like pandas' ``rolling(window).agg().shift(1)``, a window holding any NaN
+    is NaN. Sums and means come from one cumulative sum; max/min use a strided
+    window view (no copies).
+    """
+    n = len(values)
+    out = np.full(n, np.nan)
+    if window >= n + 1:
+        return out
+    if agg in ("sum", "mean"):
+        # soma(t-w .. t-1) = cum[t] - cum[t-w]; NaN somados como zero e contados à parte
+        cumulative = np.zeros(n + 1)
+        missing = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.nan_to_num(values), out=cumulative[1:])
+        np.cumsum(np.isnan(values), out=missing[1:])
+        out[window:] = cumulative[window:n] - cumulative[:n - window]
+        out[window:][missing[window:n] - missing[:n - window] > 0] = np.nan
+        if agg == "mean":
+            out /= window
+    elif agg in ("max", "min"):
+        # Janela i cobre [i, i+w) e alimenta a linha i+w; max/min propagam NaN
+        views = sliding_window_view(values, window)[:n - window]
+        out[window:] = views.max(axis=1) if agg == "max" else views.min(axis=1)
+    else:
+        raise ValueError(f"Unknown aggregation '{agg}'; expected one of {AGGREGATIONS}.")
+    out[position < window] = np.nan
+    return out
+
+
+def _calendar(name: str, dates: pd.DatetimeIndex) -> np.ndarray:
+    if name == "month":
+        return dates.month.to_numpy()
+    if name == "day_of_week":
+        return dates.dayofweek.to_numpy()
+    if name == "day_of_year":
+        return dates.dayofyear.to_numpy()
+    return dates.isocalendar().week.to_numpy().astype(np.int64)
+
+
+def compute_columns(columns: dict, position: np.ndarray, spec: FeatureSpec = DEFAULT_FEATURE_SPEC,
+                    dates: pd.DatetimeIndex = None) -> dict:
+    """
+    Computes the derived features of ``spec`` over flat, group-contiguous arrays.
+
+    Every feature is one vectorized pass over all groups at once; group
+    boundaries are handled with ``position``.
+
+    Args:
+        columns (dict): Variable name -> 1-D array, rows sorted by group and date.
+        position (np.ndarray): Row position within its group (see ``group_positions``).
+        spec (FeatureSpec): Features to compute.
+        dates (pd.DatetimeIndex, optional): Row dates, required for calendar features.
+
+    Returns:
+        dict: Feature name -> 1-D array, in ``spec.derived_names()`` order.
+    """
+    values = {var: np.asarray(columns[var], dtype=np.float64)
+              for var in {v for v, _ in spec.lags} | {v for v, _ in spec.windows}}
+    features = {}
+    for var, lags in spec.lags:
+        for k in lags:
+            features[f"{var}_lag_{k}d"] = lag(values[var], k, position)
+    for var, windows in spec.windows:
+        for window in windows:
+            for agg in spec.aggregations:
+                features[rolling_name(var, window, agg)] = rolling(values[var], window, agg, position)
+    for name, source, limit in spec.thresholds:
+        source_values = features[source] if source in features else np.asarray(columns[source], dtype=np.float64)
+        features[name] = (source_values > limit).astype(int)
+    for name in spec.calendar:
+        if dates is None:
+            raise ValueError(f"Calendar feature '{name}' needs the row dates.")
+        features[name] = _calendar(name, pd.DatetimeIndex(dates))
+    return features
+
+
+def build_features(df: pd.DataFrame, spec: FeatureSpec = DEFAULT_FEATURE_SPEC, group_by: str = None,
+                   date_column: str = "date") -> pd.DataFrame:
+    """
+    Appends the derived features of ``spec`` to a daily DataFrame.
+
+    Args:
+        df (pd.DataFrame): Daily rows. With ``group_by`` (e.g. 'location') rows
+                           may hold many locations; they are sorted by group and date.
+        spec (FeatureSpec): Features to compute.
+        group_by (str, optional): Column identifying the location.
+        date_column (str): Date column (the index is used if absent).
+
+    Returns:
+        pd.DataFrame: A copy of ``df`` with the derived columns appended in spec order.
+    """
+    if group_by is not None:
+        df = df.sort_values([group_by, date_column], kind="stable")
+        position = group_positions(df[group_by].to_numpy())
+    else:
+        position = np.arange(len(df))
+    dates = df[date_column] if date_column in df.columns else df.index
+    features = compute_columns({name: df[name].to_numpy() for name in df.columns if name in _inputs(spec)},
+                               position, spec, dates if spec.calendar else None)
+    return pd.concat([df, pd.DataFrame(features, index=df.index)], axis=1)
+
+
+def compute_feature_matrix(daily: dict, spec: FeatureSpec = DEFAULT_FEATURE_SPEC,
+                           dates: pd.DatetimeIndex = None) -> dict:
+    """
+    ``compute_columns`` over ``(locations, days)`` arrays, as used by batch serving.
+
+    Returns:
+        dict: The input arrays plus every derived feature, each ``(locations, days)``.
+    """
+    n_locations, n_days = next(iter(daily.values())).shape
+    position = np.tile(np.arange(n_days), n_locations)
+    flat = {name: np.asarray(values).reshape(-1) for name, values in daily.items()}
+    row_dates = None if dates is None else pd.DatetimeIndex(np.tile(pd.DatetimeIndex(dates).to_numpy(), n_locations))
+    derived = compute_columns(flat, position, spec, row_dates)
+    return {**daily, **{name: values.reshape(n_locations, n_days) for name, values in derived.items()}}
+
+
+def _inputs(spec: FeatureSpec) -> set:
+    return ({var for var, _ in spec.lags} | {var for var, _ in spec.windows} |
+            {source for _, source, _ in spec.thresholds})
@@ -0,0 +1,115 @@
+import datetime
+import functools
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+
+from src.feature_spec import DEFAULT_FEATURE_SPEC, FeatureSpec, compute_columns
+
+# Dias de histórico mantidos por local: cobre o maior lag e a maior janela
+HISTORY_DAYS = DEFAULT_FEATURE_SPEC.history_days
+
+
+@functools.lru_cache(maxsize=16)
+def spec_for(feature_names: tuple) -> FeatureSpec:
+    """``FeatureSpec.from_feature_names``, cached per model feature list."""
+    return FeatureSpec.from_feature_names(list(feature_names))
+
+
+def check_servable(feature_names: list, history_days: int = HISTORY_DAYS) -> FeatureSpec:
+    """
+    Spec of ``feature_names``, checked to be computable by a ``LocationFeatureState``.
+
+    Raises:
+        ValueError: If a feature is unknown (see ``FeatureSpec.from_feature_names``)
+            or needs more than ``history_days`` days of history.
+    """
+    spec = spec_for(tuple(feature_names))
+    if spec.history_days > history_days:
+        raise ValueError(f"The model needs {spec.history_days} days of history; "
+                         f"the feature state keeps {history_days}.")
+    return spec
+
+
+class LocationFeatureState:
+    """
+    Last ``history_days`` days of daily weather for one location.
+
+    Appending a day is O(1): the previous day moves into a bounded deque.
+    Features are computed by ``compute_columns`` with the ``FeatureSpec``
+    rebuilt from the model's feature names, over the kept history plus the
+    current day, so lags, every rolling aggregation, thresholds and calendar
+    fields have exactly the training definitions (NaN without enough history).
+    """
+
+    def __init__(self, variables: list, history_days: int = HISTORY_DAYS):
+        self.variables = list(variables)
+        self.history_days = history_days
+        self.day = None
+        self.current = {}
+        self.lock = threading.Lock()
+        self._previous = {var: deque(maxlen=history_days) for var in self.variables}
+
+    def update(self, day: datetime.date, values: dict):
+        """
+        Sets the values for ``day``; it must be the current day (a revision) or the next one.
+        """
+        if self.day is not None and day == self.day:
+            self.current = dict(values)
+            return
+        if self.day is not None and day != self.day + datetime.timedelta(days=1):
+            raise ValueError(f"Feature state is at {self.day}; cannot jump to {day}.")
+        if self.day is not None:
+            self._advance()
+        self.day = day
+        self.current = dict(values)
+
+    def _advance(self):
+        for var in self.variables:
+            self._previous[var].append(float(self.current.get(var, np.nan)))
+
+    def _series(self, var: str) -> np.ndarray:
+        if var not in self._previous:
+            raise KeyError(f"Variable '{var}' is not kept in the feature state.")
+        return np.array([*self._previous[var], float(self.current.get(var, np.nan))])
+
+    def row(self, feature_names: list, out: np.ndarray = None) -> np.ndarray:
+        """Returns the features for the current day, in ``feature_names`` order."""
+        spec = check_servable(feature_names, self.history_days)
+        inputs = {var for var, _ in spec.lags} | {var for var, _ in spec.windows}
+        inputs |= {source for _, source, _ in spec.thresholds if source in self._previous}
+        columns = {var: self._series(var) for var in inputs}
+        n_days = len(next(iter(columns.values()))) if columns else 1
+        dates = pd.date_range(end=self.day, periods=n_days, freq="D") if spec.calendar else None
+        # Só a última posição (o dia atual) é usada
+        derived = compute_columns(columns, np.arange(n_days), spec, dates)
+
+        if out is None:
+            out = np.empty(len(feature_names), dtype=np.float64)
+        for i, name in enumerate(feature_names):
+            out[i] = derived[name][-1] if name in derived else float(self.current.get(name, np.nan))
+        return out
+
+
+class FeatureStateStore:
+    """Thread-safe map of location key to its ``LocationFeatureState``."""
+
+    def __init__(self, variables: list, history_days: int = HISTORY_DAYS):
+        self.variables = list(variables)
+        self.history_days = history_days
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def get(self, key) -> LocationFeatureState:
+        with self._lock:
+            return self._states.get(key)
+
+    def seed(self, key, days: list, rows: list) -> LocationFeatureState:
+        """Builds a state from consecutive ``days`` and their value dicts."""
+        state = LocationFeatureState(self.variables, self.history_days)
+        for day, values in zip(days, rows):
+            state.update(day, values)
+        with self._lock:
+            self._states[key] = state
+        return state
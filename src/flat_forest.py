@@ -0,0 +1,238 @@
+import os
+import numpy as np
+
+# Tolerância da verificação de equivalência com o sklearn na exportação
+EQUIVALENCE_ATOL = 1e-9
+EQUIVALENCE_SAMPLES = 2000
+
+
+class FlatForest:
+    """
+    A fitted ``RandomForestClassifier`` flattened into contiguous numpy arrays.
+
+    All trees share one node table (``feature``, ``threshold``, ``left``,
+    ``right``, ``missing_left`` and per-node class probabilities); ``roots``
+    holds each tree's first node. Leaves point to themselves. A batch is
+    scored by advancing every (sample, tree) cursor one level per vectorized
+    step, dropping cursors as they reach a leaf, and averaging the leaf
+    probabilities exactly like sklearn's ``predict_proba``.
+
+    ``input_dtype`` is float32 for a forest exported as is (sklearn compares
+    float32 inputs); ``fold_scaler`` returns a float64 forest over raw inputs.
+    """
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots, classes, max_depth, n_features,
+                 input_dtype=np.float32):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = int(n_features)
+        self.input_dtype = input_dtype
+
+    @classmethod
+    def from_sklearn(cls, model) -> "FlatForest":
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            own = np.arange(offset, offset + n, dtype=np.int32)
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            # Folhas: limiar +inf e filhos apontando para si mesmas (ponto fixo da travessia)
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, own, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, own, tree.children_right + offset).astype(np.int32))
+            missing.append(np.asarray(getattr(tree, "missing_go_to_left", np.zeros(n)), dtype=bool))
+            value = tree.value[:, 0, :]
+            values.append(value / value.sum(axis=1, keepdims=True))
+            roots.append(offset)
+            offset += n
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            missing_left=np.concatenate(missing),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=np.asarray(model.classes_),
+            max_depth=max(estimator.tree_.max_depth for estimator in model.estimators_),
+            n_features=model.n_features_in_,
+        )
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node of every tree for each row; ``(n_samples, n_trees)``."""
+        # Como o sklearn, compara os valores em float32 com os limiares em float64
+        X = np.asarray(X, dtype=self.input_dtype)
+        if X.ndim == 1:
+            return self._apply_row(X)
+        n_samples, n_trees = len(X), len(self.roots)
+        nodes = np.tile(self.roots, n_samples)
+        rows = np.repeat(np.arange(n_samples), n_trees)
+        # Só os cursores que ainda não chegaram a uma folha seguem na travessia
+        active = np.flatnonzero(self.left[nodes] != nodes)
+        while len(active):
+            current = nodes[active]
+            x = X[rows[active], self.feature[current]]
+            go_left = (x <= self.threshold[current]) | (np.isnan(x) & self.missing_left[current])
+            nxt = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = nxt
+            active = active[self.left[nxt] != nxt]
+        return nodes.reshape(n_samples, n_trees)
+
+    def _apply_row(self, x: np.ndarray) -> np.ndarray:
+        # Caminho de uma linha: vetorizado só entre as árvores, sem arrays 2-D temporários
+        nodes = self.roots
+        for _ in range(self.max_depth):
+            values = x[self.feature[nodes]]
+            go_left = (values <= self.threshold[nodes]) | (np.isnan(values) & self.missing_left[nodes])
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def fold_scaler(self, mean: np.ndarray, scale: np.ndarray) -> "FlatForest":
+        """
+        Forest over raw inputs equivalent to this one over ``(x - mean) / scale``.
+
+        Each split ``float32((x - mean) / scale) <= t`` is monotone in ``x``, so
+        it becomes ``x <= b`` for the largest float64 ``b`` that still satisfies
+        it; ``b`` is found by bisection, which keeps the float32 rounding of the
+        original comparison exact. ``scale`` must be positive, as in
+        ``StandardScaler``.
+        """
+        mean = np.zeros(self.n_features_in_) if mean is None else np.asarray(mean, dtype=np.float64)
+        scale = np.ones(self.n_features_in_) if scale is None else np.asarray(scale, dtype=np.float64)
+        if np.any(scale <= 0):
+            raise ValueError("Only positive scales can be folded into the split thresholds.")
+        internal = np.flatnonzero(np.isfinite(self.threshold))
+        t = self.threshold[internal]
+        m, s = mean[self.feature[internal]], scale[self.feature[internal]]
+
+        def satisfied(x):
+            with np.errstate(over="ignore"):
+                return ((x - m) / s).astype(np.float32) <= t
+
+        # Intervalo [lo, hi) em torno de t * s + m, alargado até conter a fronteira
+        guess = t * s + m
+        step = (np.abs(guess) + s * (np.abs(t) + 1)) * 1e-6
+        lo, hi = guess - step, guess + step
+        while True:
+            bad_lo, bad_hi = ~satisfied(lo), satisfied(hi)
+            if not (bad_lo.any() or bad_hi.any()):
+                break
+            step *= 2
+            lo = np.where(bad_lo, guess - step, lo)
+            hi = np.where(bad_hi, guess + step, hi)
+        while True:
+            mid = lo + (hi - lo) / 2
+            open_ = (mid > lo) & (mid < hi)
+            if not open_.any():
+                break
+            ok = satisfied(mid)
+            lo = np.where(open_ & ok, mid, lo)
+            hi = np.where(open_ & ~ok, mid, hi)
+
+        threshold = self.threshold.copy()
+        threshold[internal] = lo
+        return FlatForest(self.feature, threshold, self.left, self.right, self.missing_left, self.value, self.roots,
+                          self.classes_, self.max_depth, self.n_features_in_, input_dtype=np.float64)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities; a 1-D row returns a 1-D vector."""
+        return self.value[self.apply(X)].mean(axis=-2)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=-1)]
+
+    def save(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(
+            path, feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+            missing_left=self.missing_left, value=self.value.astype(np.float64), roots=self.roots,
+            classes=self.classes_, meta=np.array([self.max_depth, self.n_features_in_]),
+        )
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "FlatForest":
+        with np.load(path) as data:
+            max_depth, n_features = data["meta"]
+            return cls(data["feature"], data["threshold"], data["left"], data["right"], data["missing_left"],
+                       data["value"], data["roots"], data["classes"], max_depth, n_features)
+
+
+def check_equivalence(flat: FlatForest, model, X: np.ndarray, atol: float = EQUIVALENCE_ATOL):
+    """Raises ``ValueError`` if the flat forest disagrees with sklearn on ``X``."""
+    expected = model.predict_proba(X)
+    actual = flat.predict_proba(X)
+    if not np.allclose(actual, expected, atol=atol, rtol=0):
+        worst = np.abs(actual - expected).max()
+        raise ValueError(f"Flat forest differs from sklearn by up to {worst:.3g} (tolerance {atol}).")
+    if not np.array_equal(flat.predict(X), model.classes_[expected.argmax(axis=1)]):
+        raise ValueError("Flat forest labels differ from sklearn.")
+
+
+def probe_inputs(flat: FlatForest, n_samples: int = EQUIVALENCE_SAMPLES, seed: int = 0) -> np.ndarray:
+    """
+    Random rows that exercise both sides of the forest's splits.
+
+    Values are drawn from each feature's split thresholds (nudged just below,
+    on and above them) plus some NaN, so every branch type is compared.
+    """
+    rng = np.random.default_rng(seed)
+    X = np.zeros((n_samples, flat.n_features_in_))
+    internal = np.isfinite(flat.threshold)
+    for j in range(flat.n_features_in_):
+        cuts = flat.threshold[internal & (flat.feature == j)]
+        if len(cuts) == 0:
+            X[:, j] = rng.normal(size=n_samples)
+            continue
+        picks = rng.choice(cuts, n_samples) + rng.choice([-1e-6, 0.0, 1e-6], n_samples)
+        X[:, j] = picks
+    X[rng.random(X.shape) < 0.02] = np.nan
+    return X
+
+
+def export_forest(model, path: str, X_check: np.ndarray = None) -> FlatForest:
+    """
+    Flattens ``model``, verifies it against sklearn and saves it as ``.npz``.
+
+    Args:
+        model: Fitted single-output ``RandomForestClassifier``.
+        path (str): Destination ``.npz`` file.
+        X_check (np.ndarray, optional): Rows for the equivalence check, in the
+                                        model's input space; probe rows built
+                                        from the split thresholds are always added.
+
+    Returns:
+        FlatForest: The verified flat forest.
+    """
+    flat = FlatForest.from_sklearn(model)
+    X = probe_inputs(flat)
+    if X_check is not None:
+        X = np.vstack([np.asarray(X_check, dtype=np.float64), X])
+    check_equivalence(flat, model, X)
+    flat.save(path)
+    return flat
+
+
+if __name__ == "__main__":
+    # Exporta o modelo v1 e compara tamanho e latência com o pickle do sklearn
+    import time
+    import joblib
+    model_path = "models/trained_models/flood_prediction_model_v1.pkl"
+    flat_path = "models/trained_models/flood_prediction_model_v1.npz"
+    model = joblib.load(model_path)
+    flat = export_forest(model, flat_path)
+    row = probe_inputs(flat, 1)[0]
+    start = time.perf_counter()
+    for _ in range(1000):
+        flat.predict_proba(row)
+    print(f"Flat forest: {os.path.getsize(flat_path)} bytes (pickle: {os.path.getsize(model_path)} bytes), "
+          f"{(time.perf_counter() - start):.3f} ms per row")
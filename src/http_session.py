@@ -0,0 +1,26 @@
+import requests
+from urllib3 import Retry
+
+# Códigos de resposta que disparam nova tentativa
+RETRY_STATUS = (500, 502, 504)
+RETRY_BACKOFF = 0.2
+
+
+def make_session(pool_size: int, retries: int, user_agent: str = None) -> requests.Session:
+    """
+    ``requests`` session with a keep-alive pool of ``pool_size`` and ``retries`` retries.
+
+    One ``HTTPAdapter`` carries both the pool sizes and the ``Retry`` policy;
+    ``retry_requests.retry()`` would mount a fresh adapter over it and drop the
+    pool settings. Every method is retried, like ``retry_requests`` does.
+    """
+    session = requests.Session()
+    if user_agent:
+        session.headers["User-Agent"] = user_agent
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size,
+        max_retries=Retry(total=retries, backoff_factor=RETRY_BACKOFF, status_forcelist=RETRY_STATUS,
+                          allowed_methods=None))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+from src.flat_forest import FlatForest, check_equivalence, probe_inputs
+
+
+class InferencePipeline:
+    """
+    Scaler and model of a bundle compiled into one array-based scorer.
+
+    For forests the ``StandardScaler`` is folded into the split thresholds
+    (``FlatForest.fold_scaler``): rows are scored on raw feature values and
+    no scaled copy is ever built. Other models fall back to the scaler's
+    affine transform in numpy followed by ``predict_proba``. Either way a
+    call takes a numpy row or batch in ``feature_names`` order and returns
+    label and flood probability from a single pass.
+    """
+
+    def __init__(self, feature_names: list, classes: np.ndarray, forest: FlatForest = None, model=None,
+                 mean: np.ndarray = None, scale: np.ndarray = None):
+        self.feature_names = list(feature_names)
+        self.classes_ = np.asarray(classes)
+        self.forest = forest
+        self.model = model
+        self.mean = mean
+        self.scale = scale
+        # Probabilidade reportada: a da classe 1 (enchente)
+        self.positive_index = list(self.classes_).index(1) if 1 in self.classes_ else len(self.classes_) - 1
+
+    @classmethod
+    def compile(cls, model, scaler, feature_names: list, flat_model: FlatForest = None) -> "InferencePipeline":
+        """
+        Builds the pipeline for a model/scaler pair and checks it against sklearn.
+
+        Args:
+            model: Fitted classifier; forests are flattened if ``flat_model`` is not given.
+            scaler: Fitted ``StandardScaler`` (``mean_``/``scale_`` may be None).
+            feature_names (list): Column order of the input rows.
+            flat_model (FlatForest, optional): The bundle's exported forest.
+
+        Returns:
+            InferencePipeline: Ready-to-use pipeline.
+        """
+        mean = getattr(scaler, "mean_", None)
+        scale = getattr(scaler, "scale_", None)
+        if flat_model is None and hasattr(model, "estimators_"):
+            flat_model = FlatForest.from_sklearn(model)
+        if flat_model is None:
+            return cls(feature_names, model.classes_, model=model,
+                       mean=None if mean is None else np.asarray(mean, dtype=np.float64),
+                       scale=None if scale is None else np.asarray(scale, dtype=np.float64))
+
+        forest = flat_model.fold_scaler(mean, scale)
+        # Verificação na compilação: limiares dobrados == scaler + modelo do sklearn
+        X = probe_inputs(forest)
+        check_equivalence(forest, _ScaledModel(model, mean, scale), X)
+        return cls(feature_names, flat_model.classes_, forest=forest)
+
+    def predict(self, X: np.ndarray) -> tuple:
+        """
+        Scores a row ``(n_features,)`` or batch ``(n_samples, n_features)``.
+
+        Returns:
+            tuple: ``(label, probability)``; ``int``/``float`` for a row, arrays for a batch.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if self.forest is not None:
+            probabilities = self.forest.predict_proba(X)
+        else:
+            batch = X.reshape(-1, X.shape[-1])
+            if self.mean is not None:
+                batch = batch - self.mean
+            if self.scale is not None:
+                batch = batch / self.scale
+            probabilities = self.model.predict_proba(_with_feature_names(self.model, batch))
+            if X.ndim == 1:
+                probabilities = probabilities[0]
+        labels, positive = self.classes_[probabilities.argmax(axis=-1)], probabilities[..., self.positive_index]
+        if X.ndim == 1:
+            return labels.item(), float(positive)
+        return labels, positive
+
+
+def _with_feature_names(model, X: np.ndarray):
+    # Modelo treinado com DataFrame: mesmas colunas evitam o aviso "X does not have valid feature names"
+    names = getattr(model, "feature_names_in_", None)
+    return X if names is None else pd.DataFrame(X, columns=names)
+
+
+class _ScaledModel:
+    # Referência da verificação: o caminho antigo (escala em numpy + predict_proba do sklearn)
+    def __init__(self, model, mean, scale):
+        self.model, self.mean, self.scale = model, mean, scale
+        self.classes_ = model.classes_
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if self.mean is not None:
+            X = X - self.mean
+        if self.scale is not None:
+            X = X / self.scale
+        return self.model.predict_proba(_with_feature_names(self.model, X))
@@ -0,0 +1,11 @@
+# Localização padrão: Porto Alegre, usada no treino e no painel
+DEFAULT_LATITUDE = -30.03508379255499
+DEFAULT_LONGITUDE = -51.19020276769795
+
+# Casas decimais da chave de local (~11 m)
+COORDINATE_DECIMALS = 4
+
+
+def location_key(latitude: float, longitude: float) -> str:
+    """Stable key of a coordinate pair, shared by the weather cache and MongoDB."""
+    return f"{round(latitude, COORDINATE_DECIMALS)}_{round(longitude, COORDINATE_DECIMALS)}"
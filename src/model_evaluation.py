@@ -1,133 +1,196 @@
 # src/model_evaluation.py
 
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from sklearn.metrics import (
     classification_report,
     confusion_matrix,
     roc_auc_score,
     precision_recall_curve,
     auc,
-    RocCurveDisplay, # For plotting ROC curve
-    PrecisionRecallDisplay # For plotting PR curve
 )
-import os
 
-def evaluate_model(model, X_test: pd.DataFrame, y_test: pd.Series, feature_names: list):
+from src.threshold_analysis import analyze_thresholds
+
+REPORTS_DIR = 'reports'
+# Processos para desenhar as figuras (uma figura por tarefa)
+FIGURE_WORKERS = 4
+
+
+def _pyplot():
+    # Backend não interativo: nada bloqueia em plt.show() nem exige um display
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def plot_confusion_matrix(cm: np.ndarray, path: str) -> str:
+    import seaborn as sns
+    plt = _pyplot()
+    fig = plt.figure(figsize=(7, 6))
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', cbar=False,
+                xticklabels=['Predicted No Flood', 'Predicted Flood'],
+                yticklabels=['Actual No Flood', 'Actual Flood'])
+    plt.title('Confusion Matrix for Flood Prediction', fontsize=16)
+    plt.ylabel('Actual Label', fontsize=12)
+    plt.xlabel('Predicted Label', fontsize=12)
+    plt.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+
+def plot_roc_curve(y_true: np.ndarray, y_proba: np.ndarray, path: str) -> str:
+    from sklearn.metrics import RocCurveDisplay
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(8, 7))
+    # from_predictions reaproveita as probabilidades já calculadas (sem novo predict_proba)
+    RocCurveDisplay.from_predictions(y_true, y_proba, name='Model ROC Curve', ax=ax)
+    ax.plot([0, 1], [0, 1], linestyle='--', lw=2, color='r', label='Chance', alpha=.8) # Plot random guess line
+    ax.set_title('Receiver Operating Characteristic (ROC) Curve', fontsize=16)
+    ax.set_xlabel('False Positive Rate', fontsize=12)
+    ax.set_ylabel('True Positive Rate', fontsize=12)
+    ax.legend(loc='lower right')
+    ax.grid(True)
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+
+def plot_precision_recall_curve(y_true: np.ndarray, y_proba: np.ndarray, path: str) -> str:
+    from sklearn.metrics import PrecisionRecallDisplay
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(8, 7))
+    PrecisionRecallDisplay.from_predictions(y_true, y_proba, name='Model PR Curve', ax=ax)
+    ax.set_title('Precision-Recall Curve', fontsize=16)
+    ax.set_xlabel('Recall (True Positive Rate)', fontsize=12)
+    ax.set_ylabel('Precision (Positive Predictive Value)', fontsize=12)
+    ax.legend(loc='lower left')
+    ax.grid(True)
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+
+def plot_feature_importances(features: list, importances: np.ndarray, path: str) -> str:
+    import seaborn as sns
+    plt = _pyplot()
+    fig = plt.figure(figsize=(10, 8))
+    sns.barplot(x=importances, y=features, hue=features, palette='viridis', legend=False)
+    plt.title("Feature Importances", fontsize=16)
+    plt.xlabel("Relative Importance", fontsize=12)
+    plt.ylabel("Feature", fontsize=12)
+    plt.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+
+def render_figures(tasks: list, n_workers: int = FIGURE_WORKERS) -> list:
+    """
+    Renders ``(plot_function, *args)`` tasks, each saving one PNG.
+
+    With more than one worker the figures are drawn in a process pool
+    (matplotlib is not thread-safe); otherwise they are drawn in order here.
+
+    Returns:
+        list: The saved file paths.
+    """
+    if n_workers is None or n_workers > 1:
+        with ProcessPoolExecutor(max_workers=min(n_workers or len(tasks), len(tasks))) as pool:
+            futures = [pool.submit(function, *args) for function, *args in tasks]
+            return [future.result() for future in futures]
+    return [function(*args) for function, *args in tasks]
+
+
+def evaluate_model(model, X_test: pd.DataFrame, y_test: pd.Series, feature_names: list,
+                   render: bool = True, n_workers: int = FIGURE_WORKERS, reports_dir: str = REPORTS_DIR) -> dict:
     """
     Evaluates the performance of the trained Machine Learning model on the test set.
 
-    This function calculates and displays:
-    1. Classification Report (Precision, Recall, F1-score, Support for each class).
-    2. Confusion Matrix (with visualization).
-    3. ROC AUC Score and ROC Curve.
-    4. Precision-Recall AUC and Precision-Recall Curve (crucial for imbalanced datasets).
-    5. Feature Importances (for tree-based models like RandomForest, with visualization).
-    6. Saves key performance metrics to a CSV file.
+    Predictions are computed once (a single ``predict_proba``) and every metric
+    and curve is derived from them. The function:
+    1. Prints the Classification Report (Precision, Recall, F1-score, Support for each class).
+    2. Prints the Confusion Matrix.
+    3. Computes the ROC AUC and Precision-Recall AUC (crucial for imbalanced datasets).
+    4. Lists the Feature Importances (for tree-based models like RandomForest).
+    5. Saves key performance metrics to ``model_performance_metrics.csv`` and,
+       with the full report, to ``model_performance_metrics.json``; sweeps every
+       alert threshold into ``thresholds.json``; the derived risk bands are
+       returned as ``risk_bands`` so they can be saved with the model bundle.
+    6. Optionally renders the confusion matrix, ROC, PR and importance figures
+       headlessly (Agg backend) in a process pool.
 
     Args:
         model: The trained Machine Learning model (e.g., RandomForestClassifier).
         X_test (pd.DataFrame): Features of the test set, ready for prediction (e.g., scaled).
         y_test (pd.Series): True target labels of the test set.
         feature_names (list): A list of feature names, used for displaying feature importances.
+        render (bool): Whether to draw the figures into ``reports_dir/figures``.
+        n_workers (int): Figure processes; 1 renders them in this process.
+        reports_dir (str): Where the metrics and figures are written.
+
+    Returns:
+        dict: The metrics written to the JSON report.
     """
     print("\n--- Starting Model Evaluation ---")
 
-    # Generate predictions and probabilities for the test set
-    y_pred = model.predict(X_test)
-    y_pred_proba = model.predict_proba(X_test)[:, 1] # Probability of the positive class (flood)
+    # Probabilidades calculadas uma única vez; rótulos e curvas derivam delas
+    probabilities = model.predict_proba(X_test)
+    y_pred = model.classes_[probabilities.argmax(axis=1)]
+    y_pred_proba = probabilities[:, list(model.classes_).index(1)] # Probability of the positive class (flood)
+    y_true = np.asarray(y_test)
 
-    # Define directory for saving figures
-    reports_figures_dir = 'reports/figures'
+    reports_figures_dir = os.path.join(reports_dir, 'figures')
     os.makedirs(reports_figures_dir, exist_ok=True) # Ensure the directory exists
 
     # --- 1. Classification Report ---
     print("\n--- Classification Report ---")
     # The classification report provides precision, recall, f1-score, and support for each class.
     # For flood prediction, 'recall' for the positive class (flood) is often prioritized.
-    print(classification_report(y_test, y_pred, target_names=['No Flood', 'Flood'], labels=[0, 1]))
+    print(classification_report(y_true, y_pred, target_names=['No Flood', 'Flood'], labels=[0, 1], zero_division=0))
+    report = classification_report(y_true, y_pred, target_names=['No Flood', 'Flood'], labels=[0, 1],
+                                   zero_division=0, output_dict=True)
 
     # --- 2. Confusion Matrix ---
     print("\n--- Confusion Matrix ---")
-    cm = confusion_matrix(y_test, y_pred, labels=[0, 1])
+    cm = confusion_matrix(y_true, y_pred, labels=[0, 1])
     print(cm) # Raw confusion matrix array
 
-    # Visualize the Confusion Matrix for better understanding
-    plt.figure(figsize=(7, 6))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', cbar=False,
-                xticklabels=['Predicted No Flood', 'Predicted Flood'],
-                yticklabels=['Actual No Flood', 'Actual Flood'])
-    plt.title('Confusion Matrix for Flood Prediction', fontsize=16)
-    plt.ylabel('Actual Label', fontsize=12)
-    plt.xlabel('Predicted Label', fontsize=12)
-    plt.tight_layout()
-    plt.savefig(os.path.join(reports_figures_dir, 'confusion_matrix.png'))
-    plt.show()
-    print(f"Confusion Matrix plot saved to: {os.path.join(reports_figures_dir, 'confusion_matrix.png')}")
-
-    # --- 3. ROC AUC Score and ROC Curve ---
+    # --- 3. ROC AUC and Precision-Recall AUC ---
     # ROC AUC measures the model's ability to distinguish between classes.
     # It's less sensitive to class imbalance than accuracy but can still be misleading
-    # for very skewed datasets.
-    roc_auc = roc_auc_score(y_test, y_pred_proba)
+    # for very skewed datasets. The Precision-Recall curve focuses on the positive class (floods).
+    both_classes = len(np.unique(y_true)) == 2
+    roc_auc = roc_auc_score(y_true, y_pred_proba) if both_classes else float('nan')
     print(f"\nROC AUC Score: {roc_auc:.4f}")
-
-    # Plot the ROC Curve
-    fig_roc, ax_roc = plt.subplots(figsize=(8, 7))
-    RocCurveDisplay.from_estimator(model, X_test, y_test, name='Model ROC Curve', ax=ax_roc)
-    ax_roc.plot([0, 1], [0, 1], linestyle='--', lw=2, color='r', label='Chance', alpha=.8) # Plot random guess line
-    ax_roc.set_title('Receiver Operating Characteristic (ROC) Curve', fontsize=16)
-    ax_roc.set_xlabel('False Positive Rate', fontsize=12)
-    ax_roc.set_ylabel('True Positive Rate', fontsize=12)
-    ax_roc.legend(loc='lower right')
-    ax_roc.grid(True)
-    plt.tight_layout()
-    plt.savefig(os.path.join(reports_figures_dir, 'roc_curve.png'))
-    plt.show()
-    print(f"ROC Curve plot saved to: {os.path.join(reports_figures_dir, 'roc_curve.png')}")
-
-    # --- 4. Precision-Recall AUC and Precision-Recall Curve ---
-    # The Precision-Recall curve is **crucial for imbalanced classification problems**.
-    # It focuses on the performance of the positive class (floods).
-    # A high PR AUC indicates good performance for the minority class.
-    precision, recall, _ = precision_recall_curve(y_test, y_pred_proba)
+    precision, recall, _ = precision_recall_curve(y_true, y_pred_proba)
     pr_auc = auc(recall, precision)
     print(f"\nPrecision-Recall AUC: {pr_auc:.4f}")
 
-    # Plot the Precision-Recall Curve
-    fig_pr, ax_pr = plt.subplots(figsize=(8, 7))
-    PrecisionRecallDisplay.from_estimator(model, X_test, y_test, name='Model PR Curve', ax=ax_pr)
-    ax_pr.set_title('Precision-Recall Curve', fontsize=16)
-    ax_pr.set_xlabel('Recall (True Positive Rate)', fontsize=12)
-    ax_pr.set_ylabel('Precision (Positive Predictive Value)', fontsize=12)
-    ax_pr.legend(loc='lower left')
-    ax_pr.grid(True)
-    plt.tight_layout()
-    plt.savefig(os.path.join(reports_figures_dir, 'precision_recall_curve.png'))
-    plt.show()
-    print(f"Precision-Recall Curve plot saved to: {os.path.join(reports_figures_dir, 'precision_recall_curve.png')}")
-
-    # --- 5. Feature Importances ---
+    # --- 4. Feature Importances ---
     # For tree-based models, feature importance helps understand which features contributed most to predictions.
+    figure_tasks = [(plot_confusion_matrix, cm, os.path.join(reports_figures_dir, 'confusion_matrix.png'))]
+    if both_classes:
+        figure_tasks.append((plot_roc_curve, y_true, y_pred_proba, os.path.join(reports_figures_dir, 'roc_curve.png')))
+        figure_tasks.append((plot_precision_recall_curve, y_true, y_pred_proba,
+                             os.path.join(reports_figures_dir, 'precision_recall_curve.png')))
+    importances_report = None
     if hasattr(model, 'feature_importances_'):
         importances = model.feature_importances_
         # Sort features by importance in descending order
         sorted_indices = np.argsort(importances)[::-1]
-        sorted_features = [feature_names[i] for i in sorted_indices]
+        sorted_features = [list(feature_names)[i] for i in sorted_indices]
         sorted_importances = importances[sorted_indices]
-
-        # Plot feature importances
-        plt.figure(figsize=(10, 8))
-        sns.barplot(x=sorted_importances, y=sorted_features, palette='viridis')
-        plt.title("Feature Importances", fontsize=16)
-        plt.xlabel("Relative Importance", fontsize=12)
-        plt.ylabel("Feature", fontsize=12)
-        plt.tight_layout()
-        plt.savefig(os.path.join(reports_figures_dir, 'feature_importances.png'))
-        plt.show()
-        print(f"Feature Importances plot saved to: {os.path.join(reports_figures_dir, 'feature_importances.png')}")
+        importances_report = dict(zip(sorted_features, sorted_importances.tolist()))
+        figure_tasks.append((plot_feature_importances, sorted_features, sorted_importances,
+                             os.path.join(reports_figures_dir, 'feature_importances.png')))
 
         print("\nTop 10 Most Important Features:")
         for i in range(min(10, len(sorted_features))): # Show top 10 or all if less than 10
@@ -135,7 +198,7 @@ def evaluate_model(model, X_test: pd.DataFrame, y_test: pd.Series, feature_names
     else:
         print("\nFeature importances are not available for this model type.")
 
-    # --- 6. Save Key Performance Metrics to CSV ---
+    # --- 5. Save Key Performance Metrics to CSV and JSON ---
     # Extract common metrics to save for easy tracking across experiments.
     accuracy = (cm[0,0] + cm[1,1]) / np.sum(cm) if np.sum(cm) > 0 else 0
     precision_flood = cm[1,1] / (cm[1,1] + cm[0,1]) if (cm[1,1] + cm[0,1]) > 0 else 0 # Precision for class 1 (Flood)
@@ -148,11 +211,41 @@ def evaluate_model(model, X_test: pd.DataFrame, y_test: pd.Series, feature_names
     }
     df_metrics = pd.DataFrame(metrics_data)
 
-    metrics_file_path = 'reports/model_performance_metrics.csv'
+    metrics_file_path = os.path.join(reports_dir, 'model_performance_metrics.csv')
     df_metrics.to_csv(metrics_file_path, index=False)
     print(f"\nKey performance metrics saved to: {metrics_file_path}")
 
+    # NaN (ex.: teste sem enchentes) vira null no JSON
+    metrics = {
+        'metrics': {name: (None if pd.isna(value) else float(value))
+                    for name, value in zip(metrics_data['metric'], metrics_data['value'])},
+        'n_test': int(len(y_true)),
+        'positives': int((y_true == 1).sum()),
+        'confusion_matrix': cm.tolist(),
+        'classification_report': report,
+        'feature_importances': importances_report,
+    }
+    json_file_path = os.path.join(reports_dir, 'model_performance_metrics.json')
+    with open(json_file_path, 'w') as f:
+        json.dump(metrics, f, indent=2)
+    print(f"Structured metrics saved to: {json_file_path}")
+
+    # Curvas por limiar e faixas de risco a partir das mesmas probabilidades
+    if both_classes:
+        metrics['risk_bands'] = analyze_thresholds(y_true, y_pred_proba, reports_dir=reports_dir)["bands"]
+    else:
+        metrics['risk_bands'] = None
+        print("Threshold analysis skipped: the test set has a single class.")
+
+    # --- 6. Figures ---
+    if render:
+        for path in render_figures(figure_tasks, n_workers):
+            print(f"Plot saved to: {path}")
+    else:
+        print("Figure rendering skipped.")
+
     print("\n--- Model Evaluation Complete ---")
+    return metrics
 
 
 if __name__ == '__main__':
@@ -0,0 +1,199 @@
+import datetime
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+import joblib
+
+from src.feature_spec import FeatureSpec
+from src.flat_forest import FlatForest, export_forest
+from src.inference import InferencePipeline
+
+MODELS_DIR = "models/trained_models"
+MANIFESTS_DIR = "manifests"
+CURRENT_FILE = "CURRENT"
+# Intervalo mínimo (segundos) entre verificações do ponteiro CURRENT
+REFRESH_INTERVAL = 5.0
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """A model and the scaler it was trained with, loaded as one version."""
+    version: str
+    model: object
+    scaler: object
+    feature_names: list
+    manifest: dict = field(default_factory=dict)
+    # Floresta exportada em arrays (src.flat_forest), quando o manifesto a inclui
+    flat_model: object = None
+    # Scaler + modelo compilados para a inferência (src.inference)
+    pipeline: object = None
+
+
+def _write_atomic(path: str, content: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def manifest_path(version: str, models_dir: str = MODELS_DIR) -> str:
+    """Path of the manifest of ``version`` in the registry."""
+    return os.path.join(models_dir, MANIFESTS_DIR, f"{version}.json")
+
+
+def save_bundle(model, scaler, version: str = None, models_dir: str = MODELS_DIR, promote: bool = True,
+                risk_bands: list = None) -> str:
+    """
+    Saves a model/scaler pair with a manifest and optionally makes it current.
+
+    Args:
+        model: Fitted classifier.
+        scaler: Scaler fitted on the same training data (exposes ``feature_names_in_``).
+        version (str, optional): Version label; defaults to a UTC timestamp.
+        models_dir (str): Registry root directory.
+        promote (bool): Whether to point ``CURRENT`` at the new version.
+        risk_bands (list, optional): Risk bands derived from this model's evaluation
+            (``src.threshold_analysis``); served with the bundle.
+
+    Returns:
+        str: The saved version.
+
+    Raises:
+        ValueError: If a feature cannot be computed when serving (see ``FeatureSpec.from_feature_names``).
+    """
+    feature_names = [str(name) for name in scaler.feature_names_in_]
+    # Falha antes de gravar: um modelo com features desconhecidas nunca vira versão
+    FeatureSpec.from_feature_names(feature_names)
+    version = version or datetime.datetime.now(datetime.timezone.utc).strftime("v%Y%m%d%H%M%S")
+    os.makedirs(os.path.join(models_dir, MANIFESTS_DIR), exist_ok=True)
+
+    manifest = {
+        "version": version,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "model_file": f"flood_prediction_model_{version}.pkl",
+        "scaler_file": f"feature_scaler_{version}.pkl",
+        "model_class": type(model).__name__,
+        "feature_names": feature_names,
+    }
+    if risk_bands is not None:
+        # As faixas acompanham o modelo: troca ou rollback de versão troca as faixas junto
+        manifest["risk_bands"] = risk_bands
+    # Sem compressão: os arrays podem ser mapeados em memória (mmap_mode) ao carregar
+    joblib.dump(model, os.path.join(models_dir, manifest["model_file"]))
+    joblib.dump(scaler, os.path.join(models_dir, manifest["scaler_file"]))
+    if hasattr(model, "estimators_"):
+        # Formato compacto para inferência; a exportação falha se divergir do sklearn
+        manifest["flat_model_file"] = f"flood_prediction_model_{version}.npz"
+        export_forest(model, os.path.join(models_dir, manifest["flat_model_file"]))
+    _write_atomic(manifest_path(version, models_dir), json.dumps(manifest, indent=2))
+
+    if promote:
+        _write_atomic(os.path.join(models_dir, CURRENT_FILE), version)
+    return version
+
+
+class ModelRegistry:
+    """
+    Lazily loads the current model bundle and hot-swaps it when it changes.
+
+    Nothing is read from disk until the first ``get()``. Afterwards ``get()``
+    stats the ``CURRENT`` pointer at most every ``REFRESH_INTERVAL`` seconds
+    and, when it names a new version, loads that bundle and swaps it in with a
+    single reference assignment. Listeners are notified after every swap.
+    """
+
+    def __init__(self, models_dir: str = MODELS_DIR, refresh_interval: float = REFRESH_INTERVAL):
+        self.models_dir = models_dir
+        self.refresh_interval = refresh_interval
+        self._bundle = None
+        self._pointer_mtime = None
+        self._checked_at = 0.0
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """Stops notifying ``callback``; unknown callbacks are ignored."""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def peek(self) -> ModelBundle:
+        """Returns the loaded bundle if it needs no refresh check, else None (never touches disk)."""
+        bundle = self._bundle
+        if bundle is not None and time.monotonic() - self._checked_at < self.refresh_interval:
+            return bundle
+        return None
+
+    def get(self) -> ModelBundle:
+        bundle = self._bundle
+        if bundle is not None and time.monotonic() - self._checked_at < self.refresh_interval:
+            return bundle
+        with self._lock:
+            self._checked_at = time.monotonic()
+            pointer = os.path.join(self.models_dir, CURRENT_FILE)
+            mtime = os.path.getmtime(pointer) if os.path.exists(pointer) else None
+            if self._bundle is None or mtime != self._pointer_mtime:
+                self._pointer_mtime = mtime
+                version = self._read_current()
+                if self._bundle is None or version != self._bundle.version:
+                    self._swap(self.load(version))
+            return self._bundle
+
+    def activate(self, version: str) -> ModelBundle:
+        """Loads ``version``, swaps it in and makes it the persisted current version."""
+        bundle = self.load(version)
+        with self._lock:
+            _write_atomic(os.path.join(self.models_dir, CURRENT_FILE), version)
+            self._pointer_mtime = os.path.getmtime(os.path.join(self.models_dir, CURRENT_FILE))
+            self._checked_at = time.monotonic()
+            self._swap(bundle)
+        return bundle
+
+    def load(self, version: str = None) -> ModelBundle:
+        manifest = self._read_manifest(version)
+        model = joblib.load(os.path.join(self.models_dir, manifest["model_file"]), mmap_mode="r")
+        scaler = joblib.load(os.path.join(self.models_dir, manifest["scaler_file"]), mmap_mode="r")
+
+        feature_names = [str(name) for name in scaler.feature_names_in_]
+        if manifest.get("feature_names", feature_names) != feature_names:
+            raise ValueError(f"Scaler features do not match the manifest of model {manifest['version']}.")
+        if getattr(model, "n_features_in_", len(feature_names)) != len(feature_names):
+            raise ValueError(f"Model {manifest['version']} expects {model.n_features_in_} features, "
+                             f"scaler provides {len(feature_names)}.")
+        try:
+            FeatureSpec.from_feature_names(feature_names)
+        except ValueError as e:
+            raise ValueError(f"Model {manifest['version']} cannot be served: {e}") from e
+        flat_model = None
+        if manifest.get("flat_model_file"):
+            flat_model = FlatForest.load(os.path.join(self.models_dir, manifest["flat_model_file"]))
+        pipeline = InferencePipeline.compile(model, scaler, feature_names, flat_model)
+        print(f"Modelo {manifest['version']} carregado de {self.models_dir}")
+        return ModelBundle(manifest["version"], model, scaler, feature_names, manifest, flat_model, pipeline)
+
+    def _swap(self, bundle: ModelBundle):
+        self._bundle = bundle
+        # Cópia: um listener pode ser removido durante a notificação
+        for callback in list(self._listeners):
+            callback(bundle)
+
+    def _read_current(self):
+        pointer = os.path.join(self.models_dir, CURRENT_FILE)
+        if not os.path.exists(pointer):
+            return None
+        with open(pointer, encoding="utf-8") as f:
+            return f.read().strip() or None
+
+    def _read_manifest(self, version: str = None) -> dict:
+        version = version or self._read_current()
+        if version is None:
+            raise FileNotFoundError(f"No current model version in {self.models_dir}; run the pipeline first.")
+        path = manifest_path(version, self.models_dir)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No manifest for model version '{version}' in {self.models_dir}.")
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
@@ -1,25 +1,37 @@
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import TimeSeriesSplit, GridSearchCV
+from sklearn.model_selection import TimeSeriesSplit
 import joblib
 import os
 
-def train_model(df_processed: pd.DataFrame):
+from src.tuning import ForestSearch
+
+# Cut-off date for the train/test split
+DEFAULT_SPLIT_DATE = '2024-10-30'
+
+def train_model(df_processed: pd.DataFrame = None, source: str = None, search: str = "halving",
+                split_date: str = DEFAULT_SPLIT_DATE):
     """
     Prepares the data, trains, and optimizes a Machine Learning model for flood prediction.
 
     This function performs:
     1. Time-series splitting of the data into training and testing sets.
     2. Feature scaling using StandardScaler.
-    3. Hyperparameter tuning of a RandomForestClassifier using GridSearchCV
-       with TimeSeriesSplit for robust cross-validation.
+    3. Hyperparameter tuning of a RandomForestClassifier with ``src.tuning.ForestSearch``
+       (successive halving over warm-started forests, fold results cached on disk)
+       and TimeSeriesSplit for robust cross-validation.
     4. Saves the best trained model and the scaler.
 
     Args:
         df_processed (pd.DataFrame): DataFrame containing the engineered features
                                      and the 'flood_event' target variable.
                                      Expected to have a DatetimeIndex.
+        source (str, optional): Used when ``df_processed`` is None: ``"mongodb"`` or a
+                                processed CSV/Parquet path, read with ``src.data_sources``.
+        search (str): ``"halving"``, ``"random"`` or ``"grid"`` (see ``ForestSearch``).
+        split_date (str): First day of the test set. For many origins use
+                          ``src.backtesting.walk_forward_backtest``.
 
     Returns:
         tuple: A tuple containing:
@@ -30,15 +42,20 @@ def train_model(df_processed: pd.DataFrame):
     """
     print("\n--- Starting Model Training ---")
 
+    if df_processed is None:
+        from src.data_sources import load_training_frame
+        df_processed = load_training_frame(source) if source else load_training_frame()
+        print(f"Loaded {len(df_processed)} rows from {source or 'the processed data file'}.")
+
     # Separate features (X) and target (y)
     X = df_processed.drop('flood_event', axis=1)
     y = df_processed['flood_event']
 
     # --- 1. Time-Series Data Splitting ---
-    # Given data from 2023-04-30 to 2025-04-30 (2 years of data).
-    # We'll use approximately the first 1.5 years for training and the last 0.5 year for testing.
+    # Given data from 2023-04-30 to 2025-04-30 (2 years of data), the default split uses
+    # approximately the first 1.5 years for training and the last 0.5 year for testing.
     # This simulates predicting on unseen, future data.
-    split_date = pd.to_datetime('2024-10-30').tz_localize('UTC') # Cut-off date for train/test split
+    split_date = pd.Timestamp(split_date, tz='UTC') # Cut-off date for train/test split
 
     X_train = X[X.index < split_date]
     y_train = y[y.index < split_date]
@@ -74,15 +91,14 @@ def train_model(df_processed: pd.DataFrame):
 
     # --- 3. Model Selection and Hyperparameter Tuning (Random Forest Classifier) ---
     # RandomForest is a robust choice for tabular data and handles non-linearity well.
-    # We use GridSearchCV for exhaustive search over specified parameter values.
+    # ForestSearch treats n_estimators as a resource: each candidate's forest is warm-started and grown
+    # (50 -> 100 -> 150 trees) instead of refitted, and successive halving drops weak candidates early.
     # TimeSeriesSplit is crucial for cross-validation on time-series data.
 
-    rf_model = RandomForestClassifier(random_state=42) # Initialize model with a random state for reproducibility
-
-    # Define the parameter grid for GridSearchCV
+    # Define the parameter grid
     # These parameters can be adjusted based on computational resources and desired search depth.
     param_grid_rf = {
-        'n_estimators': [50, 100, 150],       # Number of trees in the forest
+        'n_estimators': [50, 100, 150],       # Number of trees in the forest (grown incrementally)
         'max_depth': [None, 10, 20],          # Maximum depth of the tree (None means unlimited)
         'min_samples_split': [2, 5],          # Minimum number of samples required to split an internal node
         'min_samples_leaf': [1, 2],           # Minimum number of samples required to be at a leaf node
@@ -94,24 +110,22 @@ def train_model(df_processed: pd.DataFrame):
     # is a future segment relative to its training set.
     tscv = TimeSeriesSplit(n_splits=3)
 
-    # Setup GridSearchCV
-    grid_search_rf = GridSearchCV(
-        estimator=rf_model,
+    forest_search = ForestSearch(
         param_grid=param_grid_rf,
         cv=tscv,              # Use TimeSeriesSplit for cross-validation
         scoring='recall',     # Optimize for 'recall' to minimize False Negatives (missed floods)
+        search=search,        # 'halving' (default), 'random' or exhaustive 'grid'
         n_jobs=-1,            # Use all available CPU cores for faster computation
-        verbose=1,            # Show progress during grid search
-        error_score='raise'   # Raise errors explicitly for debugging
     )
 
-    print("\nStarting GridSearchCV for RandomForestClassifier hyperparameter tuning...")
-    # Fit GridSearchCV on the training data
-    grid_search_rf.fit(X_train_scaled, y_train)
+    print(f"\nStarting {search} search for RandomForestClassifier hyperparameter tuning...")
+    search_result = forest_search.fit(X_train_scaled, y_train)
 
-    best_rf_model = grid_search_rf.best_estimator_
-    print(f"\nBest Hyperparameters found for RandomForest: {grid_search_rf.best_params_}")
-    print(f"Best cross-validation score (Recall): {grid_search_rf.best_score_:.4f}")
+    # Refit the best configuration on the whole training set
+    best_rf_model = RandomForestClassifier(random_state=42, n_jobs=-1, **search_result.best_params)
+    best_rf_model.fit(X_train_scaled, y_train)
+    print(f"\nBest Hyperparameters found for RandomForest: {search_result.best_params}")
+    print(f"Best cross-validation score (Recall): {search_result.best_score:.4f}")
 
     # --- 4. Saving the Trained Model and Scaler ---
     # It's crucial to save both the trained model and the fitted scaler.
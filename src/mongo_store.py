@@ -0,0 +1,133 @@
+import functools
+import os
+import sys
+import pandas as pd
+import pymongo
+from pymongo import UpdateOne
+
+from src.locations import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, location_key
+
+# Make sure to set the environment variable MONGO_URI with your MongoDB connection string
+# Example: export MONGO_URI="mongodb+srv://<username>:<password>@cluster.mongodb.net/?retryWrites=true&w=majority"
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
+MONGO_DATABASE = "global_solution_weather_data_poc_raw"
+MONGO_POOL_SIZE = 20
+# Operações por chamada de bulk_write
+BULK_BATCH_SIZE = 1000
+DAILY_INDEX_NAME = "location_1_date_1"
+
+
+@functools.lru_cache(maxsize=1)
+def get_client() -> pymongo.MongoClient:
+    """Builds the pooled MongoDB client once per process."""
+    try:
+        return pymongo.MongoClient(MONGO_URI, maxPoolSize=MONGO_POOL_SIZE)
+    # return a friendly error if a URI error is thrown
+    except pymongo.errors.ConfigurationError:
+        print("An Invalid URI host error was received. Is your Atlas host name correct in your connection string?")
+        sys.exit(1)
+
+
+def migrate_daily_collection(collection, latitude: float = DEFAULT_LATITUDE, longitude: float = DEFAULT_LONGITUDE,
+                             batch_size: int = BULK_BATCH_SIZE) -> dict:
+    """
+    Prepares a 'daily' collection written by the old ``insert_many`` runs for the unique index.
+
+    Those runs stored Porto Alegre records without a location and inserted
+    them again on every run. Documents without ``location`` get the key of
+    (``latitude``, ``longitude``); then, for each duplicated (location, date),
+    only the most recently inserted document is kept.
+
+    Returns:
+        dict: Counts of 'backfilled' and 'removed' documents.
+    """
+    backfilled = collection.update_many(
+        {"location": {"$exists": False}},
+        {"$set": {"location": location_key(latitude, longitude), "latitude": latitude, "longitude": longitude}},
+    ).modified_count
+
+    duplicates = collection.aggregate([
+        {"$group": {"_id": {"location": "$location", "date": "$date"}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True)
+    # ObjectId cresce com o tempo de inserção: o maior é o registro mais recente
+    stale = [_id for group in duplicates for _id in sorted(group["ids"])[:-1]]
+    removed = 0
+    for offset in range(0, len(stale), batch_size):
+        removed += collection.delete_many({"_id": {"$in": stale[offset:offset + batch_size]}}).deleted_count
+    if backfilled or removed:
+        print(f"Coleção 'daily' migrada: {backfilled} registros sem local, {removed} duplicados removidos.")
+    return {"backfilled": backfilled, "removed": removed}
+
+
+def get_daily_collection(client: pymongo.MongoClient = None):
+    """
+    Returns the 'daily' collection with its unique (location, date) index.
+
+    The first time, legacy documents are migrated (see
+    ``migrate_daily_collection``) so the index can be built; afterwards this
+    only checks that the index exists.
+    """
+    client = client or get_client()
+    collection = client[MONGO_DATABASE]["daily"]
+    if DAILY_INDEX_NAME not in collection.index_information():
+        migrate_daily_collection(collection)
+        collection.create_index([("location", pymongo.ASCENDING), ("date", pymongo.ASCENDING)],
+                                unique=True, name=DAILY_INDEX_NAME)
+    return collection
+
+
+def high_water_mark(collection, location: str) -> pd.Timestamp:
+    """Latest date stored for ``location`` (UTC), or None if it has no records."""
+    latest = collection.find_one({"location": location}, {"date": 1}, sort=[("date", pymongo.DESCENDING)])
+    if latest is None:
+        return None
+    return pd.Timestamp(latest["date"]).tz_localize("UTC")
+
+
+def ingest_daily(daily_dataframe: pd.DataFrame, latitude: float, longitude: float,
+                 collection=None, incremental: bool = True, batch_size: int = BULK_BATCH_SIZE) -> dict:
+    """
+    Upserts daily records for one location into the 'daily' collection.
+
+    Records are keyed by (location, date), so re-running never duplicates
+    data. In incremental mode only dates after the location's high-water
+    mark are sent. Writes go out as unordered ``bulk_write`` batches.
+
+    Args:
+        daily_dataframe (pd.DataFrame): Daily rows with a 'date' column (UTC).
+        latitude (float): Location latitude.
+        longitude (float): Location longitude.
+        collection: Target collection (defaults to the pooled client's 'daily').
+        incremental (bool): Skip dates at or before the high-water mark.
+        batch_size (int): Operations per ``bulk_write`` call.
+
+    Returns:
+        dict: Counts of 'upserted', 'modified' and 'skipped' records.
+    """
+    collection = collection if collection is not None else get_daily_collection()
+    location = location_key(latitude, longitude)
+
+    df = daily_dataframe
+    skipped = 0
+    if incremental:
+        mark = high_water_mark(collection, location)
+        if mark is not None:
+            df = df[df["date"] > mark]
+            skipped = len(daily_dataframe) - len(df)
+
+    counts = {"upserted": 0, "modified": 0, "skipped": skipped}
+    records = df.to_dict(orient="records")
+    for offset in range(0, len(records), batch_size):
+        operations = [
+            UpdateOne(
+                {"location": location, "date": record["date"]},
+                {"$set": {**record, "location": location, "latitude": latitude, "longitude": longitude}},
+                upsert=True,
+            )
+            for record in records[offset:offset + batch_size]
+        ]
+        result = collection.bulk_write(operations, ordered=False)
+        counts["upserted"] += result.upserted_count
+        counts["modified"] += result.modified_count
+    return counts
@@ -0,0 +1,227 @@
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Union
+import joblib
+
+# Saídas de cada etapa, indexadas pela impressão digital das suas entradas
+PIPELINE_CACHE_DIR = os.environ.get("PIPELINE_CACHE_DIR", ".pipeline_cache")
+# Versões guardadas por etapa (voltar a um parâmetro anterior não refaz a etapa)
+KEEP_PER_STAGE = 3
+MAX_WORKERS = 4
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One node of the pipeline DAG.
+
+    ``func`` is called as ``func(*dep_outputs, **params)``. The stage's
+    fingerprint covers the source of ``func`` and of the ``code`` modules
+    (dotted names, e.g. ``"src.feature_spec"``) it relies on, ``params``, the content of ``files`` and the content hash of
+    each upstream output. With ``cache=False`` the stage always runs (e.g. it
+    reads a database), but its output is still hashed so downstream stages
+    are reused when it did not change.
+
+    ``outputs`` declares the files the stage writes outside the cache. A
+    tuple of paths (e.g. reports) is part of the fingerprint with the
+    files' state after the run: a deleted or overwritten artifact no longer
+    matches, so the stage runs again and rewrites it. A callable maps the
+    stage's output to the paths it wrote (e.g. the manifest of a published
+    version); they are not fingerprinted, but a cached output whose files
+    are gone counts as a miss.
+    """
+
+    name: str
+    func: Callable
+    deps: tuple = ()
+    params: dict = field(default_factory=dict)
+    code: tuple = ()
+    files: tuple = ()
+    outputs: Union[tuple, Callable] = ()
+    cache: bool = True
+
+
+def _hash_file(path: str, digest=None):
+    digest = digest or hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest
+
+
+def _code_digest(stage: Stage) -> str:
+    # Só a função em si e os módulos declarados: editar o script que monta o DAG não invalida tudo
+    digest = hashlib.sha1(inspect.getsource(stage.func).encode())
+    for source in sorted({importlib.util.find_spec(module).origin for module in stage.code}):
+        _hash_file(source, digest)
+    return digest.hexdigest()
+
+
+def _static_outputs(stage: Stage) -> tuple:
+    return () if callable(stage.outputs) else stage.outputs
+
+
+def fingerprint(stage: Stage, upstream: dict) -> str:
+    """Hash of everything that determines the stage's output."""
+    digest = hashlib.sha1()
+    digest.update(json.dumps({"stage": stage.name, "params": stage.params,
+                              "upstream": [upstream[d] for d in stage.deps]},
+                             sort_keys=True, default=str).encode())
+    digest.update(_code_digest(stage).encode())
+    for path in stage.files:
+        digest.update(path.encode())
+        if os.path.exists(path):
+            _hash_file(path, digest)
+    for path in _static_outputs(stage):
+        # Artefato ausente também entra na impressão digital
+        digest.update(f"output:{path}:{os.path.exists(path)}".encode())
+        if os.path.exists(path):
+            _hash_file(path, digest)
+    return digest.hexdigest()[:16]
+
+
+class StageCache:
+    """On-disk outputs: ``<dir>/<stage>/<fingerprint>.joblib`` plus a ``.json`` with the content hash."""
+
+    def __init__(self, cache_dir: str = PIPELINE_CACHE_DIR, keep: int = KEEP_PER_STAGE):
+        self.cache_dir = cache_dir
+        self.keep = keep
+
+    def _path(self, stage: str, key: str, ext: str) -> str:
+        return os.path.join(self.cache_dir, stage, f"{key}.{ext}")
+
+    def lookup(self, stage: str, key: str):
+        """Content hash of a cached output, or None."""
+        meta, data = self._path(stage, key, "json"), self._path(stage, key, "joblib")
+        if not (os.path.exists(meta) and os.path.exists(data)):
+            return None
+        with open(meta) as f:
+            return json.load(f)["content"]
+
+    def load(self, stage: str, key: str):
+        return joblib.load(self._path(stage, key, "joblib"))
+
+    def store(self, stage: str, key: str, value) -> str:
+        data = self._path(stage, key, "joblib")
+        os.makedirs(os.path.dirname(data), exist_ok=True)
+        # Escrita atômica: uma execução interrompida não deixa saída truncada no cache
+        joblib.dump(value, f"{data}.tmp")
+        content = _hash_file(f"{data}.tmp").hexdigest()[:16]
+        os.replace(f"{data}.tmp", data)
+        with open(f"{self._path(stage, key, 'json')}.tmp", "w") as f:
+            json.dump({"content": content, "created_at": time.time()}, f)
+        os.replace(f"{self._path(stage, key, 'json')}.tmp", self._path(stage, key, "json"))
+        self._prune(stage)
+        return content
+
+    def _prune(self, stage: str):
+        directory = os.path.join(self.cache_dir, stage)
+        metas = sorted((name for name in os.listdir(directory) if name.endswith(".json")),
+                       key=lambda name: os.path.getmtime(os.path.join(directory, name)), reverse=True)
+        for name in metas[self.keep:]:
+            for ext in (".json", ".joblib"):
+                path = os.path.join(directory, name[:-len(".json")] + ext)
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def _check_dag(stages: list) -> dict:
+    by_name = {stage.name: stage for stage in stages}
+    if len(by_name) != len(stages):
+        raise ValueError("Stage names must be unique.")
+    for stage in stages:
+        missing = [d for d in stage.deps if d not in by_name]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stages {missing}.")
+    # Detecção de ciclos (ordenação topológica de Kahn)
+    pending = {stage.name: set(stage.deps) for stage in stages}
+    while pending:
+        ready = [name for name, deps in pending.items() if not deps]
+        if not ready:
+            raise ValueError(f"The stages {sorted(pending)} form a cycle.")
+        for name in ready:
+            del pending[name]
+        for deps in pending.values():
+            deps.difference_update(ready)
+    return by_name
+
+
+def run_stages(stages: list, cache_dir: str = PIPELINE_CACHE_DIR, force: tuple = (), use_cache: bool = True,
+               max_workers: int = MAX_WORKERS, load: tuple = ()) -> dict:
+    """
+    Runs a DAG of stages, reusing cached outputs whose fingerprint is unchanged.
+
+    Stages whose dependencies are done run concurrently in a thread pool
+    (the expensive ones are I/O bound or release the GIL). A cached stage is
+    not loaded from disk unless a stage that has to run needs its output,
+    so changing one stage only pays for that stage and what depends on it.
+
+    Args:
+        stages (list): ``Stage`` objects.
+        cache_dir (str): Cache directory.
+        force (tuple): Stage names to rerun even if cached ('all' reruns everything).
+        use_cache (bool): False runs every stage (outputs are still stored).
+        max_workers (int): Stages running at the same time.
+        load (tuple): Stages whose output must be returned even if they were cached.
+
+    Returns:
+        dict: Stage name -> output, for the stages that ran or were loaded.
+    """
+    by_name = _check_dag(stages)
+    cache = StageCache(cache_dir)
+    keys, contents, outputs = {}, {}, {}
+    done, running = set(), {}
+
+    def value(name: str):
+        if name not in outputs:
+            outputs[name] = cache.load(name, keys[name])
+        return outputs[name]
+
+    def execute(stage: Stage, key: str):
+        start = time.perf_counter()
+        result = stage.func(*[value(d) for d in stage.deps], **stage.params)
+        if _static_outputs(stage):
+            # Guarda sob a impressão digital dos artefatos recém-escritos: a próxima execução os encontra iguais
+            key = keys[stage.name] = fingerprint(stage, contents)
+        content = cache.store(stage.name, key, result)
+        print(f"[{stage.name}] done in {time.perf_counter() - start:.1f}s")
+        return result, content
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage") as pool:
+        while len(done) < len(by_name):
+            for stage in by_name.values():
+                if stage.name in done or stage.name in running or not all(d in done for d in stage.deps):
+                    continue
+                key = keys[stage.name] = fingerprint(stage, contents)
+                cached = None
+                if use_cache and stage.cache and stage.name not in force and "all" not in force:
+                    cached = cache.lookup(stage.name, key)
+                if cached is not None and callable(stage.outputs):
+                    # Saída em cache só vale se os arquivos que ela gravou ainda existem
+                    if not all(os.path.exists(path) for path in stage.outputs(value(stage.name))):
+                        print(f"[{stage.name}] cached output's files are missing")
+                        outputs.pop(stage.name, None)
+                        cached = None
+                if cached is not None:
+                    print(f"[{stage.name}] cached ({key})")
+                    contents[stage.name] = cached
+                    done.add(stage.name)
+                    continue
+                print(f"[{stage.name}] running ({key})...")
+                running[stage.name] = pool.submit(execute, stage, key)
+            if not running:
+                continue
+            finished, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+            for name in [n for n, future in running.items() if future in finished]:
+                outputs[name], contents[name] = running.pop(name).result()
+                done.add(name)
+
+    for name in load:
+        value(name)
+    return outputs
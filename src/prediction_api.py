@@ -2,80 +2,309 @@ import openmeteo_requests
 import pandas as pd
 import requests_cache
 from retry_requests import retry
-import joblib
 import datetime
+import functools
+import os
+import threading
+import time
+from concurrent.futures import Future
 import numpy as np
 
-# Carrega o modelo treinado e o scaler
-MODEL_PATH = "./models/trained_models/flood_prediction_model_v1.pkl"
-SCALER_PATH = "./models/trained_models/StandardScaler_v1.pkl"
+from src.model_registry import ModelRegistry
+from src.feature_spec import DAILY_VARIABLES, FeatureSpec, compute_feature_matrix
+from src.feature_state import HISTORY_DAYS, FeatureStateStore
+from src.locations import DEFAULT_LATITUDE, DEFAULT_LONGITUDE
+from src.threshold_analysis import DEFAULT_RISK_BANDS, classify_risk
 
-model = joblib.load(MODEL_PATH)
-scaler = joblib.load(SCALER_PATH)
+# Diretório do registro de modelos (bundles versionados de modelo + scaler)
+MODELS_DIR = os.environ.get("MODELS_DIR", "./models/trained_models")
 
-def get_today_weather_data():
-    # Configura o cliente da API Open-Meteo
-    cache_session = requests_cache.CachedSession('.cache', expire_after = -1)
+# Tempo de vida (segundos) de uma previsão em cache
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", 300))
+PREDICTION_CACHE_MAX_ENTRIES = 1024
+# Falhas (ex.: Open-Meteo fora do ar) ficam em cache por pouco tempo: evita repetir a busca a cada chamada
+PREDICTION_ERROR_TTL = float(os.environ.get("PREDICTION_ERROR_TTL", 30))
+
+# Previsão em lote: coordenadas por requisição ao Open-Meteo e dias de
+# histórico necessários para os lags e somas móveis (janela máxima de 7 dias)
+BATCH_LOCATIONS_PER_REQUEST = 100
+FEATURE_LOOKBACK_DAYS = HISTORY_DAYS
+
+OPEN_METEO_URL = os.environ.get("OPEN_METEO_URL", "https://archive-api.open-meteo.com/v1/archive")
+
+
+class PredictionCache:
+    """
+    TTL cache for predictions with single-flight deduplication.
+
+    Concurrent misses for the same key wait on the first caller's computation
+    instead of each hitting Open-Meteo and the model. A failed computation is
+    kept for ``error_ttl`` seconds and re-raised to every caller, so an
+    upstream outage costs one fetch per ``error_ttl`` rather than one per
+    call. ``invalidate()`` drops every entry, and results computed before it
+    are not stored.
+    """
+
+    def __init__(self, ttl: float = PREDICTION_CACHE_TTL, max_entries: int = PREDICTION_CACHE_MAX_ENTRIES,
+                 error_ttl: float = PREDICTION_ERROR_TTL):
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._inflight = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                if entry[2] is not None:
+                    raise entry[2]
+                return entry[1]
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                generation = self._generation
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if isinstance(e, Exception):
+                    self._store(key, generation, self.error_ttl, None, e)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._store(key, generation, self.ttl, value, None)
+        future.set_result(value)
+        return value
+
+    def _store(self, key, generation: int, ttl: float, value, error: Exception):
+        # Chamado com o lock; resultados anteriores a um invalidate() são descartados
+        if generation != self._generation or ttl <= 0:
+            return
+        now = time.monotonic()
+        if len(self._entries) >= self.max_entries:
+            self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+        self._entries[key] = (now + ttl, value, error)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+
+prediction_cache = PredictionCache()
+
+# Histórico diário recente por local, para calcular lags e somas móveis
+# sem buscar a janela inteira a cada previsão
+feature_states = FeatureStateStore(DAILY_VARIABLES)
+
+# O modelo é carregado sob demanda na primeira previsão; trocar de versão
+# invalida as previsões em cache
+registry = ModelRegistry(MODELS_DIR)
+registry.add_listener(lambda bundle: prediction_cache.invalidate())
+
+
+def get_risk_bands(bundle=None) -> list:
+    """
+    Risk bands saved in the manifest of ``bundle`` (default: the current model).
+
+    Bundles published without bands, or no published model at all, use
+    ``DEFAULT_RISK_BANDS``.
+    """
+    if bundle is None:
+        try:
+            bundle = registry.get()
+        except FileNotFoundError:
+            return DEFAULT_RISK_BANDS
+    return bundle.manifest.get("risk_bands") or DEFAULT_RISK_BANDS
+
+
+def risk_level(probability, bundle=None):
+    """Risk level ('low' ... 'critical') of a flood probability or array of them."""
+    return classify_risk(probability, get_risk_bands(bundle))
+
+
+@functools.lru_cache(maxsize=1)
+def get_openmeteo_client():
+    """Builds the Open-Meteo client (cache + retry session) once per process."""
+    cache_session = requests_cache.CachedSession('.cache', expire_after = PREDICTION_CACHE_TTL)
     retry_session = retry(cache_session, retries = 5, backoff_factor = 0.2)
-    openmeteo = openmeteo_requests.Client(session = retry_session)
+    return openmeteo_requests.Client(session = retry_session)
 
-    # Define as datas para hoje
-    today = datetime.date.today()
-    params = {
-        "latitude": -30.03508379255499,
-        "longitude": -51.19020276769795,
-        "start_date": today.strftime("%Y-%m-%d"),
-        "end_date": today.strftime("%Y-%m-%d"),
-        "daily": [
-            "temperature_2m_mean", "temperature_2m_max", "temperature_2m_min",
-            "wind_speed_10m_max", "wind_gusts_10m_max", "wind_direction_10m_dominant",
-            "precipitation_sum", "rain_sum"
-        ]
-    }
-    url = "https://archive-api.open-meteo.com/v1/archive"
-    responses = openmeteo.weather_api(url, params=params)
-    response = responses[0]
-    daily = response.Daily()
-
-    # Extrai os dados diários
-    data = {
-        "temperature_2m_mean": daily.Variables(0).ValuesAsNumpy()[0],
-        "temperature_2m_max": daily.Variables(1).ValuesAsNumpy()[0],
-        "temperature_2m_min": daily.Variables(2).ValuesAsNumpy()[0],
-        "wind_speed_10m_max": daily.Variables(3).ValuesAsNumpy()[0],
-        "wind_gusts_10m_max": daily.Variables(4).ValuesAsNumpy()[0],
-        "wind_direction_10m_dominant": daily.Variables(5).ValuesAsNumpy()[0],
-        "precipitation_sum": daily.Variables(6).ValuesAsNumpy()[0],
-        "rain_sum": daily.Variables(7).ValuesAsNumpy()[0],
-    }
-    return pd.DataFrame([data])
-
-def predict_flood():
-    # Obtém os dados do dia
-    df_today = get_today_weather_data()
-    
-    # Garante que todos os recursos esperados estejam presentes
-    expected_features = scaler.feature_names_in_
-    for col in expected_features:
-        if col not in df_today.columns:
-            df_today[col] = 0  # ou outro valor padrão apropriado
-    df_today = df_today[expected_features]
-    
-    # Aplica o scaler
-    X_scaled = scaler.transform(df_today)
+
+def reload_model(version: str):
+    """Activates a model version without a restart and invalidates cached predictions."""
+    return registry.activate(version)
+
+
+def feature_fetch_start(latitude: float, longitude: float, day: datetime.date) -> datetime.date:
+    """
+    First day that must be fetched to score ``day`` at this location.
+
+    A cold state (or one more than a day behind) needs the whole history
+    window; otherwise only ``day`` itself is fetched.
+    """
+    state = feature_states.get((round(latitude, 4), round(longitude, 4)))
+    if state is None or not (state.day <= day <= state.day + datetime.timedelta(days=1)):
+        return day - datetime.timedelta(days=HISTORY_DAYS)
+    return day
+
+def apply_location_weather(feature_names: list, latitude: float, longitude: float,
+                           dates: pd.DatetimeIndex, daily: dict) -> np.ndarray:
+    """
+    Folds fetched days into the location's feature state and returns the row for the last one.
+    """
+    key = (round(latitude, 4), round(longitude, 4))
+    days = [d.date() for d in dates]
+    rows = [{name: daily[name][0, i] for name in DAILY_VARIABLES} for i in range(len(days))]
+    state = feature_states.get(key)
+    if len(days) > 1 or state is None:
+        state = feature_states.seed(key, days, rows)
+    else:
+        with state.lock:
+            state.update(days[0], rows[0])
+    with state.lock:
+        return state.row(feature_names)
+
+def get_location_features(feature_names: list, latitude: float, longitude: float, day: datetime.date) -> np.ndarray:
+    """
+    Returns the feature row for ``day`` from the location's incremental state.
+
+    The first call for a location (or one after a gap of more than a day)
+    seeds the state with a single request covering the history window; later
+    calls only fetch ``day`` itself and update the state in O(1).
+    """
+    start = feature_fetch_start(latitude, longitude, day)
+    dates, daily = get_weather_matrix([{"latitude": latitude, "longitude": longitude}], start, day)
+    return apply_location_weather(feature_names, latitude, longitude, dates, daily)
+
+def score_row(bundle, row: np.ndarray) -> tuple:
+    """Scores one feature row with the bundle's compiled pipeline; returns ``(prediction, probability)``."""
+    return bundle.pipeline.predict(row)
+
+def _predict(bundle, latitude: float, longitude: float, day: datetime.date):
+    # Features do dia com lags e somas móveis reais (sem preencher com zero)
+    row = get_location_features(bundle.feature_names, latitude, longitude, day)
     # Faz a previsão
-    prediction = model.predict(X_scaled)
-    probability = model.predict_proba(X_scaled)[0][1] if hasattr(model, "predict_proba") else None
+    prediction, probability = score_row(bundle, row)
 
-    if prediction[0] == 1:
+    if prediction == 1:
         print("ALERTA: Possível enchente detectada para hoje!")
     else:
         print("Sem risco de enchente detectado para hoje.")
 
-    if probability is not None:
-        print(f"Probabilidade prevista de enchente: {probability:.2%}")
-        
-    return prediction[0], probability
+    print(f"Probabilidade prevista de enchente: {probability:.2%}")
+
+    return prediction, probability
+
+def predict_flood(latitude: float = DEFAULT_LATITUDE, longitude: float = DEFAULT_LONGITUDE):
+    # Uma busca no Open-Meteo e uma inferência por (local, dia, modelo) a cada TTL
+    bundle = registry.get()
+    today = datetime.date.today()
+    key = (round(latitude, 4), round(longitude, 4), today.isoformat(), bundle.version)
+    return prediction_cache.get_or_compute(key, lambda: _predict(bundle, latitude, longitude, today))
+
+def get_weather_matrix(locations: list, start_date: datetime.date, end_date: datetime.date) -> tuple:
+    """
+    Fetches daily weather for many locations with multi-coordinate requests.
+
+    Args:
+        locations (list): Dicts with ``latitude`` and ``longitude``.
+        start_date (datetime.date): First day (inclusive).
+        end_date (datetime.date): Last day (inclusive).
+
+    Returns:
+        tuple: A tuple containing:
+               - dates (pd.DatetimeIndex): The T days covered.
+               - daily (dict): Variable name -> ``(len(locations), T)`` float array.
+    """
+    openmeteo = get_openmeteo_client()
+    dates = pd.date_range(start_date, end_date, freq="D", tz="UTC")
+    daily = {name: np.full((len(locations), len(dates)), np.nan) for name in DAILY_VARIABLES}
+
+    for offset in range(0, len(locations), BATCH_LOCATIONS_PER_REQUEST):
+        chunk = locations[offset:offset + BATCH_LOCATIONS_PER_REQUEST]
+        params = {
+            "latitude": [loc["latitude"] for loc in chunk],
+            "longitude": [loc["longitude"] for loc in chunk],
+            "start_date": start_date.strftime("%Y-%m-%d"),
+            "end_date": end_date.strftime("%Y-%m-%d"),
+            "daily": DAILY_VARIABLES
+        }
+        # Uma resposta por coordenada, na mesma ordem da requisição
+        responses = openmeteo.weather_api(OPEN_METEO_URL, params=params)
+        for row, response in enumerate(responses, start=offset):
+            values = response.Daily()
+            for i, name in enumerate(DAILY_VARIABLES):
+                series = values.Variables(i).ValuesAsNumpy()
+                # A API pode devolver mais ou menos dias que o intervalo pedido
+                n = min(len(series), len(dates))
+                daily[name][row, :n] = series[:n]
+    return dates, daily
+
+def compute_features(daily: dict, feature_names: list = None, dates: pd.DatetimeIndex = None) -> dict:
+    """
+    Computes the model's features on ``(locations, days)`` arrays.
+
+    The spec is rebuilt from ``feature_names`` (the bundle's training columns),
+    so serving derives exactly the features the model was trained on, with
+    the same definitions as ``data_preprocessing``. Leading days without
+    enough history are NaN.
+    """
+    spec = FeatureSpec.from_feature_names(feature_names) if feature_names is not None else FeatureSpec()
+    return compute_feature_matrix(daily, spec, dates)
+
+def predict_batch(locations: list, date_range: tuple) -> pd.DataFrame:
+    """
+    Scores every (location, day) pair with one feature pass and one model pass.
+
+    Args:
+        locations (list): Dicts with ``latitude``, ``longitude`` and optionally ``name``.
+        date_range (tuple): ``(start_date, end_date)`` as dates or ISO strings, inclusive.
+
+    Returns:
+        pd.DataFrame: One row per location and day with ``flood_risk`` and ``probability``.
+    """
+    bundle = registry.get()
+    start_date, end_date = (pd.Timestamp(d).date() for d in date_range)
+    fetch_start = start_date - datetime.timedelta(days=FEATURE_LOOKBACK_DAYS)
+
+    dates, daily = get_weather_matrix(locations, fetch_start, end_date)
+    return score_batch(bundle, locations, dates, daily)
+
+def score_batch(bundle, locations: list, dates: pd.DatetimeIndex, daily: dict) -> pd.DataFrame:
+    """Feature pass and one compiled-pipeline pass over fetched weather (history days included)."""
+    features = compute_features(daily, bundle.feature_names, dates)
+
+    # Descarta os dias de histórico e monta a matriz (locais * dias, features)
+    keep = slice(FEATURE_LOOKBACK_DAYS, None)
+    n_locations, n_days = len(locations), len(dates) - FEATURE_LOOKBACK_DAYS
+    X = np.empty((n_locations * n_days, len(bundle.feature_names)))
+    for j, name in enumerate(bundle.feature_names):
+        X[:, j] = features[name][:, keep].reshape(-1)
+    # Scaler já dobrado nos limiares das árvores: sem cópia escalada nem DataFrame
+    predictions, probabilities = bundle.pipeline.predict(X)
+
+    return pd.DataFrame({
+        "name": np.repeat([loc.get("name") for loc in locations], n_days),
+        "latitude": np.repeat([loc["latitude"] for loc in locations], n_days),
+        "longitude": np.repeat([loc["longitude"] for loc in locations], n_days),
+        "date": np.tile(dates[keep].strftime("%Y-%m-%d"), n_locations),
+        "flood_risk": predictions.astype(bool),
+        "probability": probabilities,
+        "risk_level": risk_level(probabilities, bundle),
+    })
 
 if __name__ == "__main__":
-    predict_flood()
\ No newline at end of file
+    predict_flood()
@@ -0,0 +1,97 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+# Linhas por row group: filtros de data pulam grupos inteiros sem decodificá-los
+ROW_GROUP_SIZE = 65_536
+
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Downcasts a processed DataFrame for storage.
+
+    Measurements become float32, ``is_*`` flags bool and the remaining
+    integer columns (target, calendar fields) the smallest integer type.
+    The index becomes a UTC DatetimeIndex named 'date'.
+    """
+    df = df.copy()
+    for column in df.columns:
+        series = df[column]
+        if column.startswith("is_") and series.dropna().isin([0, 1]).all() and not series.isna().any():
+            df[column] = series.astype(bool)
+        elif pd.api.types.is_float_dtype(series):
+            df[column] = series.astype("float32")
+        elif pd.api.types.is_integer_dtype(series):
+            df[column] = pd.to_numeric(series, downcast="integer")
+
+    index = pd.DatetimeIndex(pd.to_datetime(df.index))
+    df.index = index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")
+    df.index.name = "date"
+    return df.sort_index(kind="stable")
+
+
+def write_processed(df: pd.DataFrame, path: str) -> str:
+    """
+    Writes a processed DataFrame as Parquet (``.parquet``) or Feather (``.feather``).
+
+    Parquet is compressed and split into row groups with date statistics;
+    Feather is uncompressed so it can be memory-mapped.
+    """
+    table = pa.Table.from_pandas(optimize_dtypes(df), preserve_index=True)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".feather"):
+        feather.write_feather(table, path, compression="uncompressed")
+    else:
+        pq.write_table(table, path, row_group_size=ROW_GROUP_SIZE, compression="zstd")
+    return path
+
+
+def read_processed(path: str, columns: list = None, start_date=None, end_date=None) -> pd.DataFrame:
+    """
+    Reads a processed Parquet/Feather file, optionally a column subset and date slice.
+
+    Args:
+        path (str): ``.parquet`` or ``.feather`` file written by ``write_processed``.
+        columns (list, optional): Columns to read besides the date index.
+        start_date, end_date (optional): Inclusive date bounds (UTC).
+
+    Returns:
+        pd.DataFrame: Indexed by 'date', keeping the stored dtypes.
+    """
+    read_columns = None if columns is None else ["date"] + [c for c in columns if c != "date"]
+    start = pd.Timestamp(start_date, tz="UTC") if start_date is not None else None
+    end = pd.Timestamp(end_date, tz="UTC") if end_date is not None else None
+
+    if path.endswith(".feather"):
+        # Mapeado em memória: só as colunas pedidas são tocadas
+        table = feather.read_table(path, columns=read_columns, memory_map=True)
+        mask = None
+        if start is not None:
+            mask = pc.greater_equal(table["date"], pa.scalar(start, type=table.schema.field("date").type))
+        if end is not None:
+            upper = pc.less_equal(table["date"], pa.scalar(end, type=table.schema.field("date").type))
+            mask = upper if mask is None else pc.and_(mask, upper)
+        if mask is not None:
+            table = table.filter(mask)
+    else:
+        filters = []
+        if start is not None:
+            filters.append(("date", ">=", start))
+        if end is not None:
+            filters.append(("date", "<=", end))
+        table = pq.read_table(path, columns=read_columns, filters=filters or None)
+
+    df = table.to_pandas()
+    return df.set_index("date") if "date" in df.columns else df
+
+
+if __name__ == "__main__":
+    # Converte o CSV processado para Parquet
+    from src.data_sources import iter_file_chunks
+    csv_path = "data/processed/merged_processed_data.csv"
+    df = pd.concat(iter_file_chunks(csv_path))
+    out = write_processed(df, csv_path.replace(".csv", ".parquet"))
+    print(f"{len(df)} rows written to {out} ({os.path.getsize(out)} bytes, CSV: {os.path.getsize(csv_path)} bytes).")
@@ -3,13 +3,25 @@
 #define TRIG_PIN 16
 #define ECHO_PIN 17
 
+// Intervalo entre amostras (ms)
+#define SAMPLE_INTERVAL_MS 200
+// Timeout do eco (~5 m ida e volta); sem eco o sensor reporta DISTANCE_NO_ECHO
+#define ECHO_TIMEOUT_US 30000UL
+#define DISTANCE_NO_ECHO 9999
+
+// Quadro de telemetria, largura fixa (27 bytes com o CRLF do println):
+//   $SSSSS,MMMMMMMMMM,DDDD*CC
+// S = sequência (uint16), M = millis(), D = distância em cm,
+// CC = XOR em hexadecimal de todos os bytes entre '$' e '*'.
+static uint16_t seq = 0;
+
 void setup() {
   Serial.begin(115200);
   pinMode(TRIG_PIN, OUTPUT);
   pinMode(ECHO_PIN, INPUT);
 }
 
-void loop() {
+long readDistanceCm() {
   // Envia pulso para o sensor
   digitalWrite(TRIG_PIN, LOW);
   delayMicroseconds(2);
@@ -18,13 +30,30 @@ void loop() {
   digitalWrite(TRIG_PIN, LOW);
 
   // Lê o tempo do pulso de retorno
-  long duration = pulseIn(ECHO_PIN, HIGH);
+  unsigned long duration = pulseIn(ECHO_PIN, HIGH, ECHO_TIMEOUT_US);
+  if (duration == 0) {
+    return DISTANCE_NO_ECHO;
+  }
   // Calcula a distância em centímetros
   long distance = duration * 0.0343 / 2;
+  return distance > DISTANCE_NO_ECHO ? DISTANCE_NO_ECHO : distance;
+}
 
-  if (distance < 300) {
-    Serial.println("ALERTA: Nível de água alto! Risco de enchente!");
+void loop() {
+  long distance = readDistanceCm();
+
+  char payload[24];
+  snprintf(payload, sizeof(payload), "%05u,%010lu,%04ld",
+           seq++, (unsigned long) millis(), distance);
+
+  uint8_t checksum = 0;
+  for (const char *p = payload; *p; p++) {
+    checksum ^= (uint8_t) *p;
   }
 
-  delay(5000); // Mede a cada 5 segundos
-}
\ No newline at end of file
+  char frame[32];
+  snprintf(frame, sizeof(frame), "$%s*%02X", payload, checksum);
+  Serial.println(frame);
+
+  delay(SAMPLE_INTERVAL_MS);
+}
@@ -0,0 +1,135 @@
+import threading
+import time
+import numpy as np
+
+# Capacidade padrão por sensor: ~27 min a 5 leituras/s, ~96 KB de memória
+DEFAULT_CAPACITY = 8192
+# Janelas (segundos) resumidas para o dashboard: 1, 5 e 15 minutos
+SUMMARY_WINDOWS = (60, 300, 900)
+SUMMARY_PERCENTILES = (50, 90)
+
+
+class ReadingRingBuffer:
+    """
+    Fixed-memory time series of (timestamp, distance) for one sensor.
+
+    Readings live in two preallocated numpy arrays used as a circular buffer,
+    so appending is O(1) and memory never grows. Windowed queries locate the
+    window with ``searchsorted`` on the (chronological) buffer segments and
+    aggregate it with vectorized numpy calls. Distances are in cm; NaN marks
+    a sample without a valid echo.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._ts = np.zeros(capacity, dtype=np.float64)
+        self._distance = np.zeros(capacity, dtype=np.float32)
+        self._head = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def append(self, timestamp: float, distance_cm: float):
+        with self._lock:
+            self._ts[self._head] = timestamp
+            self._distance[self._head] = distance_cm
+            self._head = (self._head + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def extend(self, timestamps: np.ndarray, distances_cm: np.ndarray):
+        timestamps = np.asarray(timestamps, dtype=np.float64)[-self.capacity:]
+        distances_cm = np.asarray(distances_cm, dtype=np.float32)[-self.capacity:]
+        n = len(timestamps)
+        with self._lock:
+            idx = (self._head + np.arange(n)) % self.capacity
+            self._ts[idx] = timestamps
+            self._distance[idx] = distances_cm
+            self._head = (self._head + n) % self.capacity
+            self._size = min(self._size + n, self.capacity)
+
+    def window(self, seconds: float, now: float = None) -> tuple:
+        """
+        Returns the (timestamps, distances) recorded in the last ``seconds``.
+
+        Args:
+            seconds (float): Window length.
+            now (float, optional): End of the window; defaults to ``time.time()``.
+
+        Returns:
+            tuple: Two numpy arrays in chronological order.
+        """
+        cutoff = (time.time() if now is None else now) - seconds
+        with self._lock:
+            if self._size < self.capacity:
+                segments = [slice(0, self._size)]
+            else:
+                segments = [slice(self._head, self.capacity), slice(0, self._head)]
+            parts_ts, parts_distance = [], []
+            for seg in segments:
+                ts = self._ts[seg]
+                start = np.searchsorted(ts, cutoff, side="left")
+                parts_ts.append(ts[start:])
+                parts_distance.append(self._distance[seg][start:])
+            return np.concatenate(parts_ts), np.concatenate(parts_distance)
+
+    def stats(self, seconds: float, now: float = None) -> dict:
+        """
+        Aggregates one window: count, min, max, mean, percentiles and rate of rise.
+
+        The rate of rise is the least-squares slope of the water level in
+        cm/min. The sensor measures the distance down to the water, so a
+        rising level is a shrinking distance and the sign is flipped.
+        """
+        ts, distance = self.window(seconds, now)
+        valid = ~np.isnan(distance)
+        ts, distance = ts[valid], distance[valid].astype(np.float64)
+        result = {"window_s": seconds, "count": int(len(distance))}
+        if not len(distance):
+            return result
+
+        result.update({
+            "min_cm": float(distance.min()),
+            "max_cm": float(distance.max()),
+            "mean_cm": float(distance.mean()),
+        })
+        for q, value in zip(SUMMARY_PERCENTILES, np.percentile(distance, SUMMARY_PERCENTILES)):
+            result[f"p{q}_cm"] = float(value)
+
+        rate = None
+        if len(distance) >= 2:
+            t = ts - ts.mean()
+            denom = np.dot(t, t)
+            if denom > 0:
+                slope = np.dot(t, distance - distance.mean()) / denom
+                rate = float(-slope * 60.0)
+        result["rate_of_rise_cm_per_min"] = rate
+        return result
+
+
+class SensorStore:
+    """Process-wide map of sensor id to its ``ReadingRingBuffer``."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def buffer(self, sensor_id: str) -> ReadingRingBuffer:
+        buf = self._buffers.get(sensor_id)
+        if buf is None:
+            with self._lock:
+                buf = self._buffers.setdefault(sensor_id, ReadingRingBuffer(self.capacity))
+        return buf
+
+    def sensors(self) -> list:
+        return list(self._buffers)
+
+    def record(self, sensor_id: str, timestamps: np.ndarray, distances_cm: np.ndarray):
+        self.buffer(sensor_id).extend(timestamps, distances_cm)
+
+    def summary(self, sensor_id: str, windows=SUMMARY_WINDOWS, now: float = None) -> dict:
+        now = time.time() if now is None else now
+        buf = self.buffer(sensor_id)
+        return {f"{int(w // 60)}min": buf.stats(w, now) for w in windows}
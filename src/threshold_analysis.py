@@ -0,0 +1,222 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+REPORTS_DIR = "reports"
+THRESHOLDS_FILE = "thresholds.json"
+
+# Custo relativo dos erros: perder uma enchente custa muito mais que um alarme falso
+COST_FALSE_NEGATIVE = 10.0
+COST_FALSE_POSITIVE = 1.0
+# Metas que definem as faixas de risco a partir das curvas
+RECALL_TARGET = 0.9
+PRECISION_TARGET = 0.8
+BOOTSTRAP_SAMPLES = 1000
+BOOTSTRAP_BATCH = 250
+# Pontos da curva gravados no artefato (a curva completa tem um ponto por probabilidade distinta)
+CURVE_POINTS = 200
+
+# Faixas usadas enquanto não houver um artefato de limiares
+DEFAULT_RISK_BANDS = [
+    {"level": "moderate", "min_probability": 0.3},
+    {"level": "high", "min_probability": 0.6},
+    {"level": "critical", "min_probability": 0.8},
+]
+
+
+def threshold_curve(y_true, y_proba, cost_fn: float = COST_FALSE_NEGATIVE,
+                    cost_fp: float = COST_FALSE_POSITIVE) -> pd.DataFrame:
+    """
+    Precision, recall, F1 and expected cost at every candidate threshold.
+
+    An alert is raised when ``probability >= threshold``. Rows are sorted by
+    probability once and the confusion counts of every distinct probability
+    come from one cumulative sum, so the cost is ``O(n log n)`` overall. The
+    first row (threshold ``inf``) is "never alert".
+
+    Args:
+        y_true: Binary labels (1 = flood).
+        y_proba: Predicted flood probabilities.
+        cost_fn (float): Cost of a missed flood.
+        cost_fp (float): Cost of a false alarm.
+
+    Returns:
+        pd.DataFrame: One row per threshold, in decreasing threshold order.
+    """
+    y_true = np.asarray(y_true).astype(bool)
+    y_proba = np.asarray(y_proba, dtype=np.float64)
+    n = len(y_true)
+    order = np.argsort(-y_proba, kind="stable")
+    proba, labels = y_proba[order], y_true[order]
+
+    # Último índice de cada probabilidade distinta: empates entram juntos no alerta
+    last = np.flatnonzero(np.r_[proba[1:] != proba[:-1], True])
+    tp = np.r_[0, np.cumsum(labels)[last]]
+    fp = np.r_[0, last + 1 - tp[1:]]
+    thresholds = np.r_[np.inf, proba[last]]
+    positives = int(labels.sum())
+    fn = positives - tp
+    tn = (n - positives) - fp
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), np.nan)
+        recall = tp / positives if positives else np.full(len(tp), np.nan)
+        f1 = np.where(2 * tp + fp + fn > 0, 2 * tp / (2 * tp + fp + fn), np.nan)
+    return pd.DataFrame({
+        "threshold": thresholds, "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+        "precision": precision, "recall": recall, "f1": f1,
+        "expected_cost": (cost_fn * fn + cost_fp * fp) / max(n, 1),
+    })
+
+
+def bootstrap_intervals(y_true, y_proba, thresholds, n_boot: int = BOOTSTRAP_SAMPLES, confidence: float = 0.95,
+                        cost_fn: float = COST_FALSE_NEGATIVE, cost_fp: float = COST_FALSE_POSITIVE,
+                        batch_size: int = BOOTSTRAP_BATCH, seed: int = 42) -> pd.DataFrame:
+    """
+    Bootstrap confidence intervals of the metrics at fixed thresholds.
+
+    At fixed thresholds the metrics only depend on how many rows of each
+    class fall between consecutive thresholds. A bootstrap resample is
+    therefore a multinomial draw over those ``(bin, class)`` cells, and
+    ``batch_size`` resamples are drawn as one array. The cost does not grow
+    with the number of rows.
+
+    Returns:
+        pd.DataFrame: ``<metric>_low`` / ``<metric>_high`` per threshold.
+    """
+    y_true = np.asarray(y_true).astype(np.int64)
+    y_proba = np.asarray(y_proba, dtype=np.float64)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    n, k = len(y_true), len(thresholds)
+    order = np.argsort(thresholds)
+
+    # Nível de cada linha: quantos limiares (em ordem crescente) ela atinge
+    level = np.searchsorted(thresholds[order], y_proba, side="right")
+    cells = np.bincount(level * 2 + y_true, minlength=2 * (k + 1)).astype(np.float64)
+    rng = np.random.default_rng(seed)
+    metrics = {name: [] for name in ("precision", "recall", "f1", "expected_cost")}
+    for start in range(0, n_boot, batch_size):
+        size = min(batch_size, n_boot - start)
+        counts = rng.multinomial(n, cells / n, size=size).reshape(size, k + 1, 2)
+        # Linhas no nível >= j + 1 disparam o alerta do j-ésimo limiar
+        at_least = counts[:, ::-1].cumsum(axis=1)[:, ::-1]
+        tp, fp = at_least[:, 1:, 1], at_least[:, 1:, 0]
+        positives = at_least[:, :1, 1]
+        fn = positives - tp
+        with np.errstate(divide="ignore", invalid="ignore"):
+            metrics["precision"].append(np.where(tp + fp > 0, tp / (tp + fp), np.nan))
+            metrics["recall"].append(np.where(positives > 0, tp / positives, np.nan))
+            metrics["f1"].append(np.where(2 * tp + fp + fn > 0, 2 * tp / (2 * tp + fp + fn), np.nan))
+        metrics["expected_cost"].append((cost_fn * fn + cost_fp * fp) / n)
+
+    tail = (1 - confidence) / 2 * 100
+    intervals = {"threshold": thresholds}
+    inverse = np.argsort(order)
+    for name, batches in metrics.items():
+        samples = np.concatenate(batches)
+        with np.errstate(all="ignore"):
+            low, high = np.nanpercentile(samples, [tail, 100 - tail], axis=0) if len(samples) else (np.nan, np.nan)
+        intervals[f"{name}_low"] = np.asarray(low)[inverse]
+        intervals[f"{name}_high"] = np.asarray(high)[inverse]
+    return pd.DataFrame(intervals)
+
+
+def derive_risk_bands(curve: pd.DataFrame, recall_target: float = RECALL_TARGET,
+                      precision_target: float = PRECISION_TARGET) -> list:
+    """
+    Risk bands from a threshold curve.
+
+    - moderate: highest threshold that still catches ``recall_target`` of the floods;
+    - high: threshold with the best F1;
+    - critical: lowest threshold whose precision reaches ``precision_target``
+      (the F1 threshold if none does).
+
+    Bands are kept non-decreasing.
+    """
+    finite = curve[np.isfinite(curve["threshold"])]
+    if finite.empty or finite["recall"].isna().all():
+        raise ValueError("Risk bands need scored rows with at least one flood.")
+    moderate = finite.loc[finite["recall"] >= recall_target, "threshold"].max()
+    high = finite.loc[finite["f1"].idxmax(), "threshold"]
+    precise = finite.loc[finite["precision"] >= precision_target, "threshold"]
+    critical = precise.min() if len(precise) else high
+    high = max(high, moderate)
+    critical = max(critical, high)
+    return [
+        {"level": "moderate", "min_probability": float(moderate)},
+        {"level": "high", "min_probability": float(high)},
+        {"level": "critical", "min_probability": float(critical)},
+    ]
+
+
+def analyze_thresholds(y_true, y_proba, cost_fn: float = COST_FALSE_NEGATIVE, cost_fp: float = COST_FALSE_POSITIVE,
+                       n_boot: int = BOOTSTRAP_SAMPLES, reports_dir: str = REPORTS_DIR) -> dict:
+    """
+    Threshold sweep, risk bands and their bootstrap intervals, saved as ``thresholds.json``.
+
+    Args:
+        y_true: Binary labels of the scored rows.
+        y_proba: Flood probabilities of the same rows.
+        cost_fn (float): Cost of a missed flood.
+        cost_fp (float): Cost of a false alarm.
+        n_boot (int): Bootstrap resamples.
+        reports_dir (str, optional): Where to write the artifact; None skips writing.
+
+    Returns:
+        dict: The artifact: alert threshold (minimum expected cost), risk
+              bands, metrics and intervals at each operating point, and a
+              downsampled curve.
+    """
+    y_true = np.asarray(y_true)
+    curve = threshold_curve(y_true, y_proba, cost_fn, cost_fp)
+    bands = derive_risk_bands(curve)
+    alert_threshold = float(curve.loc[curve["expected_cost"].idxmin(), "threshold"])
+
+    points = {"alert": alert_threshold, **{band["level"]: band["min_probability"] for band in bands}}
+    intervals = bootstrap_intervals(y_true, y_proba, list(points.values()), n_boot, cost_fn=cost_fn, cost_fp=cost_fp)
+    operating_points = []
+    for (name, threshold), (_, ci) in zip(points.items(), intervals.iterrows()):
+        row = curve.loc[curve["threshold"] == threshold].iloc[0] if np.isfinite(threshold) else curve.iloc[0]
+        operating_points.append({
+            "name": name, "threshold": threshold,
+            **{metric: (None if pd.isna(row[metric]) else float(row[metric]))
+               for metric in ("precision", "recall", "f1", "expected_cost")},
+            "intervals": {metric: [None if pd.isna(ci[f"{metric}_low"]) else float(ci[f"{metric}_low"]),
+                                   None if pd.isna(ci[f"{metric}_high"]) else float(ci[f"{metric}_high"])]
+                          for metric in ("precision", "recall", "f1", "expected_cost")},
+        })
+
+    sample = np.unique(np.linspace(1, len(curve) - 1, min(CURVE_POINTS, len(curve) - 1)).round().astype(int))
+    artifact = {
+        "n": int(len(y_true)),
+        "positives": int((y_true == 1).sum()),
+        "costs": {"false_negative": cost_fn, "false_positive": cost_fp},
+        "alert_threshold": alert_threshold,
+        "bands": bands,
+        "operating_points": operating_points,
+        "curve": curve.iloc[sample][["threshold", "precision", "recall", "f1", "expected_cost"]]
+                      .astype(float).replace({np.nan: None}).to_dict(orient="list"),
+    }
+    print(f"Alert threshold (minimum expected cost): {alert_threshold:.3f}")
+    print("Risk bands: " + ", ".join(f"{b['level']} >= {b['min_probability']:.3f}" for b in bands))
+
+    if reports_dir:
+        os.makedirs(reports_dir, exist_ok=True)
+        path = os.path.join(reports_dir, THRESHOLDS_FILE)
+        with open(path, "w") as f:
+            json.dump(artifact, f, indent=2)
+        print(f"Threshold analysis saved to: {path}")
+    return artifact
+
+
+def classify_risk(probability, bands: list = DEFAULT_RISK_BANDS):
+    """
+    Risk level ('low', 'moderate', 'high' or 'critical') of a probability or array of them.
+    """
+    bands = sorted(bands, key=lambda band: band["min_probability"])
+    levels = np.array(["low"] + [band["level"] for band in bands])
+    index = np.searchsorted([band["min_probability"] for band in bands], probability, side="right")
+    # Probabilidade ausente (NaN) não sobe de faixa
+    index = np.where(np.isnan(probability), 0, index)
+    return str(levels[index]) if np.ndim(index) == 0 else levels[index]
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import warnings
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import ParameterGrid, ParameterSampler
+
+# Resultados por fold ficam em disco: uma busca interrompida ou repetida é retomada
+TUNING_CACHE_DIR = os.environ.get("TUNING_CACHE_DIR", "models/tuning_cache")
+# Estratégias de busca aceitas por ForestSearch
+SEARCH_STRATEGIES = ("halving", "random", "grid")
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    """Outcome of a search: the winning params (``n_estimators`` included) and every evaluation."""
+
+    best_params: dict
+    best_score: float
+    results: pd.DataFrame
+
+
+def data_fingerprint(X, y, splits: list) -> str:
+    """Hash of the training data and the CV folds; cached results are only reused for identical inputs."""
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(np.asarray(X, dtype=np.float64)).tobytes())
+    digest.update(np.ascontiguousarray(np.asarray(y)).tobytes())
+    for train_idx, test_idx in splits:
+        digest.update(np.asarray(train_idx).tobytes())
+        digest.update(np.asarray(test_idx).tobytes())
+    return digest.hexdigest()[:16]
+
+
+class FoldResultCache:
+    """
+    Append-only JSON-lines store of fold scores for one dataset fingerprint.
+
+    Each line is one (params, fold, n_estimators) evaluation, so results are
+    kept up to the moment a search is interrupted.
+    """
+
+    def __init__(self, cache_dir: str, fingerprint: str):
+        self.path = os.path.join(cache_dir, f"{fingerprint}.jsonl") if cache_dir else None
+        self._scores = {}
+        self._lock = threading.Lock()
+        if self.path and os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # linha truncada por uma interrupção
+                    self._scores[entry["key"]] = entry["score"]
+
+    @staticmethod
+    def key(params: dict, fold: int, n_estimators: int, scoring: str) -> str:
+        return json.dumps({"params": params, "fold": fold, "n_estimators": n_estimators, "scoring": scoring},
+                          sort_keys=True, default=str)
+
+    def get(self, key: str):
+        return self._scores.get(key)
+
+    def put(self, key: str, score: float):
+        with self._lock:
+            self._scores[key] = score
+            if self.path:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, "a") as f:
+                    f.write(json.dumps({"key": key, "score": score}) + "\n")
+
+
+class _FoldForest:
+    """A warm-started forest for one (params, fold); grows to each requested size."""
+
+    def __init__(self, params: dict, random_state: int):
+        self.model = RandomForestClassifier(warm_start=True, n_estimators=0, random_state=random_state, n_jobs=1, **params)
+
+    def grow(self, n_estimators: int, X_train, y_train):
+        if n_estimators > self.model.n_estimators or not hasattr(self.model, "estimators_"):
+            self.model.set_params(n_estimators=n_estimators)
+            with warnings.catch_warnings():
+                # 'balanced' com warm_start só é problema se os dados mudarem entre ajustes; aqui não mudam
+                warnings.filterwarnings("ignore", message=".*warm_start.*", category=UserWarning)
+                self.model.fit(X_train, y_train)
+
+
+class ForestSearch:
+    """
+    Hyperparameter search for ``RandomForestClassifier`` over time-series folds.
+
+    ``n_estimators`` is treated as a resource: each (params, fold) forest is
+    warm-started and grown through the requested sizes instead of refitted.
+    Strategies:
+
+    - ``"halving"``: successive halving; every round grows the survivors to
+      the next size and keeps the best ``1 / factor`` of them.
+    - ``"random"``: ``n_iter`` sampled configs, each scored at every size.
+    - ``"grid"``: every config at every size (same space as ``GridSearchCV``).
+
+    Fits run in a thread pool (the tree builder releases the GIL), so forests
+    stay in memory between rounds and data is never copied to workers.
+    """
+
+    def __init__(self, param_grid: dict, cv, scoring: str = "recall", search: str = "halving",
+                 factor: int = 3, n_iter: int = 10, n_jobs: int = -1, random_state: int = 42,
+                 cache_dir: str = TUNING_CACHE_DIR, verbose: int = 1):
+        self.param_grid = dict(param_grid)
+        self.sizes = sorted(self.param_grid.pop("n_estimators", [100]))
+        self.cv = cv
+        self.scoring = scoring
+        self.search = search
+        self.factor = factor
+        self.n_iter = n_iter
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.cache_dir = cache_dir
+        self.verbose = verbose
+
+    def _candidates(self) -> list:
+        if self.search == "random":
+            grid = ParameterGrid(self.param_grid)
+            n_iter = min(self.n_iter, len(grid))
+            return list(ParameterSampler(self.param_grid, n_iter=n_iter, random_state=self.random_state))
+        if self.search in ("halving", "grid"):
+            return list(ParameterGrid(self.param_grid))
+        raise ValueError(f"Unknown search '{self.search}'; expected one of {SEARCH_STRATEGIES}.")
+
+    def fit(self, X, y) -> SearchResult:
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y)
+        splits = list(self.cv.split(X, y))
+        cache = FoldResultCache(self.cache_dir, data_fingerprint(X, y, splits))
+        scorer = get_scorer(self.scoring)
+        candidates = self._candidates()
+        forests = {}
+        rows = []
+
+        def evaluate(c: int, fold: int, sizes: list) -> list:
+            params = candidates[c]
+            train_idx, test_idx = splits[fold]
+            scores = []
+            for n in sizes:
+                key = cache.key(params, fold, n, self.scoring)
+                score = cache.get(key)
+                if score is None:
+                    forest = forests.setdefault((c, fold), _FoldForest(params, self.random_state))
+                    forest.grow(n, X[train_idx], y[train_idx])
+                    try:
+                        score = float(scorer(forest.model, X[test_idx], y[test_idx]))
+                    except ValueError:
+                        # Fold sem uma das classes (ex.: nenhuma enchente no treino): como error_score=nan
+                        score = np.nan
+                    cache.put(key, score)
+                scores.append((c, fold, n, score))
+            return scores
+
+        def run_round(alive: list, sizes: list) -> pd.DataFrame:
+            tasks = [(c, fold) for c in alive for fold in range(len(splits))]
+            if self.verbose:
+                print(f"Evaluating {len(alive)} candidates x {len(splits)} folds at n_estimators={sizes}...")
+            results = Parallel(n_jobs=self.n_jobs, prefer="threads")(
+                delayed(evaluate)(c, fold, sizes) for c, fold in tasks)
+            frame = pd.DataFrame([r for task in results for r in task], columns=["candidate", "fold", "n_estimators", "score"])
+            rows.append(frame)
+            # Folds que falharam são ignorados na média, em vez de anularem o candidato
+            return frame.groupby(["candidate", "n_estimators"], sort=False)["score"].mean().reset_index()
+
+        alive = list(range(len(candidates)))
+        if self.search == "halving":
+            for level, n in enumerate(self.sizes):
+                means = run_round(alive, [n])
+                if level < len(self.sizes) - 1:
+                    keep = max(1, math.ceil(len(alive) / self.factor))
+                    alive = means.sort_values("score", ascending=False, kind="stable", na_position="last")["candidate"].head(keep).tolist()
+                    # Libera as florestas eliminadas
+                    for key in [k for k in forests if k[0] not in alive]:
+                        del forests[key]
+        else:
+            means = run_round(alive, self.sizes)
+
+        best = means.sort_values("score", ascending=False, kind="stable", na_position="last").iloc[0]
+        best_params = {**candidates[int(best["candidate"])], "n_estimators": int(best["n_estimators"])}
+
+        results = pd.concat(rows, ignore_index=True)
+        results["params"] = results["candidate"].map(lambda c: json.dumps(candidates[c], default=str))
+        return SearchResult(best_params=best_params, best_score=float(best["score"]), results=results)
@@ -0,0 +1,222 @@
+import datetime
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import requests
+
+from src.feature_spec import DAILY_VARIABLES
+from src.http_session import make_session
+from src.locations import location_key
+
+# Cache colunar local: um arquivo Parquet por local e por ano
+ARCHIVE_CACHE_DIR = os.environ.get("WEATHER_ARCHIVE_DIR", "data/raw/open-meteo")
+OPEN_METEO_ARCHIVE_URL = os.environ.get("OPEN_METEO_URL", "https://archive-api.open-meteo.com/v1/archive")
+
+# Coordenadas por requisição e requisições simultâneas
+LOCATIONS_PER_REQUEST = 50
+MAX_WORKERS = 8
+# Limite do plano gratuito do Open-Meteo; cada coordenada conta como uma chamada
+MAX_CALLS_PER_MINUTE = int(os.environ.get("OPEN_METEO_CALLS_PER_MINUTE", 600))
+REQUEST_TIMEOUT = 60
+REQUEST_RETRIES = 5
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces calls to ``calls_per_minute`` on average.
+
+    ``acquire(weight)`` blocks until ``weight`` calls fit in the budget, so a
+    request for 50 coordinates consumes 50 calls.
+    """
+
+    def __init__(self, calls_per_minute: float):
+        self.interval = 60.0 / calls_per_minute
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, weight: int = 1):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + weight * self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _partition_path(cache_dir: str, key: str, year: int) -> str:
+    return os.path.join(cache_dir, f"location={key}", f"year={year}.parquet")
+
+
+def _year_segments(start_date: datetime.date, end_date: datetime.date) -> list:
+    """Splits [start_date, end_date] at year boundaries, matching the cache partitions."""
+    return [
+        (max(start_date, datetime.date(year, 1, 1)), min(end_date, datetime.date(year, 12, 31)))
+        for year in range(start_date.year, end_date.year + 1)
+    ]
+
+
+def read_partition(cache_dir: str, key: str, year: int, columns: list = None) -> pa.Table:
+    path = _partition_path(cache_dir, key, year)
+    if not os.path.exists(path):
+        return None
+    return pq.read_table(path, columns=columns)
+
+
+def write_partition(cache_dir: str, key: str, year: int, frame: pd.DataFrame):
+    """Merges ``frame`` into the partition (new rows win) and replaces the file atomically."""
+    existing = read_partition(cache_dir, key, year)
+    if existing is not None:
+        frame = pd.concat([existing.to_pandas(), frame])
+    frame = frame[~frame["date"].duplicated(keep="last")].sort_values("date").reset_index(drop=True)
+    path = _partition_path(cache_dir, key, year)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _missing_ranges(cache_dir: str, key: str, start_date: datetime.date, end_date: datetime.date) -> list:
+    """Contiguous runs of days in [start_date, end_date] absent from the cache, as (first, last) pairs."""
+    wanted = pd.date_range(start_date, end_date, freq="D", tz="UTC")
+    cached = []
+    for seg_start, _ in _year_segments(start_date, end_date):
+        # Só a coluna de datas é lida para decidir o que falta
+        table = read_partition(cache_dir, key, seg_start.year, columns=["date"])
+        if table is not None:
+            cached.append(pd.DatetimeIndex(table.column("date").to_pandas()))
+    missing = wanted[~wanted.isin(cached[0].append(cached[1:]))] if cached else wanted
+    if missing.empty:
+        return []
+    # Quebra a sequência onde dois dias faltantes não são consecutivos
+    breaks = np.flatnonzero(np.diff((missing - missing[0]).days) != 1)
+    firsts, lasts = np.r_[0, breaks + 1], np.r_[breaks, len(missing) - 1]
+    return [(missing[i].date(), missing[j].date()) for i, j in zip(firsts, lasts)]
+
+
+def _fetch_chunk(session: requests.Session, url: str, limiter: RateLimiter, chunk: list,
+                 start_date: datetime.date, end_date: datetime.date) -> list:
+    """One multi-coordinate request; returns a DataFrame per location, in ``chunk`` order."""
+    params = {
+        "latitude": ",".join(str(loc["latitude"]) for loc in chunk),
+        "longitude": ",".join(str(loc["longitude"]) for loc in chunk),
+        "start_date": start_date.strftime("%Y-%m-%d"),
+        "end_date": end_date.strftime("%Y-%m-%d"),
+        "daily": ",".join(DAILY_VARIABLES),
+        "timezone": "GMT",
+    }
+    limiter.acquire(len(chunk))
+    response = session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    payload = response.json()
+    # Uma coordenada devolve um objeto; várias, uma lista na ordem pedida
+    items = payload if isinstance(payload, list) else [payload]
+
+    frames = []
+    for item in items:
+        daily = item["daily"]
+        frame = pd.DataFrame({"date": pd.to_datetime(daily["time"], utc=True)})
+        for name in DAILY_VARIABLES:
+            frame[name] = pd.to_numeric(pd.Series(daily[name], dtype="object"), errors="coerce").astype("float32")
+        # Dias ainda não publicados no arquivo histórico vêm nulos: não entram no cache
+        frames.append(frame.dropna(subset=DAILY_VARIABLES, how="all"))
+    return frames
+
+
+def fetch_archive(locations: list, start_date, end_date, cache_dir: str = ARCHIVE_CACHE_DIR,
+                  url: str = OPEN_METEO_ARCHIVE_URL, max_workers: int = MAX_WORKERS,
+                  calls_per_minute: float = MAX_CALLS_PER_MINUTE, refresh: bool = False) -> pd.DataFrame:
+    """
+    Daily weather for many locations, served from the local Parquet cache.
+
+    Only the contiguous ranges of days missing from the cache are
+    downloaded, and never days after today. Locations missing the same range
+    are batched into multi-coordinate requests, which run concurrently under
+    a shared rate limit. Days the archive has not published yet are not
+    cached, so they are asked for again on the next run; if a request fails
+    (e.g. offline) the cached days are returned without the missing ones.
+
+    Args:
+        locations (list): Dicts with ``latitude`` and ``longitude``.
+        start_date: First day (inclusive), date or ISO string.
+        end_date: Last day (inclusive), date or ISO string.
+        cache_dir (str): Root of the partitioned cache.
+        url (str): Archive API endpoint (a local stub in tests).
+        max_workers (int): Concurrent requests.
+        calls_per_minute (float): Open-Meteo call budget (one call per coordinate).
+        refresh (bool): Download the whole range even if cached.
+
+    Returns:
+        pd.DataFrame: Columns ``latitude``, ``longitude``, ``date`` (UTC) and
+        ``DAILY_VARIABLES``, grouped by location in date order.
+    """
+    start_date = pd.Timestamp(start_date).date()
+    end_date = pd.Timestamp(end_date).date()
+    unique = {location_key(loc["latitude"], loc["longitude"]): loc for loc in locations}
+    # Dias futuros nunca estão no arquivo histórico: não são pedidos
+    fetch_end = min(end_date, datetime.datetime.now(datetime.timezone.utc).date())
+
+    # (primeiro, último) dia do intervalo -> locais que precisam dele
+    pending = {}
+    for key, loc in unique.items():
+        if start_date > fetch_end:
+            break
+        ranges = [(start_date, fetch_end)] if refresh else _missing_ranges(cache_dir, key, start_date, fetch_end)
+        for day_range in ranges:
+            pending.setdefault(day_range, []).append((key, loc))
+
+    jobs = [
+        (day_range, members[offset:offset + LOCATIONS_PER_REQUEST])
+        for day_range, members in pending.items()
+        for offset in range(0, len(members), LOCATIONS_PER_REQUEST)
+    ]
+    if jobs:
+        print(f"Open-Meteo: {len(jobs)} requisições para {len(unique)} locais ({len(pending)} intervalos de dias).")
+        session = make_session(max_workers, REQUEST_RETRIES)
+        limiter = RateLimiter(calls_per_minute)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="open-meteo") as pool:
+            futures = {
+                pool.submit(_fetch_chunk, session, url, limiter, [loc for _, loc in members], *day_range): (day_range, members)
+                for day_range, members in jobs
+            }
+            # A escrita fica na thread principal: cada partição tem um único escritor
+            for future in as_completed(futures):
+                day_range, members = futures[future]
+                try:
+                    frames = future.result()
+                except requests.RequestException as e:
+                    print(f"Open-Meteo indisponível para {day_range[0]}..{day_range[1]} ({type(e).__name__}); usando o cache.")
+                    continue
+                for (key, _), frame in zip(members, frames):
+                    # Um intervalo pode atravessar a virada do ano: uma escrita por partição anual
+                    for year, part in frame.groupby(frame["date"].dt.year):
+                        write_partition(cache_dir, key, int(year), part)
+
+    # Monta o resultado em Arrow e converte para pandas uma única vez
+    tables = []
+    for key, loc in unique.items():
+        for seg_start, seg_end in _year_segments(start_date, end_date):
+            cached = read_partition(cache_dir, key, seg_start.year)
+            if cached is None:
+                continue
+            dates = pd.DatetimeIndex(cached.column("date").to_pandas())
+            mask = (dates >= pd.Timestamp(seg_start, tz="UTC")) & (dates <= pd.Timestamp(seg_end, tz="UTC"))
+            table = cached.filter(pa.array(mask))
+            tables.append(table.append_column("latitude", pa.array(np.full(len(table), loc["latitude"])))
+                               .append_column("longitude", pa.array(np.full(len(table), loc["longitude"]))))
+
+    columns = ["latitude", "longitude", "date"] + DAILY_VARIABLES
+    if not tables:
+        return pd.DataFrame(columns=columns)
+    return pa.concat_tables(tables).select(columns).to_pandas()
+
+if __name__ == "__main__":
+    # Exemplo: dois anos de dados para Porto Alegre (a segunda execução não acessa a rede)
+    from src.data_preprocessing import DEFAULT_END_DATE, DEFAULT_START_DATE
+    from src.locations import DEFAULT_LATITUDE, DEFAULT_LONGITUDE
+    df = fetch_archive([{"latitude": DEFAULT_LATITUDE, "longitude": DEFAULT_LONGITUDE}], DEFAULT_START_DATE, DEFAULT_END_DATE)
+    print(df)
@@ -0,0 +1,13 @@
+import inspect
+import mongomock.collection
+
+# pymongo >= 4.9 passa sort= para o builder de bulk_write; o mongomock 4.x ainda não aceita.
+# Sem ordenação pedida (sort=None) o argumento pode ser descartado sem mudar o resultado.
+_add_update = mongomock.collection.BulkOperationBuilder.add_update
+if "sort" not in inspect.signature(_add_update).parameters:
+    def _add_update_without_sort(self, *args, sort=None, **kwargs):
+        if sort is not None:
+            raise NotImplementedError("mongomock does not support sorted bulk updates")
+        return _add_update(self, *args, **kwargs)
+
+    mongomock.collection.BulkOperationBuilder.add_update = _add_update_without_sort
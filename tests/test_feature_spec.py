@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.feature_spec import (AGGREGATIONS, DEFAULT_FEATURE_SPEC, FeatureSpec, build_features,
+                              compute_feature_matrix, rolling_name)
+
+SPEC = FeatureSpec(variables=("precipitation_sum", "temperature_2m_max"),
+                   lags=(("precipitation_sum", (1, 2, 5)), ("temperature_2m_max", (1,))),
+                   windows=(("precipitation_sum", (1, 3, 7)), ("temperature_2m_max", (2,))),
+                   aggregations=AGGREGATIONS, thresholds=DEFAULT_FEATURE_SPEC.thresholds)
+
+
+@pytest.fixture(scope="module")
+def daily():
+    rng = np.random.default_rng(3)
+    frames = []
+    for location, n_days in (("a", 40), ("b", 25), ("c", 4)):
+        frame = pd.DataFrame({
+            "location": location,
+            "date": pd.date_range("2024-01-01", periods=n_days, tz="UTC"),
+            "precipitation_sum": rng.gamma(0.6, 25.0, n_days),
+            "temperature_2m_max": rng.normal(25, 4, n_days),
+        })
+        # Dias sem dado: janelas que os tocam ficam NaN, como no pandas
+        frame.loc[rng.random(n_days) < 0.1, "precipitation_sum"] = np.nan
+        frames.append(frame)
+    # Locais embaralhados: build_features ordena por local e data
+    return pd.concat(frames).sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+def expected_with_pandas(daily: pd.DataFrame) -> pd.DataFrame:
+    df = daily.sort_values(["location", "date"], kind="stable")
+    grouped = df.groupby("location")
+    out = {}
+    for var, lags in SPEC.lags:
+        for k in lags:
+            out[f"{var}_lag_{k}d"] = grouped[var].shift(k)
+    for var, windows in SPEC.windows:
+        for window in windows:
+            for agg in SPEC.aggregations:
+                out[rolling_name(var, window, agg)] = grouped[var].transform(
+                    lambda s: s.rolling(window).agg(agg).shift(1))
+    return pd.DataFrame(out, index=df.index)
+
+
+def test_lags_and_windows_match_pandas_shift_and_rolling(daily):
+    built = build_features(daily, SPEC, group_by="location")
+    expected = expected_with_pandas(daily)
+    pd.testing.assert_frame_equal(built[expected.columns], expected, check_exact=False, rtol=1e-12, atol=1e-9)
+
+
+def test_thresholds_read_the_derived_columns(daily):
+    built = build_features(daily, SPEC, group_by="location")
+    for name, source, limit in SPEC.thresholds:
+        np.testing.assert_array_equal(built[name], (built[source] > limit).astype(int))
+
+
+def test_matrix_layout_matches_build_features(daily):
+    df = daily[daily["location"].isin(["a", "b"])]
+    df = df[df["date"] < pd.Timestamp("2024-01-26", tz="UTC")].sort_values(["location", "date"])
+    matrix = compute_feature_matrix({var: df[var].to_numpy().reshape(2, -1) for var in SPEC.variables}, SPEC)
+    built = build_features(df, SPEC, group_by="location")
+    for name in SPEC.derived_names():
+        np.testing.assert_array_equal(matrix[name].reshape(-1), built[name].to_numpy())
+
+
+def test_feature_names_round_trip():
+    assert FeatureSpec.from_feature_names(SPEC.feature_names()).feature_names() == SPEC.feature_names()
+    assert FeatureSpec.from_feature_names(DEFAULT_FEATURE_SPEC.feature_names()) == DEFAULT_FEATURE_SPEC
+
+
+def test_threshold_source_is_added_when_not_a_feature():
+    spec = FeatureSpec.from_feature_names(["precipitation_sum", "is_extreme_rain_72h"])
+    assert spec.windows == (("precipitation_sum", (7,)),)
+    assert spec.feature_names() == ["precipitation_sum", "precipitation_sum_rolling_7d", "is_extreme_rain_72h"]
+    assert spec.history_days == 7
+
+
+def test_unknown_feature_names_are_rejected():
+    with pytest.raises(ValueError, match="snowfall_lag_1d"):
+        FeatureSpec.from_feature_names(["precipitation_sum", "snowfall_lag_1d"])
@@ -0,0 +1,85 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from src.flat_forest import FlatForest, export_forest, probe_inputs
+
+V1_MODEL = "models/trained_models/flood_prediction_model_v1.pkl"
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    rng = np.random.default_rng(7)
+    X = rng.normal(size=(600, 6)) * [1, 10, 100, 0.1, 1, 5]
+    y = ((X[:, 0] + X[:, 1] / 10 > 0.3) ^ (rng.random(600) < 0.1)).astype(int)
+    # NaN no treino: as divisões aprendem para que lado vão os valores ausentes
+    X[rng.random(X.shape) < 0.05] = np.nan
+    model = RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0).fit(X, y)
+    return model, FlatForest.from_sklearn(model)
+
+
+def boundary_rows(flat: FlatForest) -> np.ndarray:
+    """Rows sitting exactly on, just below and just above the split thresholds (in float32)."""
+    internal = np.flatnonzero(np.isfinite(flat.threshold))[:200]
+    rows = []
+    for node in internal:
+        t = np.float32(flat.threshold[node])
+        for value in (t, np.nextafter(t, np.float32(-np.inf)), np.nextafter(t, np.float32(np.inf)), flat.threshold[node]):
+            row = np.zeros(flat.n_features_in_)
+            row[flat.feature[node]] = value
+            rows.append(row)
+    return np.array(rows)
+
+
+def test_batch_matches_sklearn_on_random_and_nan_rows(fitted):
+    model, flat = fitted
+    X = probe_inputs(flat, 3000, seed=1)
+    assert np.isnan(X).any()
+    np.testing.assert_array_equal(flat.predict_proba(X), model.predict_proba(X))
+    np.testing.assert_array_equal(flat.predict(X), model.predict(X))
+
+
+def test_threshold_boundaries_match_sklearn(fitted):
+    model, flat = fitted
+    X = boundary_rows(flat)
+    np.testing.assert_array_equal(flat.predict_proba(X), model.predict_proba(X))
+
+
+def test_single_row_matches_batch_and_sklearn(fitted):
+    model, flat = fitted
+    X = np.vstack([probe_inputs(flat, 50, seed=2), boundary_rows(flat)[:50]])
+    X[0, :] = np.nan
+    for row in X:
+        np.testing.assert_array_equal(flat.predict_proba(row), model.predict_proba(row[None, :])[0])
+        np.testing.assert_array_equal(flat.predict_proba(row), flat.predict_proba(row[None, :])[0])
+
+
+def test_saved_forest_round_trips(fitted, tmp_path):
+    model, _ = fitted
+    exported = export_forest(model, str(tmp_path / "forest.npz"))
+    loaded = FlatForest.load(str(tmp_path / "forest.npz"))
+    X = probe_inputs(exported, 500, seed=3)
+    np.testing.assert_array_equal(loaded.predict_proba(X), model.predict_proba(X))
+
+
+def test_folded_scaler_matches_scaled_sklearn(fitted):
+    model, flat = fitted
+    rng = np.random.default_rng(4)
+    raw = rng.normal(size=(400, 6)) * 30 + 12
+    scaler = StandardScaler().fit(raw)
+    folded = flat.fold_scaler(scaler.mean_, scaler.scale_)
+    # Linhas cujo valor escalado cai exatamente sobre os limiares
+    X = np.vstack([raw, boundary_rows(flat) * scaler.scale_ + scaler.mean_])
+    X[rng.random(X.shape) < 0.02] = np.nan
+    np.testing.assert_array_equal(folded.predict_proba(X), model.predict_proba(scaler.transform(X)))
+
+
+def test_published_v1_forest_matches_sklearn():
+    model = joblib.load(V1_MODEL)
+    flat = FlatForest.load(V1_MODEL.replace(".pkl", ".npz"))
+    X = np.vstack([probe_inputs(flat, 2000, seed=5), boundary_rows(flat)])
+    expected = model.predict_proba(pd.DataFrame(X, columns=model.feature_names_in_))
+    np.testing.assert_array_equal(flat.predict_proba(X), expected)
@@ -0,0 +1,67 @@
+import mongomock
+import numpy as np
+import pandas as pd
+import pymongo
+import pytest
+
+from src.locations import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, location_key
+from src.mongo_store import DAILY_INDEX_NAME, MONGO_DATABASE, get_daily_collection, ingest_daily
+
+
+def daily_frame(start: str, days: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "date": pd.date_range(start, periods=days, freq="D", tz="UTC"),
+        "precipitation_sum": np.arange(days, dtype=float),
+    })
+
+
+@pytest.fixture
+def client():
+    return mongomock.MongoClient()
+
+
+def test_ingest_upserts_by_location_and_date(client):
+    collection = get_daily_collection(client)
+    counts = ingest_daily(daily_frame("2024-05-01", 10), -30.0, -51.0, collection=collection)
+    assert counts == {"upserted": 10, "modified": 0, "skipped": 0}
+    document = collection.find_one({"date": pd.Timestamp("2024-05-03").to_pydatetime()})
+    assert document["location"] == location_key(-30.0, -51.0)
+    assert document["precipitation_sum"] == 2.0
+
+
+def test_rerun_is_idempotent(client):
+    collection = get_daily_collection(client)
+    ingest_daily(daily_frame("2024-05-01", 10), -30.0, -51.0, collection=collection)
+
+    # Incremental: nada depois da marca d'água, nada é enviado
+    assert ingest_daily(daily_frame("2024-05-01", 10), -30.0, -51.0, collection=collection) == \
+        {"upserted": 0, "modified": 0, "skipped": 10}
+    # Completo: as mesmas chaves são sobrescritas, sem duplicar
+    counts = ingest_daily(daily_frame("2024-05-01", 12), -30.0, -51.0, collection=collection, incremental=False)
+    assert counts["upserted"] == 2
+    assert collection.count_documents({}) == 12
+    # Outro local com as mesmas datas é outro registro
+    ingest_daily(daily_frame("2024-05-01", 12), -23.5, -46.6, collection=collection)
+    assert collection.count_documents({}) == 24
+
+
+def test_legacy_collection_is_migrated_before_the_unique_index(client):
+    legacy = client[MONGO_DATABASE]["daily"]
+    records = daily_frame("2024-05-01", 5).to_dict(orient="records")
+    # Duas execuções antigas com insert_many: sem 'location' e com cada dia duplicado
+    legacy.insert_many([dict(r) for r in records])
+    legacy.insert_many([{**r, "precipitation_sum": r["precipitation_sum"] + 100} for r in records])
+
+    collection = get_daily_collection(client)
+    assert DAILY_INDEX_NAME in collection.index_information()
+    assert collection.count_documents({}) == 5
+    assert collection.count_documents({"location": location_key(DEFAULT_LATITUDE, DEFAULT_LONGITUDE)}) == 5
+    # Fica o registro inserido por último
+    assert collection.find_one({"date": pd.Timestamp("2024-05-01").to_pydatetime()})["precipitation_sum"] == 100.0
+    with pytest.raises(pymongo.errors.DuplicateKeyError):
+        collection.insert_one({"location": location_key(DEFAULT_LATITUDE, DEFAULT_LONGITUDE),
+                               "date": pd.Timestamp("2024-05-01").to_pydatetime()})
+
+    # Depois da migração, a ingestão incremental continua do último dia migrado
+    counts = ingest_daily(daily_frame("2024-05-01", 7), DEFAULT_LATITUDE, DEFAULT_LONGITUDE, collection=collection)
+    assert counts == {"upserted": 2, "modified": 0, "skipped": 5}
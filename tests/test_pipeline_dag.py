@@ -0,0 +1,89 @@
+import os
+import pytest
+
+from src.pipeline_dag import Stage, run_stages
+
+calls = []
+
+
+def source(n: int = 3) -> list:
+    calls.append("source")
+    return list(range(n))
+
+
+def double(values: list) -> list:
+    calls.append("double")
+    return [2 * v for v in values]
+
+
+def total(values: list) -> int:
+    calls.append("total")
+    return sum(values)
+
+
+def write_report(value: int, path: str) -> int:
+    calls.append("report")
+    with open(path, "w") as f:
+        f.write(str(value))
+    return value
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    calls.clear()
+
+
+def stages(n: int = 3) -> list:
+    return [
+        Stage("source", source, params={"n": n}),
+        Stage("double", double, deps=("source",)),
+        Stage("total", total, deps=("double",)),
+    ]
+
+
+def test_second_run_is_a_cache_hit(tmp_path):
+    first = run_stages(stages(), cache_dir=str(tmp_path), max_workers=2)
+    assert first["total"] == 6
+    calls.clear()
+    second = run_stages(stages(), cache_dir=str(tmp_path), load=("total",))
+    assert calls == []
+    assert second == {"total": 6}
+
+
+def test_param_change_reruns_the_stage_and_its_dependents(tmp_path):
+    run_stages(stages(3), cache_dir=str(tmp_path))
+    calls.clear()
+    assert run_stages(stages(4), cache_dir=str(tmp_path))["total"] == 12
+    assert calls == ["source", "double", "total"]
+
+
+def test_unchanged_output_keeps_downstream_cached(tmp_path):
+    run_stages(stages(), cache_dir=str(tmp_path))
+    calls.clear()
+    # Reexecutada à força, mas com a mesma saída: as dependentes continuam em cache
+    run_stages(stages(), cache_dir=str(tmp_path), force=("source",))
+    assert calls == ["source"]
+
+
+def test_deleted_output_file_reruns_the_stage(tmp_path):
+    report = str(tmp_path / "report.txt")
+    dag = stages() + [Stage("report", write_report, deps=("total",), params={"path": report}, outputs=(report,))]
+    run_stages(dag, cache_dir=str(tmp_path / "cache"))
+    calls.clear()
+    run_stages(dag, cache_dir=str(tmp_path / "cache"))
+    assert calls == []
+    os.remove(report)
+    run_stages(dag, cache_dir=str(tmp_path / "cache"))
+    assert calls == ["report"]
+    assert open(report).read() == "6"
+
+
+def test_cycles_and_unknown_dependencies_are_rejected(tmp_path):
+    cycle = [Stage("a", double, deps=("b",)), Stage("b", double, deps=("a",)), Stage("c", source)]
+    with pytest.raises(ValueError, match="cycle"):
+        run_stages(cycle, cache_dir=str(tmp_path))
+    with pytest.raises(ValueError, match="unknown stages"):
+        run_stages([Stage("a", double, deps=("missing",))], cache_dir=str(tmp_path))
+    with pytest.raises(ValueError, match="unique"):
+        run_stages([Stage("a", source), Stage("a", source)], cache_dir=str(tmp_path))
+    assert calls == []
@@ -0,0 +1,74 @@
+import numpy as np
+
+from read_serial import FRAME_LEN, FrameParser, parse_frames
+
+
+def frame(seq: int, millis: int, distance_cm: int, checksum: int = None) -> bytes:
+    """A telemetry frame as emitted by the firmware (checksum = XOR of the payload)."""
+    payload = f"{seq:05d},{millis:010d},{distance_cm:04d}".encode()
+    if checksum is None:
+        checksum = 0
+        for byte in payload:
+            checksum ^= byte
+    return b"$" + payload + f"*{checksum:02X}\r\n".encode()
+
+
+def test_parses_consecutive_frames():
+    readings, consumed, rejected = parse_frames(frame(1, 1000, 250) + frame(2, 1200, 9999))
+    assert readings.tolist() == [(1, 1000, 250), (2, 1200, 9999)]
+    assert consumed == 2 * FRAME_LEN
+    assert rejected == 0
+
+
+def test_frame_split_across_reads_is_kept_until_complete():
+    data = frame(1, 1000, 250) + frame(2, 1200, 240)
+    parser = FrameParser()
+    # Cortes em todas as posições do segundo quadro
+    for cut in range(FRAME_LEN + 1, 2 * FRAME_LEN):
+        parser.reset()
+        first = parser.feed(data[:cut])
+        second = parser.feed(data[cut:])
+        assert first.tolist() == [(1, 1000, 250)]
+        assert second.tolist() == [(2, 1200, 240)]
+
+
+def test_corrupt_bytes_are_skipped_and_parsing_resyncs():
+    garbage = b"\x00\xff$12,noise\r\n$$"
+    truncated = frame(7, 1, 1)[:15]
+    data = garbage + frame(1, 1000, 250) + truncated + frame(2, 1200, 240)
+    readings, _, rejected = parse_frames(data)
+    assert readings["seq"].tolist() == [1, 2]
+    assert rejected == 0
+
+
+def test_non_digit_field_is_not_a_frame():
+    bad = bytearray(frame(3, 1000, 250))
+    bad[20] = ord("x")
+    readings, _, rejected = parse_frames(bytes(bad) + frame(4, 1100, 251))
+    assert readings["seq"].tolist() == [4]
+    assert rejected == 0
+
+
+def test_bad_checksum_is_rejected_and_counted():
+    good = frame(1, 1000, 250)
+    wrong = frame(2, 1200, 240, checksum=0x00)
+    parser = FrameParser()
+    readings = parser.feed(wrong + good)
+    assert readings["seq"].tolist() == [1]
+    assert parser.rejected == 1
+
+
+def test_invalid_hex_checksum_is_rejected():
+    bad = bytearray(frame(5, 1000, 250))
+    bad[23:25] = b"G1"
+    readings, _, rejected = parse_frames(bytes(bad))
+    assert len(readings) == 0
+    assert rejected == 1
+
+
+def test_incomplete_tail_is_not_consumed():
+    data = frame(1, 1000, 250) + frame(2, 1200, 240)[:10]
+    readings, consumed, _ = parse_frames(data)
+    assert len(readings) == 1
+    assert data[consumed:] == frame(2, 1200, 240)[:10]
+    assert np.frombuffer(data[consumed:], dtype=np.uint8)[0] == ord("$")
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from src.sensor_store import ReadingRingBuffer, SensorStore
+
+
+def test_window_after_wrap_around_is_chronological():
+    buf = ReadingRingBuffer(capacity=8)
+    for t in range(13):
+        buf.append(float(t), 100.0 + t)
+    assert len(buf) == 8
+    ts, distance = buf.window(seconds=100, now=12.0)
+    np.testing.assert_array_equal(ts, np.arange(5, 13))
+    np.testing.assert_array_equal(distance, 100.0 + np.arange(5, 13))
+
+
+@pytest.mark.parametrize("n_before_wrap", [0, 3, 7, 8])
+def test_window_cut_on_either_segment(n_before_wrap):
+    buf = ReadingRingBuffer(capacity=8)
+    buf.extend(np.arange(n_before_wrap, dtype=float), np.zeros(n_before_wrap))
+    buf.extend(np.arange(n_before_wrap, n_before_wrap + 8, dtype=float), np.arange(8, dtype=float))
+    now = n_before_wrap + 7.0
+    for seconds in (0, 2.5, 5, 7, 20):
+        ts, _ = buf.window(seconds, now=now)
+        expected = np.arange(n_before_wrap, n_before_wrap + 8, dtype=float)
+        np.testing.assert_array_equal(ts, expected[expected >= now - seconds])
+
+
+def test_extend_longer_than_capacity_keeps_the_latest():
+    buf = ReadingRingBuffer(capacity=4)
+    buf.append(0.0, 1.0)
+    buf.extend(np.arange(1, 11, dtype=float), np.arange(1, 11, dtype=float))
+    ts, distance = buf.window(100, now=10.0)
+    np.testing.assert_array_equal(ts, [7, 8, 9, 10])
+    np.testing.assert_array_equal(distance, [7, 8, 9, 10])
+
+
+def test_rate_of_rise_is_positive_when_distance_shrinks():
+    # A distância até a água cai 3 cm/min: o nível sobe 3 cm/min
+    ts = np.arange(0, 300, 0.2)
+    buf = ReadingRingBuffer(capacity=2048)
+    buf.extend(ts, 400.0 - 3.0 * ts / 60.0)
+    assert buf.stats(300, now=ts[-1])["rate_of_rise_cm_per_min"] == pytest.approx(3.0)
+
+    falling = ReadingRingBuffer(capacity=2048)
+    falling.extend(ts, 200.0 + 1.5 * ts / 60.0)
+    assert falling.stats(300, now=ts[-1])["rate_of_rise_cm_per_min"] == pytest.approx(-1.5)
+
+
+def test_stats_ignore_no_echo_samples():
+    buf = ReadingRingBuffer(capacity=16)
+    buf.extend([0.0, 1.0, 2.0, 3.0], [100.0, np.nan, 100.0, np.nan])
+    stats = buf.stats(10, now=3.0)
+    assert stats["count"] == 2
+    assert stats["min_cm"] == stats["max_cm"] == 100.0
+    assert stats["rate_of_rise_cm_per_min"] == 0.0
+
+
+def test_empty_window_has_only_the_count():
+    store = SensorStore(capacity=8)
+    store.record("a", [0.0], [100.0])
+    assert store.summary("a", windows=(60,), now=1000.0) == {"1min": {"window_s": 60, "count": 0}}
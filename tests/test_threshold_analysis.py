@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from sklearn.metrics import precision_recall_curve
+
+from src.threshold_analysis import bootstrap_intervals, classify_risk, derive_risk_bands, threshold_curve
+
+
+@pytest.fixture(scope="module")
+def scores():
+    rng = np.random.default_rng(11)
+    y = (rng.random(2000) < 0.15).astype(int)
+    # Probabilidades arredondadas: muitos empates, como nas saídas de uma floresta
+    proba = np.round(np.clip(0.35 * y + rng.normal(0.3, 0.2, len(y)), 0, 1), 2)
+    return y, proba
+
+
+def test_curve_matches_sklearn_precision_recall_curve(scores):
+    y, proba = scores
+    curve = threshold_curve(y, proba).set_index("threshold")
+    precision, recall, thresholds = precision_recall_curve(y, proba)
+    np.testing.assert_allclose(curve.loc[thresholds, "precision"], precision[:-1])
+    np.testing.assert_allclose(curve.loc[thresholds, "recall"], recall[:-1])
+
+
+def test_curve_counts_match_brute_force(scores):
+    y, proba = scores
+    curve = threshold_curve(y, proba, cost_fn=10.0, cost_fp=1.0)
+    assert curve["threshold"].iloc[0] == np.inf
+    assert curve[["tp", "fp"]].iloc[0].tolist() == [0, 0]
+    for row in curve.iloc[1:].itertuples():
+        alert = proba >= row.threshold
+        assert row.tp == int((alert & (y == 1)).sum())
+        assert row.fp == int((alert & (y == 0)).sum())
+        assert row.tp + row.fp + row.fn + row.tn == len(y)
+        assert row.expected_cost == pytest.approx((10.0 * row.fn + row.fp) / len(y))
+    assert curve["threshold"].is_monotonic_decreasing
+
+
+def test_bootstrap_intervals_contain_the_point_estimates(scores):
+    y, proba = scores
+    curve = threshold_curve(y, proba)
+    thresholds = [0.3, 0.5, 0.7]
+    intervals = bootstrap_intervals(y, proba, thresholds, n_boot=400, batch_size=150).set_index("threshold")
+    point = curve.set_index("threshold").loc[thresholds]
+    for metric in ("precision", "recall", "f1", "expected_cost"):
+        assert (intervals[f"{metric}_low"] <= point[metric]).all()
+        assert (point[metric] <= intervals[f"{metric}_high"]).all()
+        assert (intervals[f"{metric}_low"] < intervals[f"{metric}_high"]).all()
+
+
+def test_bootstrap_matches_row_resampling(scores):
+    # O sorteio multinomial por célula deve ter a mesma distribuição que reamostrar linhas
+    y, proba = scores
+    intervals = bootstrap_intervals(y, proba, [0.5], n_boot=2000).iloc[0]
+    rng = np.random.default_rng(0)
+    recalls = []
+    for _ in range(2000):
+        idx = rng.integers(0, len(y), len(y))
+        yb, alert = y[idx], proba[idx] >= 0.5
+        recalls.append((alert & (yb == 1)).sum() / yb.sum())
+    low, high = np.percentile(recalls, [2.5, 97.5])
+    assert intervals["recall_low"] == pytest.approx(low, abs=0.02)
+    assert intervals["recall_high"] == pytest.approx(high, abs=0.02)
+
+
+def test_bands_are_non_decreasing_and_classify(scores):
+    y, proba = scores
+    bands = derive_risk_bands(threshold_curve(y, proba))
+    cuts = [band["min_probability"] for band in bands]
+    assert cuts == sorted(cuts)
+    levels = classify_risk(np.array([0.0, cuts[0], cuts[2], np.nan]), bands)
+    assert levels.tolist() == ["low", "moderate", "critical", "low"]
+    assert classify_risk(1.0, bands) == "critical"